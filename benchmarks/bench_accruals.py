@@ -0,0 +1,98 @@
+# benchmarks/bench_accruals.py
+
+"""
+Nightly yield accrual run time against the number of Active positions.
+
+Seeds N positions spread over Active invoices due in the next few months,
+bought over the last 60 days, then times accrue_yield twice on the same data:
+
+    nightly   one day, written to accrual_days and the position_accruals snapshot
+    catch-up  --days days from an empty accrual_days (a first run or missed nights)
+
+Positions are inserted straight into the positions table, skipping the
+transactions that would normally maintain it.
+
+    python -m benchmarks.bench_accruals --positions 10000 100000 1000000
+"""
+
+import argparse
+import datetime
+import os
+import random
+import sqlite3
+import tempfile
+
+from database.init_db import migrate_db
+from models import user as user_model
+from utils.accrue_yield import accrue_yield
+
+POSITIONS_PER_INVOICE = 20
+BUYERS = 1000
+
+def seed_positions(path, positions, seed=0):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    migrate_db(conn)
+
+    owner_id = user_model.create_user(conn, "owner")
+    cursor = conn.cursor()
+    cursor.executemany("INSERT INTO users (username) VALUES (?)", ((f"buyer_{i}",) for i in range(BUYERS)))
+    cursor.execute("SELECT user_id FROM users WHERE username LIKE 'buyer_%'")
+    buyer_ids = [row[0] for row in cursor.fetchall()]
+
+    invoices = max(positions // POSITIONS_PER_INVOICE, 1)
+    cursor.executemany("""
+        INSERT INTO invoices (
+            owner_user_id, debtor_name, original_amount, payment_terms,
+            desired_sale_price, chunks_total, chunks_sold, status, due_date
+        ) VALUES (?, ?, 11000000, 'Net 90', 10000000, 1000, 1000, 'Active', date('now', ?))
+    """, ((owner_id, f"Benchmark Debtor {n % 50}", f"+{rng.randint(1, 120)} days") for n in range(invoices)))
+    cursor.execute("SELECT invoice_id FROM invoices ORDER BY invoice_id")
+    invoice_ids = [row[0] for row in cursor.fetchall()]
+
+    rows = []
+    for invoice_id in invoice_ids:
+        for buyer_id in rng.sample(buyer_ids, POSITIONS_PER_INVOICE):
+            bought = f"-{rng.randint(0, 60)} days"
+            rows.append((invoice_id, buyer_id, rng.randint(1, 50), bought, bought))
+    cursor.executemany("""
+        INSERT INTO positions (invoice_id, buyer_user_id, chunks, purchases, first_purchase, last_purchase)
+        VALUES (?, ?, ?, 1, datetime('now', ?), datetime('now', ?))
+    """, rows[:positions])
+    conn.commit()
+    conn.close()
+
+def run_benchmark(positions, days):
+    path = os.path.join(tempfile.mkdtemp(prefix="accrual_bench_"), "accruals.db")
+    seed_positions(path, positions)
+    today = datetime.date.today()
+
+    conn = sqlite3.connect(path)
+    nightly = accrue_yield(conn, as_of=today)
+    conn.execute("DELETE FROM accrual_days")
+    conn.commit()
+    catch_up = accrue_yield(conn, as_of=today, since=today - datetime.timedelta(days=days - 1))
+    conn.close()
+    os.remove(path)
+
+    return {
+        'positions': nightly['positions'],
+        'accrued': nightly['accrued'],
+        'nightly_seconds': nightly['seconds'],
+        'catch_up_days': catch_up['days'],
+        'catch_up_seconds': catch_up['seconds'],
+        'positions_per_second': nightly['positions'] / nightly['seconds'] if nightly['seconds'] else 0.0
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the nightly yield accrual")
+    parser.add_argument("--positions", type=int, nargs="+", default=[10000, 100000, 1000000],
+                        help="Active positions to accrue")
+    parser.add_argument("--days", type=int, default=30, help="Days accrued by the catch-up run")
+    args = parser.parse_args()
+
+    print(f"{'positions':>10} {'nightly s':>10} {'positions/s':>12} {'catch-up days':>14} {'catch-up s':>11}  accrued")
+    for positions in args.positions:
+        result = run_benchmark(positions, args.days)
+        print(f"{result['positions']:>10} {result['nightly_seconds']:>10.2f} {result['positions_per_second']:>12.0f} "
+              f"{result['catch_up_days']:>14} {result['catch_up_seconds']:>11.2f}  {result['accrued']}")
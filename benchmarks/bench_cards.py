@@ -0,0 +1,93 @@
+# benchmarks/bench_cards.py
+
+"""
+Card HTML rendering benchmark for a 1,000-card page.
+
+Builds the HTML of every card on a page the way Browse Invoices does (header,
+investment summary, all-or-nothing notice, plus the compact invoice card) and
+times three reruns: with the memo caches bypassed, on a cold cache, and on a
+warm cache where only a few invoices changed since the previous rerun.
+Streamlit itself is not involved; this isolates the string-building cost.
+
+    python -m benchmarks.bench_cards --cards 1000 --changed 10
+"""
+
+import argparse
+import random
+import time
+
+from components import invoice_card
+from components.invoice_card import card_cache_info
+
+BUILDERS = [
+    invoice_card.invoice_card_html,
+    invoice_card.opportunity_header_html,
+    invoice_card.investment_summary_html,
+    invoice_card.all_or_nothing_html,
+]
+
+def make_invoices(count, seed=0):
+    rng = random.Random(seed)
+    invoices = []
+    for invoice_id in range(1, count + 1):
+        chunks_total = rng.randint(10, 500)
+        sale_price = chunks_total * 10000  # satang
+        invoices.append([
+            invoice_id, f"Debtor {invoice_id % 300}", round(sale_price * rng.uniform(1.02, 1.2)),
+            sale_price, chunks_total, rng.randint(0, chunks_total - 1), 'Pending'
+        ])
+    return invoices
+
+def render_page(invoices, cached=True):
+    """HTML for every card on the page; cached=False calls the builders' undecorated functions"""
+    card, header, summary, notice = (
+        BUILDERS if cached else [builder.__wrapped__ for builder in BUILDERS]
+    )
+    html = []
+    for invoice_id, debtor, amount, sale_price, chunks_total, chunks_sold, status in invoices:
+        html.append(card(invoice_id, debtor, amount, sale_price, chunks_total, chunks_sold, status))
+        html.append(header(invoice_id, debtor, status))
+        # Default slider position of 5 chunks
+        chunks_to_buy = min(5, chunks_total - chunks_sold)
+        gross = chunks_to_buy * amount / 100 / chunks_total
+        net_profit = (gross - chunks_to_buy * 100) * 0.9
+        html.append(summary(chunks_to_buy * 100, chunks_to_buy * 100 + net_profit, net_profit,
+                            net_profit / (chunks_to_buy * 100) * 100))
+        if status == 'Pending':
+            html.append(notice(chunks_total))
+    return html
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    fn(*args, **kwargs)
+    return (time.perf_counter() - started) * 1000
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark memoized card HTML rendering")
+    parser.add_argument("--cards", type=int, default=1000, help="Cards on the page")
+    parser.add_argument("--changed", type=int, default=10, help="Invoices with a new purchase between reruns")
+    parser.add_argument("--repeats", type=int, default=5, help="Timing repeats (best is reported)")
+    args = parser.parse_args()
+
+    invoices = make_invoices(args.cards)
+
+    uncached = min(timed(render_page, invoices, cached=False) for _ in range(args.repeats))
+
+    cold = []
+    for _ in range(args.repeats):
+        for builder in BUILDERS:
+            builder.cache_clear()
+        cold.append(timed(render_page, invoices))
+
+    # A few invoices sold chunks since the last rerun; every other card is unchanged
+    for invoice in random.Random(1).sample(invoices, min(args.changed, len(invoices))):
+        invoice[5] = min(invoice[5] + 1, invoice[4])
+    warm = min(timed(render_page, invoices) for _ in range(args.repeats))
+
+    print(f"{args.cards} cards per page, {args.changed} changed between reruns")
+    print(f"  uncached:   {uncached:8.2f} ms")
+    print(f"  cold cache: {min(cold):8.2f} ms")
+    print(f"  warm cache: {warm:8.2f} ms")
+    for name, info in card_cache_info().items():
+        if info.hits or info.misses:
+            print(f"  {name}: {info.hits} hits, {info.misses} misses, {info.currsize} cached")
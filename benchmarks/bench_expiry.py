@@ -0,0 +1,98 @@
+# benchmarks/bench_expiry.py
+
+"""
+Funding deadline sweep throughput.
+
+Seeds N expired Pending invoices, each part-funded by a few buyers, among a
+larger set of Pending invoices whose deadlines are still in the future, then
+times one expire_unfunded_invoices sweep. Finding work is a range scan on the
+partial deadline index, so live invoices should not slow the sweep down.
+
+    python -m benchmarks.bench_expiry --expired 100 1000 10000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from database.init_db import migrate_db
+from models import user as user_model
+from utils.expire_invoices import expire_unfunded_invoices
+
+BUYERS = 50
+BUYERS_PER_INVOICE = 5
+
+def seed_invoices(path, expired, live, seed=0):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    migrate_db(conn)
+
+    owner_id = user_model.create_user(conn, "owner")
+    buyer_ids = [user_model.create_user(conn, f"buyer_{i}") for i in range(BUYERS)]
+
+    cursor = conn.cursor()
+    for n in range(expired + live):
+        deadline = "-1 days" if n < expired else "+30 days"
+        cursor.execute("""
+            INSERT INTO invoices (
+                owner_user_id, debtor_name, original_amount, payment_terms,
+                desired_sale_price, chunks_total, funding_deadline
+            ) VALUES (?, 'Benchmark Debtor', 11000000, 'Net 30', 10000000, 1000, datetime('now', ?))
+        """, (owner_id, deadline))
+        invoice_id = cursor.lastrowid
+
+        purchases = [(invoice_id, rng.choice(buyer_ids), rng.randint(1, 20)) for _ in range(BUYERS_PER_INVOICE)]
+        cursor.executemany("""
+            INSERT INTO transactions (invoice_id, buyer_user_id, chunks_purchased)
+            VALUES (?, ?, ?)
+        """, purchases)
+        cursor.execute("UPDATE invoices SET chunks_sold = ? WHERE invoice_id = ?",
+                       (sum(chunks for _, _, chunks in purchases), invoice_id))
+    conn.commit()
+    conn.close()
+
+def run_benchmark(expired, live):
+    path = os.path.join(tempfile.mkdtemp(prefix="expiry_bench_"), "expiry.db")
+    seed_invoices(path, expired, live)
+
+    conn = sqlite3.connect(path)
+    started = time.perf_counter()
+    result = expire_unfunded_invoices(conn)
+    elapsed = time.perf_counter() - started
+
+    cursor = conn.cursor()
+    cursor.execute("""
+        EXPLAIN QUERY PLAN
+        SELECT invoice_id FROM invoices
+        WHERE status = 'Pending' AND funding_deadline <= datetime('now')
+        ORDER BY funding_deadline LIMIT 100
+    """)
+    plan = " / ".join(row[-1] for row in cursor.fetchall())
+    conn.close()
+    os.remove(path)
+
+    return {
+        'expired': result['expired'],
+        'refunds': result['refunds'],
+        'seconds': elapsed,
+        'invoices_per_second': result['expired'] / elapsed if elapsed else 0.0,
+        'refunds_per_second': result['refunds'] / elapsed if elapsed else 0.0,
+        'plan': plan
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the funding deadline sweeper")
+    parser.add_argument("--expired", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="Expired invoices to sweep")
+    parser.add_argument("--live", type=int, default=10000, help="Pending invoices still inside their deadline")
+    args = parser.parse_args()
+
+    print(f"{'expired':>8} {'refunds':>8} {'seconds':>8} {'invoices/s':>11} {'refunds/s':>10}")
+    for expired in args.expired:
+        result = run_benchmark(expired, args.live)
+        print(f"{result['expired']:>8} {result['refunds']:>8} {result['seconds']:>8.2f} "
+              f"{result['invoices_per_second']:>11.0f} {result['refunds_per_second']:>10.0f}")
+    print(f"Plan: {result['plan']}")
@@ -0,0 +1,112 @@
+# benchmarks/bench_market.py
+
+"""
+Order matching benchmark for the secondary market.
+
+Seeds one Active invoice with an order book of N open sell orders at random
+prices, then times buy_from_market fills. With idx_market_orders_book each
+match is an index seek, so time per match should stay flat as the book grows.
+
+    python -m benchmarks.bench_market --books 1000 10000 100000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from database.init_db import migrate_db
+from models import market as market_model
+from models import user as user_model
+
+SELLERS = 50
+
+def seed_order_book(path, orders, seed=0):
+    """Active invoice with `orders` open sell orders of 1-5 chunks each; returns (invoice_id, buyer_id)"""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    migrate_db(conn)
+
+    owner_id = user_model.create_user(conn, "owner")
+    buyer_id = user_model.create_user(conn, "market_buyer")
+    seller_ids = [user_model.create_user(conn, f"seller_{i}") for i in range(SELLERS)]
+
+    order_chunks = [rng.randint(1, 5) for _ in range(orders)]
+    chunks_total = sum(order_chunks)
+
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO invoices (
+            owner_user_id, debtor_name, original_amount, payment_terms,
+            desired_sale_price, chunks_total, chunks_sold, status
+        ) VALUES (?, 'Benchmark Debtor', ?, 'Net 30', ?, ?, ?, 'Active')
+    """, (owner_id, chunks_total * 11000, chunks_total * 10000, chunks_total, chunks_total))
+    invoice_id = cursor.lastrowid
+
+    # Each order is backed by a primary-market position of the same size
+    positions = [(invoice_id, seller_ids[n % SELLERS], chunks) for n, chunks in enumerate(order_chunks)]
+    cursor.executemany("""
+        INSERT INTO transactions (invoice_id, buyer_user_id, chunks_purchased, status)
+        VALUES (?, ?, ?, 'Active')
+    """, positions)
+    cursor.executemany("""
+        INSERT INTO market_orders (
+            invoice_id, seller_user_id, price_per_chunk, chunks_listed, chunks_remaining
+        ) VALUES (?, ?, ?, ?, ?)
+    """, [
+        (invoice_id, seller_id, rng.randint(9500, 11500), chunks, chunks)
+        for _, seller_id, chunks in positions
+    ])
+    conn.commit()
+    conn.close()
+    return invoice_id, buyer_id
+
+def run_benchmark(orders, purchases, chunks_per_purchase):
+    path = os.path.join(tempfile.mkdtemp(prefix="market_bench_"), "market.db")
+    invoice_id, buyer_id = seed_order_book(path, orders)
+
+    conn = sqlite3.connect(path)
+    matches = 0
+    started = time.perf_counter()
+    for _ in range(purchases):
+        result = market_model.buy_from_market(conn, invoice_id, buyer_id, chunks_per_purchase)
+        matches += len(result['fills'])
+    elapsed = time.perf_counter() - started
+
+    cursor = conn.cursor()
+    cursor.execute("""
+        EXPLAIN QUERY PLAN
+        SELECT order_id FROM market_orders
+        WHERE invoice_id = ? AND status = 'Open' AND seller_user_id != ?
+        ORDER BY price_per_chunk, order_id LIMIT 1
+    """, (invoice_id, buyer_id))
+    plan = " / ".join(row[-1] for row in cursor.fetchall())
+    conn.close()
+    os.remove(path)
+
+    return {
+        'orders': orders,
+        'purchases': purchases,
+        'matches': matches,
+        'seconds': elapsed,
+        'matches_per_second': matches / elapsed if elapsed else 0.0,
+        'ms_per_match': elapsed * 1000 / matches if matches else 0.0,
+        'plan': plan
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark secondary market order matching")
+    parser.add_argument("--books", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Order book sizes (open orders) to test")
+    parser.add_argument("--purchases", type=int, default=200, help="Market buys per book size")
+    parser.add_argument("--chunks", type=int, default=10, help="Chunks per market buy")
+    args = parser.parse_args()
+
+    print(f"{'orders':>8} {'matches':>8} {'matches/s':>10} {'ms/match':>9}")
+    for orders in args.books:
+        result = run_benchmark(orders, args.purchases, args.chunks)
+        print(f"{result['orders']:>8} {result['matches']:>8} "
+              f"{result['matches_per_second']:>10.0f} {result['ms_per_match']:>9.3f}")
+    print(f"Plan: {result['plan']}")
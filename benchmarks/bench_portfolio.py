@@ -0,0 +1,112 @@
+# benchmarks/bench_portfolio.py
+
+"""
+Investor dashboard load time against the number of purchases a buyer has made.
+
+Seeds one buyer with N purchases spread over Pending and Active invoices, then
+times what the "Your Investments" column reads on each rerun:
+
+    full load  the previous path: every transaction joined to its invoice, summed in Python
+    portfolio  one page of positions plus the per-status summary from models.portfolio
+
+    python -m benchmarks.bench_portfolio --purchases 1000 10000 100000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from config import GRID_PAGE_SIZE
+from database.init_db import migrate_db
+from models import portfolio as portfolio_model
+from models import user as user_model
+
+PURCHASES_PER_INVOICE = 10
+
+def seed_portfolio(path, purchases, seed=0):
+    """One buyer with `purchases` transactions; returns the buyer's user id"""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    migrate_db(conn)
+
+    owner_id = user_model.create_user(conn, "owner")
+    buyer_id = user_model.create_user(conn, "investor")
+
+    cursor = conn.cursor()
+    rows = []
+    for n in range(max(purchases // PURCHASES_PER_INVOICE, 1)):
+        status = rng.choice(['Pending', 'Active'])
+        cursor.execute("""
+            INSERT INTO invoices (
+                owner_user_id, debtor_name, original_amount, payment_terms,
+                desired_sale_price, chunks_total, chunks_sold, status
+            ) VALUES (?, ?, 11000000, 'Net 30', 10000000, 1000, 0, ?)
+        """, (owner_id, f"Benchmark Debtor {n % 50}", status))
+        transaction_status = 'Active' if status == 'Active' else 'Pending Activation'
+        rows.extend((cursor.lastrowid, buyer_id, rng.randint(1, 5), transaction_status)
+                    for _ in range(PURCHASES_PER_INVOICE))
+    cursor.executemany("""
+        INSERT INTO transactions (invoice_id, buyer_user_id, chunks_purchased, status)
+        VALUES (?, ?, ?, ?)
+    """, rows[:purchases])
+    conn.commit()
+    conn.close()
+    return buyer_id
+
+def full_load(conn, user_id):
+    """The dashboard before positions: every row fetched, totals accumulated per row"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT t.invoice_id, t.chunks_purchased, t.status, t.purchase_timestamp,
+               i.debtor_name, i.original_amount, i.desired_sale_price, i.chunks_total, i.status
+        FROM transactions t
+        JOIN invoices i ON t.invoice_id = i.invoice_id
+        WHERE t.buyer_user_id = ?
+        ORDER BY t.purchase_timestamp DESC
+    """, (user_id,))
+    invested = expected = 0.0  # satang
+    for row in cursor.fetchall():
+        chunks, original_amount, chunks_total = row[1], row[5], row[7]
+        invested += chunks * 10000
+        expected += chunks * (original_amount / chunks_total
+                              - (original_amount - chunks_total * 10000) * 0.10 / chunks_total)
+    return invested, expected
+
+def portfolio_load(conn, user_id):
+    portfolio_model.get_positions_page(conn, user_id, limit=GRID_PAGE_SIZE)
+    return portfolio_model.get_portfolio_summary(conn, user_id)
+
+def time_load(conn, load, user_id, repeats):
+    started = time.perf_counter()
+    for _ in range(repeats):
+        load(conn, user_id)
+    return (time.perf_counter() - started) * 1000 / repeats
+
+def run_benchmark(purchases, repeats):
+    path = os.path.join(tempfile.mkdtemp(prefix="portfolio_bench_"), "portfolio.db")
+    buyer_id = seed_portfolio(path, purchases)
+
+    conn = sqlite3.connect(path)
+    result = {
+        'purchases': purchases,
+        'full_ms': time_load(conn, full_load, buyer_id, repeats),
+        'portfolio_ms': time_load(conn, portfolio_load, buyer_id, repeats)
+    }
+    conn.close()
+    os.remove(path)
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the investor dashboard portfolio queries")
+    parser.add_argument("--purchases", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Purchases made by the benchmark buyer")
+    parser.add_argument("--repeats", type=int, default=5, help="Loads timed per path")
+    args = parser.parse_args()
+
+    print(f"{'purchases':>10} {'full load ms':>13} {'portfolio ms':>13}")
+    for purchases in args.purchases:
+        result = run_benchmark(purchases, args.repeats)
+        print(f"{result['purchases']:>10} {result['full_ms']:>13.2f} {result['portfolio_ms']:>13.2f}")
@@ -0,0 +1,121 @@
+# benchmarks/bench_purchase.py
+
+"""
+Primary purchase latency with and without concentration limits.
+
+Seeds Pending invoices across a set of debtors and buyers who already hold
+positions in them, then times purchase_chunks three ways:
+
+    unguarded  the previous path: INSERT transaction + UPDATE invoice + commit
+    no limits  the guarded purchase with every limit disabled
+    limits     the guarded purchase with per-invoice, per-debtor and total limits
+
+Limit checks read the trigger-maintained buyer_exposure totals, so their cost
+should not grow with the number of positions a buyer already holds.
+
+    python -m benchmarks.bench_purchase --positions 1000 10000 100000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from database.init_db import migrate_db
+from models import transaction as transaction_model
+from models import user as user_model
+from models.debtor import get_or_create_debtor
+
+BUYERS = 20
+DEBTORS = 50
+# Generous enough that no benchmark purchase is rejected
+LIMITS = {'invoice_limit': 10**9, 'debtor_limit': 10**9, 'open_total_limit': 10**12}
+
+def seed_market(path, positions, seed=0):
+    """Pending invoices with `positions` existing single-chunk positions; returns (invoice_ids, buyer_ids)"""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    migrate_db(conn)
+
+    owner_id = user_model.create_user(conn, "owner")
+    buyer_ids = [user_model.create_user(conn, f"buyer_{i}") for i in range(BUYERS)]
+
+    cursor = conn.cursor()
+    debtor_ids = [get_or_create_debtor(cursor, f"Benchmark Debtor {i}") for i in range(DEBTORS)]
+    invoice_count = max(positions // 100, 1)
+    invoice_ids = []
+    for n in range(invoice_count):
+        # Room for the seeded positions plus every benchmark purchase
+        chunks_total = 100_000
+        cursor.execute("""
+            INSERT INTO invoices (
+                owner_user_id, debtor_name, original_amount, payment_terms,
+                desired_sale_price, chunks_total, debtor_id
+            ) VALUES (?, ?, ?, 'Net 30', ?, ?, ?)
+        """, (owner_id, f"Benchmark Debtor {n % DEBTORS}", chunks_total * 11000, chunks_total * 10000,
+              chunks_total, debtor_ids[n % DEBTORS]))
+        invoice_ids.append(cursor.lastrowid)
+
+    held = [(rng.choice(invoice_ids), rng.choice(buyer_ids), 1) for _ in range(positions)]
+    cursor.executemany("""
+        INSERT INTO transactions (invoice_id, buyer_user_id, chunks_purchased)
+        VALUES (?, ?, ?)
+    """, held)
+    cursor.executemany("UPDATE invoices SET chunks_sold = chunks_sold + 1 WHERE invoice_id = ?",
+                       [(invoice_id,) for invoice_id, _, _ in held])
+    conn.commit()
+    conn.close()
+    return invoice_ids, buyer_ids
+
+def unguarded_purchase(conn, invoice_id, buyer_id, chunks):
+    """The purchase path before limits: no checks, two writes, one commit"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO transactions (invoice_id, buyer_user_id, chunks_purchased)
+        VALUES (?, ?, ?)
+    """, (invoice_id, buyer_id, chunks))
+    cursor.execute("UPDATE invoices SET chunks_sold = chunks_sold + ? WHERE invoice_id = ?", (chunks, invoice_id))
+    conn.commit()
+
+def time_purchases(conn, purchase, invoice_ids, buyer_ids, purchases, seed=1):
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    for _ in range(purchases):
+        purchase(conn, rng.choice(invoice_ids), rng.choice(buyer_ids), rng.randint(1, 5))
+    return time.perf_counter() - started
+
+def run_benchmark(positions, purchases):
+    path = os.path.join(tempfile.mkdtemp(prefix="purchase_bench_"), "purchase.db")
+    invoice_ids, buyer_ids = seed_market(path, positions)
+
+    conn = sqlite3.connect(path)
+    paths = {
+        'unguarded': unguarded_purchase,
+        'no limits': lambda *args: transaction_model.purchase_chunks(*args, limits={}),
+        'limits': lambda *args: transaction_model.purchase_chunks(*args, limits=LIMITS),
+    }
+    seconds = {name: time_purchases(conn, purchase, invoice_ids, buyer_ids, purchases)
+               for name, purchase in paths.items()}
+    conn.close()
+    os.remove(path)
+
+    return {
+        'positions': positions,
+        'purchases': purchases,
+        'ms_per_purchase': {name: elapsed * 1000 / purchases for name, elapsed in seconds.items()}
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark guarded primary purchases")
+    parser.add_argument("--positions", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Existing positions to seed before timing")
+    parser.add_argument("--purchases", type=int, default=500, help="Purchases per path")
+    args = parser.parse_args()
+
+    print(f"{'positions':>10} {'unguarded ms':>13} {'no limits ms':>13} {'limits ms':>10}")
+    for positions in args.positions:
+        result = run_benchmark(positions, args.purchases)
+        ms = result['ms_per_purchase']
+        print(f"{result['positions']:>10} {ms['unguarded']:>13.3f} {ms['no limits']:>13.3f} {ms['limits']:>10.3f}")
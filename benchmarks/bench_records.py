@@ -0,0 +1,80 @@
+# benchmarks/bench_records.py
+
+"""
+Row representation benchmark for the model layer.
+
+Fetches the same invoice rows as plain tuples, dicts and slotted Invoice
+records, and reports construction time (fetchall) and memory held per cached
+row, measured with tracemalloc. Field values are identical in every variant,
+so the difference is the per-row container overhead.
+
+    python -m benchmarks.bench_records --rows 100000
+"""
+
+import argparse
+import gc
+import sqlite3
+import time
+import tracemalloc
+
+from database.init_db import migrate_db
+from models.records import Invoice, record_factory, select_columns
+
+def dict_factory(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+FACTORIES = {
+    'tuple': None,
+    'dict': dict_factory,
+    'Invoice': record_factory(Invoice),
+}
+
+def seed_invoices(conn, rows):
+    migrate_db(conn)
+    conn.executemany("""
+        INSERT INTO invoices (
+            owner_user_id, debtor_name, original_amount, payment_terms,
+            desired_sale_price, chunks_total, chunks_sold, status
+        ) VALUES (?, ?, ?, 'Net 30', ?, ?, ?, 'Pending')
+    """, [
+        (n % 100 + 1, f"Debtor {n % 500}", 1100000 + n, 1000000, 100, n % 100)
+        for n in range(rows)
+    ])
+    conn.commit()
+
+def fetch(conn, factory):
+    cursor = conn.cursor()
+    cursor.row_factory = factory
+    cursor.execute(f"SELECT {select_columns(Invoice)} FROM invoices ORDER BY invoice_id DESC")
+    return cursor.fetchall()
+
+def measure(conn, factory, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fetch(conn, factory)
+        best = min(best, time.perf_counter() - started)
+
+    gc.collect()
+    tracemalloc.start()
+    rows = fetch(conn, factory)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'seconds': best, 'bytes_per_row': held / len(rows)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare tuple, dict and slotted record rows")
+    parser.add_argument("--rows", type=int, default=100000, help="Invoice rows to fetch")
+    parser.add_argument("--repeats", type=int, default=5, help="Timing repeats (best is reported)")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(":memory:")
+    seed_invoices(conn, args.rows)
+
+    print(f"{'rows as':>8} {'fetch ms':>9} {'us/row':>7} {'bytes/row':>10}")
+    for name, factory in FACTORIES.items():
+        result = measure(conn, factory, args.repeats)
+        print(f"{name:>8} {result['seconds'] * 1000:>9.1f} "
+              f"{result['seconds'] * 1e6 / args.rows:>7.2f} {result['bytes_per_row']:>10.0f}")
+    conn.close()
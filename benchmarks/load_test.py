@@ -0,0 +1,332 @@
+# benchmarks/load_test.py
+
+"""
+Concurrent-buyer load test for the purchase and settlement paths.
+
+Seeds a scratch database, then drives the model functions from N threads or
+processes, each with its own connection, exactly as concurrent Streamlit
+sessions would. Reports throughput, latency percentiles, lock waits,
+'database is locked' failures and oversell / double-pay violations.
+
+    python -m benchmarks.load_test --scenario hot --workers 16 --duration 10
+    python -m benchmarks.load_test --scenario mixed --mode process --wal
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from database.init_db import migrate_db
+from models import invoice as invoice_model
+from models import transaction as transaction_model
+from models import user as user_model
+from utils.helpers import check_invoice_activation, process_invoice_owner_payment
+from utils.money import CHUNK_PRICE
+
+SCENARIOS = {
+    # Every buyer hammers the same large invoice
+    'hot': {'invoices': 1, 'chunks_per_invoice': 5000, 'settlers': 0},
+    # Buyers spread over many small invoices
+    'spread': {'invoices': 200, 'chunks_per_invoice': 50, 'settlers': 0},
+    # Spread purchases with settlements of funded invoices running alongside
+    'mixed': {'invoices': 200, 'chunks_per_invoice': 50, 'settlers': 2},
+}
+
+def seed_database(path, invoices, chunks_per_invoice, buyers, wal=False):
+    """Create a fresh database with owners, buyers and Pending invoices"""
+    conn = sqlite3.connect(path)
+    if wal:
+        conn.execute("PRAGMA journal_mode=WAL")
+    migrate_db(conn)
+
+    owner_ids = [user_model.create_user(conn, f"owner_{i}") for i in range(max(1, invoices // 10))]
+    buyer_ids = [user_model.create_user(conn, f"buyer_{i}") for i in range(buyers)]
+
+    sale_price = CHUNK_PRICE * chunks_per_invoice
+    for i in range(invoices):
+        invoice_model.create_invoice(
+            conn, owner_ids[i % len(owner_ids)], f"Debtor {i}",
+            sale_price.scale(11, 10), "Net 30", sale_price
+        )
+
+    conn.close()
+    return buyer_ids
+
+def _is_locked(error):
+    return isinstance(error, sqlite3.OperationalError) and "locked" in str(error)
+
+class _OperationFailed(Exception):
+    """A step gave up (lock timeout or error); the failure is already counted"""
+
+def _run_with_retry(conn, step, stats, max_lock_wait):
+    """
+    Run one committed step, retrying on 'database is locked' with backoff.
+    Time spent backing off is recorded as lock wait; giving up counts as a locked failure.
+    Steps are retried individually so a committed purchase is never replayed.
+    """
+    wait_started = None
+    backoff = 0.001
+
+    while True:
+        try:
+            result = step()
+            if wait_started is not None:
+                stats['lock_wait_seconds'] += time.perf_counter() - wait_started
+            return result
+        except Exception as error:
+            conn.rollback()
+            if not _is_locked(error):
+                stats['errors'] += 1
+                raise _OperationFailed() from error
+
+            stats['lock_waits'] += 1
+            now = time.perf_counter()
+            if wait_started is None:
+                wait_started = now
+            if now - wait_started >= max_lock_wait:
+                stats['locked_failures'] += 1
+                stats['lock_wait_seconds'] += now - wait_started
+                raise _OperationFailed() from error
+
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 0.05)
+
+def _read(conn, query):
+    cursor = conn.cursor()
+    cursor.execute(query)
+    rows = cursor.fetchall()
+    conn.commit()
+    return rows
+
+def _purchase_once(conn, run, buyer_ids, rng):
+    """Read open invoices like the Browse page does, then buy from one of them"""
+    open_invoices = run(lambda: _read(conn, """
+        SELECT invoice_id, chunks_total - chunks_sold
+        FROM invoices
+        WHERE status = 'Pending' AND chunks_sold < chunks_total
+        ORDER BY invoice_id
+        LIMIT 20
+    """))
+
+    if not open_invoices:
+        return False
+
+    invoice_id, remaining = rng.choice(open_invoices)
+    chunks = min(rng.randint(1, 5), remaining)
+    buyer_id = rng.choice(buyer_ids)
+    run(lambda: transaction_model.purchase_chunks(conn, invoice_id, buyer_id, chunks))
+    run(lambda: check_invoice_activation(conn, invoice_id))
+    return True
+
+def _settle_once(conn, run, rng):
+    """Settle one of the funded invoices, as an owner clicking 'Debtor Paid' would"""
+    funded = run(lambda: _read(conn, """
+        SELECT invoice_id, owner_user_id
+        FROM invoices
+        WHERE status = 'Active'
+        ORDER BY invoice_id
+        LIMIT 5
+    """))
+
+    if not funded:
+        return False
+
+    invoice_id, owner_id = rng.choice(funded)
+
+    def settle():
+        try:
+            process_invoice_owner_payment(conn, invoice_id, owner_id)
+        except ValueError:
+            # Someone else settled it between our read and our write
+            conn.rollback()
+
+    run(settle)
+    return True
+
+def run_worker(role, path, buyer_ids, duration, max_lock_wait, seed):
+    """Worker loop; returns raw latencies and counters so results can cross process boundaries"""
+    conn = sqlite3.connect(path, timeout=0, check_same_thread=False)
+    rng = random.Random(seed)
+    stats = {
+        'role': role, 'latencies': [], 'ops': 0, 'errors': 0,
+        'lock_waits': 0, 'locked_failures': 0, 'lock_wait_seconds': 0.0
+    }
+    run = lambda step: _run_with_retry(conn, step, stats, max_lock_wait)
+
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            if role == 'buyer':
+                did_work = _purchase_once(conn, run, buyer_ids, rng)
+            else:
+                did_work = _settle_once(conn, run, rng)
+        except _OperationFailed:
+            continue
+
+        if not did_work:
+            if role == 'buyer':
+                # Everything is sold
+                break
+            time.sleep(0.01)
+            continue
+
+        stats['ops'] += 1
+        stats['latencies'].append(time.perf_counter() - started)
+
+    conn.close()
+    return stats
+
+def check_violations(path):
+    """Invariants the purchase and settlement paths must keep under concurrency"""
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        SELECT COUNT(*) FROM invoices i
+        WHERE i.chunks_sold > i.chunks_total
+           OR (SELECT COALESCE(SUM(chunks_purchased), 0) FROM transactions t
+               WHERE t.invoice_id = i.invoice_id) > i.chunks_total
+    """)
+    oversold = cursor.fetchone()[0]
+
+    cursor.execute("""
+        SELECT COUNT(*) FROM (
+            SELECT invoice_id FROM cash_transfer_classes
+            WHERE event_type = 'debtor_payment'
+            GROUP BY invoice_id
+            HAVING COUNT(*) > 1
+        )
+    """)
+    double_paid = cursor.fetchone()[0]
+
+    cursor.execute("""
+        SELECT COUNT(*) FROM (
+            SELECT invoice_id FROM cash_transfer_classes
+            WHERE event_type = 'funding'
+            GROUP BY invoice_id
+            HAVING COUNT(*) > 1
+        )
+    """)
+    double_funded = cursor.fetchone()[0]
+
+    cursor.execute("SELECT status, COUNT(*) FROM invoices GROUP BY status")
+    statuses = dict(cursor.fetchall())
+
+    conn.close()
+    return {
+        'oversold_invoices': oversold,
+        'double_paid_invoices': double_paid,
+        'double_funded_invoices': double_funded,
+        'invoice_statuses': statuses
+    }
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def summarize(results, elapsed):
+    """Aggregate worker results per role"""
+    summary = {}
+    for role in ('buyer', 'settler'):
+        role_results = [r for r in results if r['role'] == role]
+        if not role_results:
+            continue
+        latencies = sorted(l for r in role_results for l in r['latencies'])
+        ops = sum(r['ops'] for r in role_results)
+        summary[role] = {
+            'workers': len(role_results),
+            'ops': ops,
+            'throughput_per_sec': ops / elapsed if elapsed > 0 else 0.0,
+            'latency_ms': {
+                'p50': _percentile(latencies, 50) * 1000,
+                'p95': _percentile(latencies, 95) * 1000,
+                'p99': _percentile(latencies, 99) * 1000,
+                'max': (latencies[-1] if latencies else 0.0) * 1000
+            },
+            'lock_waits': sum(r['lock_waits'] for r in role_results),
+            'lock_wait_seconds': sum(r['lock_wait_seconds'] for r in role_results),
+            'database_is_locked': sum(r['locked_failures'] for r in role_results),
+            'errors': sum(r['errors'] for r in role_results)
+        }
+    return summary
+
+def run_load_test(scenario='hot', workers=8, mode='thread', duration=10.0, buyers=500,
+                  settlers=None, max_lock_wait=5.0, wal=False, path=None):
+    """Seed a database, run the scenario and return the report dict"""
+    config = SCENARIOS[scenario]
+    settlers = config['settlers'] if settlers is None else settlers
+
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="load_test_"), "load_test.db")
+    buyer_ids = seed_database(path, config['invoices'], config['chunks_per_invoice'], buyers, wal)
+
+    roles = ['buyer'] * workers + ['settler'] * settlers
+    executor_class = ThreadPoolExecutor if mode == 'thread' else ProcessPoolExecutor
+
+    started = time.perf_counter()
+    with executor_class(max_workers=len(roles)) as executor:
+        futures = [
+            executor.submit(run_worker, role, path, buyer_ids, duration, max_lock_wait, seed)
+            for seed, role in enumerate(roles)
+        ]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
+
+    return {
+        'scenario': scenario,
+        'mode': mode,
+        'journal_mode': 'wal' if wal else 'delete',
+        'elapsed_seconds': elapsed,
+        'database': path,
+        'roles': summarize(results, elapsed),
+        'violations': check_violations(path)
+    }
+
+def print_report(report):
+    mode = "threads" if report['mode'] == 'thread' else "processes"
+    print(f"Scenario {report['scenario']} ({mode}, {report['journal_mode']} journal) "
+          f"ran {report['elapsed_seconds']:.1f}s against {report['database']}")
+    for role, stats in report['roles'].items():
+        latency = stats['latency_ms']
+        print(f"  {role}s x{stats['workers']}: {stats['ops']:,} ops, {stats['throughput_per_sec']:,.1f} ops/s")
+        print(f"    latency ms p50={latency['p50']:.2f} p95={latency['p95']:.2f} "
+              f"p99={latency['p99']:.2f} max={latency['max']:.2f}")
+        print(f"    lock waits={stats['lock_waits']:,} ({stats['lock_wait_seconds']:.2f}s) "
+              f"database is locked={stats['database_is_locked']:,} other errors={stats['errors']:,}")
+    violations = report['violations']
+    print(f"  violations: oversold={violations['oversold_invoices']} "
+          f"double_paid={violations['double_paid_invoices']} "
+          f"double_funded={violations['double_funded_invoices']}")
+    print(f"  invoice statuses: {violations['invoice_statuses']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent-buyer load test for purchases and settlements")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="hot")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent buyers")
+    parser.add_argument("--settlers", type=int, default=None, help="Concurrent settlers (scenario default if omitted)")
+    parser.add_argument("--mode", choices=["thread", "process"], default="thread")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+    parser.add_argument("--buyers", type=int, default=500, help="Distinct buyer accounts to seed")
+    parser.add_argument("--max-lock-wait", type=float, default=5.0,
+                        help="Seconds an operation retries a locked database before failing")
+    parser.add_argument("--wal", action="store_true", help="Run the database in WAL journal mode")
+    parser.add_argument("--db", default=None, help="Scratch database path (a temp file by default)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = run_load_test(
+        args.scenario, args.workers, args.mode, args.duration, args.buyers,
+        args.settlers, args.max_lock_wait, args.wal, args.db
+    )
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
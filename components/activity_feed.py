@@ -0,0 +1,69 @@
+import streamlit as st
+from config import ACTIVITY_POLL_SECONDS
+from models import activity_feed
+from components.invoice_card import activity_item_html
+from utils.helpers import format_money
+
+def _poll_feed(state_key, fetch_since, limit):
+    """
+    Fetch rows newer than the feed's cursor, put them in front and keep the newest `limit`.
+    fetch_since(cursor) must return (rows newest first with the row ID in column 0,
+    newest ID looked at); the cursor moves to that ID even when no row matched.
+    """
+    feed = st.session_state.setdefault(state_key, {'cursor': 0, 'rows': []})
+    new_rows, latest_id = fetch_since(feed['cursor'])
+    if new_rows:
+        feed['rows'] = (new_rows + feed['rows'])[:limit]
+    feed['cursor'] = max(feed['cursor'], latest_id)
+    return feed['rows']
+
+@st.fragment(run_every=ACTIVITY_POLL_SECONDS)
+def render_recent_invoices_feed(conn, limit=5):
+    """Newest invoices, refreshed on a timer by fetching only invoices created since the last poll"""
+    def fetch_since(since_id):
+        rows = activity_feed.get_invoices_since(conn, since_id, limit)
+        return rows, rows[0][0] if rows else since_id
+    
+    rows = _poll_feed('recent_invoices_feed', fetch_since, limit)
+    
+    # Funding progress changes in place, so the few invoices on screen are re-read by primary key
+    progress = activity_feed.get_invoice_progress(conn, [row[0] for row in rows])
+    
+    if not rows:
+        st.info("No invoices yet - be the first!")
+        return
+    
+    for invoice_id, debtor, amount, _, _, total in rows:
+        if invoice_id not in progress:
+            continue  # archived since it was first shown
+        status, sold = progress[invoice_id]
+        funded = (sold / total * 100) if total > 0 else 0
+        
+        status_emoji = {
+            'Pending': '⏳',
+            'Active': '✅', 
+            'Paid': '💰'
+        }.get(status, '❓')
+        
+        st.markdown(f"""
+        **{status_emoji} {debtor}**  
+        {format_money(amount)} | {funded:.0f}% funded
+        """)
+
+@st.fragment(run_every=ACTIVITY_POLL_SECONDS)
+def render_user_activity_feed(conn, user_id, limit=10):
+    """A user's latest cash transfers, refreshed on a timer by fetching only transfers since the last poll"""
+    rows = _poll_feed(
+        f"user_activity_feed_{user_id}",
+        lambda since_id: activity_feed.get_user_transfers_since(conn, user_id, since_id, limit),
+        limit
+    )
+    
+    if not rows:
+        st.info("No recent activity. Your financial transactions will appear here.")
+        return
+    
+    for _, event, timestamp, amount, _, to_party, debtor, inv_id in rows:
+        # Money was received when it went to this user
+        received = f"(User {user_id})" in to_party
+        st.markdown(activity_item_html(event, timestamp, amount, debtor, inv_id, received), unsafe_allow_html=True)
@@ -0,0 +1,88 @@
+import streamlit as st
+from models import transaction as transaction_model
+from utils.helpers import format_money
+from utils.money import CHUNK_PRICE
+
+BASKET_MODE_LABELS = {
+    'all_or_nothing': "All or nothing",
+    'best_effort': "Buy what's available"
+}
+
+def get_basket():
+    """This session's basket: invoice_id -> {'debtor', 'chunks'}"""
+    return st.session_state.setdefault('basket', {})
+
+def add_to_basket(invoice_id, debtor, chunks):
+    """Put `chunks` of an invoice in the basket, replacing any earlier quantity"""
+    get_basket()[invoice_id] = {'debtor': debtor, 'chunks': chunks}
+
+def render_basket_results(result):
+    """Per-line outcome of the last basket submission"""
+    for line in result['lines']:
+        label = f"#{line['invoice_id']}: {line['requested']} chunks"
+        if line['status'] == 'filled':
+            activated = " · invoice fully funded and now Active 🎉" if line['activated'] else ""
+            st.success(f"✅ {label} bought for {format_money(line['cost'])}{activated}")
+        elif line['status'] == 'cancelled':
+            st.warning(f"↩️ {label} - {line['message']}")
+        else:
+            st.error(f"❌ {label} - {line['message']}")
+
+def render_basket_panel(conn, user):
+    """Chunks queued across invoices, bought together in one transaction on submit"""
+    basket = get_basket()
+    result = st.session_state.pop('basket_result', None)
+    if not basket and not result:
+        return
+
+    st.markdown("### 🧺 Your Basket")
+    if result:
+        render_basket_results(result)
+
+    if not basket:
+        return
+
+    st.dataframe({
+        "#": list(basket),
+        "Debtor": [line['debtor'] for line in basket.values()],
+        "Chunks": [line['chunks'] for line in basket.values()],
+        "Cost": [format_money(CHUNK_PRICE * line['chunks']) for line in basket.values()]
+    }, hide_index=True, use_container_width=True)
+
+    total_chunks = sum(line['chunks'] for line in basket.values())
+    mode = st.radio(
+        "If a line can't be filled:",
+        list(BASKET_MODE_LABELS),
+        format_func=lambda code: BASKET_MODE_LABELS[code],
+        horizontal=True,
+        key="basket_mode",
+        help="All or nothing buys nothing unless every line fills; otherwise the lines that can be filled are bought"
+    )
+
+    col_buy, col_clear = st.columns([3, 1])
+    with col_buy:
+        if st.button(
+            f"🛒 Buy {total_chunks} chunks across {len(basket)} invoice{'s' if len(basket) > 1 else ''} "
+            f"for {format_money(CHUNK_PRICE * total_chunks)}",
+            key="basket_submit", type="primary", use_container_width=True
+        ):
+            try:
+                result = transaction_model.purchase_basket(
+                    conn, user['user_id'], [(invoice_id, line['chunks']) for invoice_id, line in basket.items()], mode
+                )
+            except ValueError as e:
+                st.error(f"Error: {str(e)}")
+                return
+
+            # Filled lines leave the basket; rejected ones stay so they can be adjusted
+            for line in result['lines']:
+                if line['status'] == 'filled':
+                    basket.pop(line['invoice_id'], None)
+            st.session_state.basket_result = result
+            st.rerun()
+    with col_clear:
+        if st.button("Clear", key="basket_clear", use_container_width=True):
+            basket.clear()
+            st.rerun()
+
+    st.markdown("---")
@@ -0,0 +1,59 @@
+import math
+import streamlit as st
+from config import GRID_PAGE_SIZE
+
+def render_grid_toggle(key):
+    """Switch between the detailed card list and the compact grid; True means grid"""
+    return st.toggle(
+        "▦ Compact grid view",
+        key=key,
+        help="One table, paged and sorted on the server. Select a row to open its details."
+    )
+
+def render_paged_grid(key, fetch_page, sort_options, page_size=GRID_PAGE_SIZE, column_config=None):
+    """
+    One st.dataframe over a server-side paged query. Returns the key of the selected row, or None.
+
+    sort_options maps display labels to the model's sort names (first is the default).
+    fetch_page(sort, descending, limit, offset) returns (table, row_keys, total), where
+    table is {column label: [values]} for the current page only.
+    """
+    sort_col, order_col, page_col = st.columns([2, 1, 1])
+    with sort_col:
+        sort_label = st.selectbox("Sort by", list(sort_options.keys()), key=f"{key}_sort")
+    with order_col:
+        descending = st.toggle("Descending", value=True, key=f"{key}_desc")
+
+    page_key = f"{key}_page"
+    page = st.session_state.get(page_key, 1)
+    table, row_keys, total = fetch_page(sort_options[sort_label], descending, page_size, (page - 1) * page_size)
+
+    # Filters may have shrunk the result since the page was chosen
+    pages = max(1, math.ceil(total / page_size))
+    if page > pages:
+        page = pages
+        table, row_keys, total = fetch_page(sort_options[sort_label], descending, page_size, (page - 1) * page_size)
+    st.session_state[page_key] = page
+
+    with page_col:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key=page_key)
+
+    if not row_keys:
+        st.info("No rows to show.")
+        return None
+
+    # A new widget key per page and sort order clears the selection when they change
+    event = st.dataframe(
+        table,
+        key=f"{key}_grid_{sort_label}_{descending}_{page}",
+        on_select="rerun",
+        selection_mode="single-row",
+        hide_index=True,
+        column_config=column_config
+    )
+
+    first = (page - 1) * page_size + 1
+    st.caption(f"Rows {first:,}–{first + len(row_keys) - 1:,} of {total:,}. Select a row to open it.")
+
+    selected = event.selection.rows
+    return row_keys[selected[0]] if selected else None
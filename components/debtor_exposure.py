@@ -0,0 +1,36 @@
+import streamlit as st
+from models import debtor as debtor_model
+from utils.helpers import format_money, format_number
+
+def render_debtor_exposure(conn, limit=20):
+    """Capital concentration per debtor, read from the trigger-maintained debtor aggregates"""
+    debtor_count, open_amount, funded_amount, paid_amount = debtor_model.get_exposure_totals(conn)
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("🏢 Debtors with Open Invoices", format_number(debtor_count))
+    with col2:
+        st.metric("📄 Open Invoice Value", format_money(open_amount))
+    with col3:
+        st.metric("💸 Buyer Capital Outstanding", format_money(funded_amount))
+
+    debtors = debtor_model.get_debtor_exposure(conn, limit)
+    if not debtors:
+        st.info("No open invoices, so no debtor exposure")
+        return
+
+    st.dataframe(
+        {
+            "Debtor": [debtor.name for debtor in debtors],
+            "Open Invoices": [debtor.open_invoice_count for debtor in debtors],
+            "Open Value": [format_money(debtor.open_amount) for debtor in debtors],
+            "Buyer Capital": [format_money(debtor.funded_amount) for debtor in debtors],
+            "Share of Open": [
+                f"{debtor.open_amount / open_amount * 100:.1f}%" if open_amount else "-" for debtor in debtors
+            ],
+            "Paid Invoices": [debtor.paid_invoice_count for debtor in debtors],
+            "Paid Volume": [format_money(debtor.paid_amount) for debtor in debtors]
+        },
+        hide_index=True
+    )
+    st.caption(f"Top {len(debtors)} debtors by open invoice value · {format_money(paid_amount)} settled to date")
@@ -1,18 +1,145 @@
 import streamlit as st
+from functools import lru_cache
+from config import CARD_CACHE_SIZE
+from utils.helpers import format_currency, format_money, format_number
 
-def render_invoice_card(invoice_id, debtor, amount, sale_price, chunks_total, chunks_sold, status):
-    progress = (chunks_sold / chunks_total) * 100 if chunks_total > 0 else 0
-    
-    with st.container():
-        st.markdown(f"""
+# Card templates are compiled once at import (bound str.format). The *_html builders
+# below are memoized on exactly the fields that change their output, so a rerun where
+# an invoice hasn't changed reuses the HTML string instead of rebuilding it.
+
+_INVOICE_CARD = """
         <div style="border:1px solid #ccc; border-radius:5px; padding:15px; margin:10px 0;">
             <h4>{debtor}</h4>
-            <p>Original Amount: {amount} THB</p>
-            <p>Sale Price: {sale_price} THB</p>
+            <p>Original Amount: {amount}</p>
+            <p>Sale Price: {sale_price}</p>
             <p>Status: {status}</p>
             <div style="background: #f0f0f0; border-radius: 5px; height: 20px;">
                 <div style="width: {progress}%; background: #4CAF50; height: 100%; border-radius: 5px;"></div>
             </div>
             <p>{chunks_sold}/{chunks_total} chunks sold</p>
         </div>
-        """, unsafe_allow_html=True)
\ No newline at end of file
+        """.format
+
+_OPPORTUNITY_HEADER = """
+        <div style="border: 2px solid #e1e5e9; border-radius: 15px; padding: 25px; margin: 20px 0; background: linear-gradient(135deg, #f8f9fa 0%, #ffffff 100%); box-shadow: 0 4px 6px rgba(0,0,0,0.1);">
+            <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 20px;">
+                <h2 style="color: #2c3e50; margin: 0; font-size: 1.5em;">🏢 {debtor}</h2>
+                <span style="background: {badge}; color: white; padding: 8px 20px; border-radius: 20px; font-weight: bold; font-size: 0.9em;">
+                    {status}
+                </span>
+            </div>
+        </div>
+        """.format
+
+_INVESTMENT_SUMMARY = """
+                <div style="background: linear-gradient(135deg, #e8f5e8 0%, #d4edda 100%); padding: 20px; border-radius: 12px; border-left: 5px solid #28a745; margin: 15px 0;">
+                    <h4 style="margin-top: 0; color: #155724; text-align: center;">💎 Your Investment</h4>
+                    <div style="text-align: center;">
+                        <p style="font-size: 1.1em; margin: 8px 0;"><strong>💰 You Pay:</strong> <span style="color: #dc3545;">{pay}</span></p>
+                        <p style="font-size: 1.1em; margin: 8px 0;"><strong>💵 You Get Back:</strong> <span style="color: #28a745;">{get_back}</span></p>
+                        <p style="font-size: 1.2em; margin: 8px 0; font-weight: bold;"><strong>🚀 Your Profit:</strong> <span style="color: #007bff;">{profit} ({roi:.1f}% ROI)</span></p>
+                    </div>
+                </div>
+                """.format
+
+_ALL_OR_NOTHING = """
+            <div style="background: linear-gradient(135deg, #fff3cd 0%, #ffeaa7 100%); padding: 15px; border-radius: 10px; border-left: 5px solid #ffc107; margin: 15px 0;">
+                <h4 style="color: #856404; margin: 0;">⚠️ All-or-Nothing Funding</h4>
+                <p style="color: #856404; margin: 10px 0;">This invoice only activates if <strong>ALL {chunks_total} chunks</strong> are purchased{deadline}.
+                If not fully funded by then, all purchases are voided and refunded automatically.</p>
+            </div>
+            """.format
+
+_ACTIVITY_ITEM = """
+            <div style='padding: 10px; border-left: 3px solid {color}; margin: 5px 0; background-color: #f9f9f9;'>
+                <strong>{emoji} {event}</strong><br>
+                Invoice #{invoice_id} - {debtor}<br>
+                {direction} {amount} on {timestamp}
+            </div>
+            """.format
+
+_TRANSFER_ITEM = """
+        <div style="border-left: 4px solid {color}; padding: 12px; margin: 8px 0; background-color: #f8f9fa; border-radius: 0 8px 8px 0;">
+            <div style="display: flex; justify-content: space-between; align-items: center;">
+                <div>
+                    <strong>{icon} {event}</strong><br>
+                    <small style="color: #6c757d;">{timestamp}</small>
+                </div>
+                <div style="text-align: right;">
+                    <strong style="font-size: 1.1em;">{amount}</strong><br>
+                    <small>{from_party} → {to_party}</small>
+                </div>
+            </div>
+        </div>
+        """.format
+
+STATUS_BADGES = {
+    'Active': "linear-gradient(45deg, #28a745, #20c997)",
+}
+DEFAULT_BADGE = "linear-gradient(45deg, #ffc107, #fd7e14)"
+
+@lru_cache(maxsize=CARD_CACHE_SIZE)
+def invoice_card_html(invoice_id, debtor, amount, sale_price, chunks_total, chunks_sold, status):
+    progress = (chunks_sold / chunks_total) * 100 if chunks_total > 0 else 0
+    return _INVOICE_CARD(
+        debtor=debtor, amount=format_money(amount), sale_price=format_money(sale_price), status=status,
+        progress=progress, chunks_sold=chunks_sold, chunks_total=chunks_total
+    )
+
+@lru_cache(maxsize=CARD_CACHE_SIZE)
+def opportunity_header_html(invoice_id, debtor, status):
+    return _OPPORTUNITY_HEADER(debtor=debtor, status=status, badge=STATUS_BADGES.get(status, DEFAULT_BADGE))
+
+@lru_cache(maxsize=CARD_CACHE_SIZE)
+def investment_summary_html(investment_amount, net_return, net_profit, net_roi):
+    return _INVESTMENT_SUMMARY(
+        pay=format_currency(investment_amount),
+        get_back=format_currency(net_return),
+        profit=format_currency(net_profit),
+        roi=net_roi
+    )
+
+@lru_cache(maxsize=CARD_CACHE_SIZE)
+def all_or_nothing_html(chunks_total, funding_deadline=None):
+    deadline = f" by <strong>{funding_deadline[:16]} UTC</strong>" if funding_deadline else ""
+    return _ALL_OR_NOTHING(chunks_total=format_number(chunks_total), deadline=deadline)
+
+@lru_cache(maxsize=CARD_CACHE_SIZE)
+def activity_item_html(event, timestamp, amount, debtor, invoice_id, received):
+    """One recent-activity entry; `received` is True when money went to the viewing user"""
+    color, emoji, direction = ("green", "💰", "Received") if received else ("red", "💸", "Sent")
+    return _ACTIVITY_ITEM(
+        color=color, emoji=emoji, event=event, invoice_id=invoice_id, debtor=debtor,
+        direction=direction, amount=format_money(amount), timestamp=timestamp
+    )
+
+@lru_cache(maxsize=CARD_CACHE_SIZE)
+def transfer_item_html(event, timestamp, amount, from_party, to_party):
+    # Colour by transfer direction
+    if "PLATFORM OWNER" in to_party:
+        color, icon = "#ff9500", "🏦"  # Orange for platform fees
+    elif "Buyer" in to_party:
+        color, icon = "#28a745", "💰"  # Green for payouts
+    elif "Invoice Owner" in to_party and "Funded" in event:
+        color, icon = "#007bff", "💸"  # Blue for funding
+    else:
+        color, icon = "#6c757d", "📄"  # Gray for other
+    return _TRANSFER_ITEM(
+        color=color, icon=icon, event=event, timestamp=timestamp,
+        amount=format_money(amount), from_party=from_party, to_party=to_party
+    )
+
+def card_cache_info():
+    """Hit/miss counts of every card builder, for benchmarks and debugging"""
+    return {
+        builder.__name__: builder.cache_info()
+        for builder in (invoice_card_html, opportunity_header_html, investment_summary_html,
+                        all_or_nothing_html, activity_item_html, transfer_item_html)
+    }
+
+def render_invoice_card(invoice_id, debtor, amount, sale_price, chunks_total, chunks_sold, status):
+    with st.container():
+        st.markdown(
+            invoice_card_html(invoice_id, debtor, amount, sale_price, chunks_total, chunks_sold, status),
+            unsafe_allow_html=True
+        )
@@ -0,0 +1,94 @@
+import streamlit as st
+from models import market as market_model
+from utils.helpers import format_money
+from utils.money import Money, to_baht
+
+def render_market_panel(conn, invoice_id, user):
+    """Order book and buy form for an Active invoice's secondary market"""
+    st.markdown("#### 🔁 Secondary Market")
+
+    book = market_model.get_order_book(conn, invoice_id)
+    if not book:
+        st.caption("No chunks listed for resale yet")
+        return
+
+    for price, chunks, orders in book:
+        st.markdown(f"**{format_money(price)}**/chunk · {chunks} chunks ({orders} order{'s' if orders > 1 else ''})")
+
+    if not user:
+        return
+
+    available = sum(chunks for _, chunks, _ in book)
+    chunks_to_buy = st.number_input(
+        "Chunks to buy",
+        min_value=1,
+        max_value=available,
+        value=1,
+        key=f"market_chunks_{invoice_id}"
+    )
+    max_price = st.number_input(
+        "Max price per chunk (฿)",
+        min_value=0.0,
+        value=to_baht(book[-1][0]),
+        step=1.0,
+        key=f"market_price_{invoice_id}"
+    )
+
+    if st.button("🔁 Buy from Market", key=f"market_buy_{invoice_id}", use_container_width=True):
+        try:
+            result = market_model.buy_from_market(
+                conn, invoice_id, user['user_id'], int(chunks_to_buy), Money.from_baht(max_price)
+            )
+        except ValueError as e:
+            st.error(f"Error: {str(e)}")
+            return
+
+        if result['filled']:
+            st.session_state.market_message = (
+                f"✅ Bought {result['filled']} chunks for {format_money(result['cost'])}"
+            )
+            st.rerun()
+        else:
+            st.warning("No orders at or below your max price (your own listings are skipped)")
+
+    if st.session_state.get('market_message'):
+        st.success(st.session_state.pop('market_message'))
+
+def render_sell_panel(conn, user_id):
+    """Listing form for a user's Active positions, plus their open orders"""
+    positions = market_model.get_sellable_positions(conn, user_id)
+
+    if positions:
+        options = {
+            f"#{invoice_id} - {debtor} ({held - listed} of {held} chunks free)": (invoice_id, held - listed)
+            for invoice_id, debtor, held, listed in positions
+        }
+        selected = st.selectbox("Position", list(options.keys()), key="sell_position")
+        invoice_id, available = options[selected]
+
+        if available > 0:
+            chunks = st.number_input("Chunks to sell", min_value=1, max_value=available, value=1, key="sell_chunks")
+            price = st.number_input("Price per chunk (฿)", min_value=1.0, value=100.0, step=1.0, key="sell_price")
+
+            if st.button("📤 List for Sale", key="sell_submit", use_container_width=True):
+                try:
+                    market_model.list_chunks(conn, invoice_id, user_id, int(chunks), Money.from_baht(price))
+                    st.rerun()
+                except ValueError as e:
+                    st.error(f"Error: {str(e)}")
+        else:
+            st.info("All chunks of this position are already listed")
+    else:
+        st.info("Only positions in Active invoices can be sold")
+
+    orders = market_model.get_open_orders_by_seller(conn, user_id)
+    if orders:
+        st.markdown("**Your open orders:**")
+        for order_id, invoice_id, debtor, price, listed, remaining, _ in orders:
+            col_a, col_b = st.columns([3, 1])
+            with col_a:
+                st.write(f"#{invoice_id} - {debtor}: {remaining}/{listed} chunks @ {format_money(price)}")
+            with col_b:
+                if st.button("Cancel", key=f"cancel_order_{order_id}"):
+                    market_model.cancel_order(conn, order_id, user_id)
+                    st.rerun()
@@ -0,0 +1,79 @@
+import streamlit as st
+from utils.helpers import format_money
+from utils.settle_invoices import find_settleable_invoices, settle_invoices
+
+def _parse_invoice_ids(text):
+    """Invoice ids from free text ('12, 15 18'); None when empty, ValueError on anything else"""
+    tokens = text.replace(",", " ").split()
+    if not tokens:
+        return None
+    if not all(token.lstrip("#").isdigit() for token in tokens):
+        raise ValueError("Invoice ids must be whole numbers, separated by commas or spaces")
+    return sorted({int(token.lstrip("#")) for token in tokens})
+
+def render_settlement_report(report):
+    """Totals and per-invoice outcomes of a settle_invoices run"""
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("✅ Settled", f"{report['settled']}/{report['invoices']}")
+    with col2:
+        st.metric("💵 Debtor Payments", format_money(report['debtor_paid']))
+    with col3:
+        st.metric("🏦 Platform Fees", format_money(report['platform_fees']))
+    with col4:
+        st.metric("💰 Buyer Payouts", format_money(report['buyer_payouts']))
+    st.caption(
+        f"{report['payouts']} payouts in {report['batches']} batches, {report['seconds']:.2f}s · "
+        f"{report['skipped']} skipped, {report['failed']} failed"
+    )
+    st.dataframe({
+        "#": [outcome['invoice_id'] for outcome in report['outcomes']],
+        "Outcome": [outcome['status'] for outcome in report['outcomes']],
+        "Debtor Paid": [format_money(outcome['debtor_paid']) if 'debtor_paid' in outcome else "-"
+                        for outcome in report['outcomes']],
+        "Fee": [format_money(outcome['platform_fee']) if 'platform_fee' in outcome else "-"
+                for outcome in report['outcomes']],
+        "Payouts": [outcome.get('payouts', 0) for outcome in report['outcomes']],
+        "Note": [outcome.get('message', "") for outcome in report['outcomes']]
+    }, hide_index=True, use_container_width=True)
+
+def render_bulk_settlement(conn):
+    """Settle many Active invoices at once, picked by id or by filter"""
+    report = st.session_state.get('settlement_report')
+    if report:
+        st.markdown("**Last settlement run:**")
+        render_settlement_report(report)
+        if st.button("Dismiss report", key="settlement_dismiss"):
+            st.session_state.settlement_report = None
+            st.rerun()
+        st.markdown("---")
+
+    ids_text = st.text_input("Invoice IDs", placeholder="e.g. 12, 15, 18 (leave empty to use the filters)",
+                             key="settlement_ids")
+    col1, col2 = st.columns(2)
+    with col1:
+        debtor = st.text_input("Debtor name contains", key="settlement_debtor")
+    with col2:
+        due_before = st.date_input("Due on or before", value=None, key="settlement_due_before")
+
+    try:
+        invoice_ids = _parse_invoice_ids(ids_text)
+    except ValueError as e:
+        st.error(str(e))
+        return
+
+    selected = find_settleable_invoices(
+        conn, invoice_ids, debtor.strip() or None, due_before=due_before and due_before.isoformat()
+    )
+    if not selected:
+        st.info("No Active invoices match")
+        return
+
+    st.write(f"**{len(selected)} Active invoice{'s' if len(selected) > 1 else ''} to settle:** "
+             + ", ".join(f"#{invoice_id}" for invoice_id in selected[:20])
+             + (f" and {len(selected) - 20} more" if len(selected) > 20 else ""))
+    confirmed = st.checkbox("The debtors of these invoices have paid", key="settlement_confirm")
+    if st.button(f"💰 Settle {len(selected)} invoices", key="settlement_run", type="primary",
+                 disabled=not confirmed, use_container_width=True):
+        st.session_state.settlement_report = settle_invoices(conn, selected)
+        st.rerun()
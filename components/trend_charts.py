@@ -0,0 +1,48 @@
+import streamlit as st
+from models import ledger_rollup as rollup_model
+from utils.money import to_baht
+
+EVENT_TYPE_LABELS = {
+    'funding': 'Funding',
+    'debtor_payment': 'Debtor Payments',
+    'platform_fee': 'Platform Fees',
+    'buyer_payout': 'Buyer Payouts',
+    'owner_remainder': 'Owner Remainder',
+    'market_sale': 'Market Sales',
+    'refund': 'Refunds',
+    'rounding_adjustment': 'Rounding Adjustments',
+    'other': 'Other'
+}
+
+def _chart_data(rows):
+    """Turn rollup rows into long-format chart data keyed by event type"""
+    data = {"Period": [], "Event": [], "Amount (฿)": []}
+    for period, event_type, _, _, total_amount in rows:
+        data["Period"].append(period)
+        data["Event"].append(EVENT_TYPE_LABELS.get(event_type, event_type))
+        data["Amount (฿)"].append(to_baht(total_amount))
+    return data
+
+def render_volume_chart(conn, bucket="day", periods=90, event_types=None):
+    """Bar chart of ledger volume per period, split by event type"""
+    rows = rollup_model.get_rollups(conn, bucket, periods, event_types)
+    
+    if not rows:
+        st.info("No ledger activity in this period yet")
+        return
+    
+    st.bar_chart(_chart_data(rows), x="Period", y="Amount (฿)", color="Event")
+
+def render_earnings_chart(conn, bucket="month", periods=12):
+    """Bar chart of platform fee earnings per period"""
+    rows = rollup_model.get_rollups(conn, bucket, periods, ["platform_fee"], "platform")
+    
+    if not rows:
+        st.info("No platform earnings in this period yet")
+        return
+    
+    data = {
+        "Period": [row[0] for row in rows],
+        "Earnings (฿)": [to_baht(row[4]) for row in rows]
+    }
+    st.bar_chart(data, x="Period", y="Earnings (฿)")
@@ -0,0 +1,64 @@
+import streamlit as st
+from models import user as user_model
+from config import USER_PICKER_LIMIT, USER_PICKER_RECENT
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _cached_newest_users(latest_user_id, _conn, limit):
+    """Newest users, shared across sessions and reloaded once a new user is created"""
+    return user_model.get_newest_users(_conn, limit)
+
+def _remember_user(user):
+    """Move a user to the front of this session's recent-users list"""
+    recent = [u for u in st.session_state.get('recent_users', []) if u['user_id'] != user['user_id']]
+    st.session_state.recent_users = [user] + recent[:USER_PICKER_RECENT - 1]
+
+def render_user_picker(conn):
+    """
+    Active-user picker for the top navigation.
+    Only the current user, recent users and up to USER_PICKER_LIMIT prefix matches
+    are loaded, so rendering cost does not grow with the number of users.
+    """
+    search = st.text_input(
+        "🔍 Find user",
+        key="top_user_search",
+        placeholder="Type the start of a username",
+        label_visibility="collapsed"
+    ).strip()
+
+    if search:
+        matches = user_model.search_users(conn, search, USER_PICKER_LIMIT)
+    else:
+        matches = _cached_newest_users(user_model.get_latest_user_id(conn), conn, USER_PICKER_LIMIT)
+
+    # Candidate users keyed by ID, in display order
+    candidates = {}
+    current_user = st.session_state.selected_user
+    if current_user:
+        candidates[current_user['user_id']] = current_user
+    for user in st.session_state.get('recent_users', []):
+        candidates.setdefault(user['user_id'], user)
+    for user in matches:
+        candidates.setdefault(user.user_id, {"user_id": user.user_id, "username": user.username})
+
+    if not candidates:
+        st.caption("No users found")
+        return
+
+    options = [None] + list(candidates.keys())
+    current_id = current_user['user_id'] if current_user else None
+
+    selected_id = st.selectbox(
+        "👤 Active User:",
+        options=options,
+        index=options.index(current_id),
+        format_func=lambda user_id: "None" if user_id is None else
+            f"{candidates[user_id]['username']} (ID: {user_id})",
+        key="top_user_selector"
+    )
+
+    if selected_id is not None and selected_id != current_id:
+        st.session_state.selected_user = candidates[selected_id]
+        _remember_user(candidates[selected_id])
+        st.rerun()
+    elif selected_id is None:
+        st.session_state.selected_user = None
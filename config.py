@@ -1,3 +1,56 @@
 # config.py
 CHUNK_SIZE = 100
-DB_PATH = "invoice.db"
\ No newline at end of file
+DB_PATH = "invoice.db"
+
+# Top navigation user picker: search results and recent users shown
+USER_PICKER_LIMIT = 20
+USER_PICKER_RECENT = 5
+
+# Monte Carlo risk simulation (see utils/risk_engine.py)
+RISK_SCENARIOS = 5000
+RISK_DEFAULT_PROBABILITY = 0.03    # chance a debtor never pays
+RISK_RECOVERY_RATE = 0.40          # share of the payout recovered on default
+RISK_LATE_PROBABILITY = 0.20       # chance a paying debtor pays late
+RISK_LATE_MEAN_DAYS = 30           # mean delay of a late payment
+RISK_COST_OF_CAPITAL = 0.06        # annual cost of capital tied up by delays
+RISK_POOL_MIN_POSITIONS = 50000    # use a process pool from this many positions
+RISK_SCENARIO_BATCH = 1000         # scenarios generated per vectorized batch
+
+# Archival of settled invoices (see utils/archive_invoices.py)
+ARCHIVE_DB_PATH = "invoice_archive.db"
+ARCHIVE_AFTER_DAYS = 90
+
+# Rows per page in the compact grid views (see components/data_grid.py)
+GRID_PAGE_SIZE = 50
+
+# Memoized HTML fragments per card builder (see components/invoice_card.py)
+CARD_CACHE_SIZE = 4096
+
+# Seconds between refreshes of the live Recent Activity panels
+ACTIVITY_POLL_SECONDS = 10
+
+# Per-buyer concentration limits in ฿ of chunk principal; None disables a limit
+# (see models/buyer_limits.py)
+BUYER_LIMIT_PER_INVOICE = None
+BUYER_LIMIT_PER_DEBTOR = None
+BUYER_LIMIT_OPEN_TOTAL = None
+
+# Funding deadline for new invoices and the expiry sweeper (see utils/expire_invoices.py)
+FUNDING_WINDOW_DAYS = 14
+EXPIRY_SWEEP_BATCH = 100           # expired invoices picked up per sweep query
+EXPIRY_SWEEP_INTERVAL = 60         # seconds between sweeps when run with --loop
+
+# Invoices one basket purchase may buy into, all in one write transaction
+# (see models/transaction.py purchase_basket)
+BASKET_MAX_LINES = 50
+
+# Invoices settled per write transaction by the bulk settlement run (see utils/settle_invoices.py)
+SETTLEMENT_BATCH = 50
+
+# Sampling profiler for page renders (see utils/profiler.py), enabled by setting the
+# environment variable to 1, "speedscope" or "collapsed", or per session with ?profile=1
+PROFILER_ENV_VAR = "INVOICE_PROFILE"
+PROFILER_QUERY_PARAM = "profile"
+PROFILER_INTERVAL = 0.005          # seconds between stack samples
+PROFILER_DIR = "profiles"
+PROFILER_FORMAT = "speedscope"     # default output: "speedscope" or "collapsed"
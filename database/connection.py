@@ -0,0 +1,53 @@
+# database/connection.py
+
+import sqlite3
+import threading
+from contextlib import contextmanager, nullcontext
+
+class SharedConnection(sqlite3.Connection):
+    """
+    A connection shared by several threads, like the app's one connection for
+    every Streamlit session. SQLite transactions belong to the connection, not
+    the thread, so transactions on it are serialized by `lock`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lock = threading.RLock()
+
+def connect_shared(path):
+    """Open `path` for use from several threads (see SharedConnection)"""
+    return sqlite3.connect(path, check_same_thread=False, factory=SharedConnection)
+
+def transaction_lock(conn):
+    """The lock to hold around a transaction on `conn`; a no-op for single-thread connections"""
+    return getattr(conn, 'lock', None) or nullcontext()
+
+def begin_write(conn):
+    """
+    Open a write transaction with BEGIN IMMEDIATE, so the write lock is taken
+    before anything is read and concurrent purchases, fills, sweeps and
+    settlements queue instead of interleaving. Raises ValueError if the
+    connection is already inside a transaction: committing or rolling back
+    work this caller didn't start would be wrong either way.
+    """
+    if conn.in_transaction:
+        raise ValueError("The database is busy with another change; please try again")
+    conn.execute("BEGIN IMMEDIATE")
+
+@contextmanager
+def write_transaction(conn):
+    """
+    One write transaction around the `with` block, yielding a cursor: begun with
+    begin_write while holding the connection's transaction_lock, committed when
+    the block ends and rolled back if it raises. The block may end the
+    transaction itself, e.g. roll back a rejected purchase.
+    """
+    with transaction_lock(conn):
+        begin_write(conn)
+        try:
+            yield conn.cursor()
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
@@ -1,14 +1,214 @@
 import sqlite3
 import os
+from config import FUNDING_WINDOW_DAYS
+from models.cash_transfer import classify_transfers
+from models.debtor import assign_debtors, rebuild_debtor_totals
+from models.buyer_limits import rebuild_buyer_exposure
+from models.invoice import assign_due_dates, clear_unreadable_due_dates
+from models.portfolio import rebuild_positions
+from utils.money import SATANG_COLUMNS, SATANG_SCHEMA_VERSION, convert_table_to_satang
+
+SCHEMA_PATH = "database/schema.sql"
+
+# Columns added to tables that already exist in older databases: (table, column, declaration).
+# Brand new tables, views, indexes and triggers only need to be added to schema.sql.
+ADDED_COLUMNS = [
+    ("users", "is_system", "INTEGER NOT NULL DEFAULT 0"),
+    ("transactions", "market_order_id", "INTEGER"),
+    ("cash_transfers", "event_type", "TEXT NOT NULL DEFAULT 'other'"),
+    ("cash_transfers", "event_chunks", "INTEGER"),
+    ("cash_transfers", "event_rate", "INTEGER"),
+    ("cash_transfers", "event_profit", "INTEGER"),
+    ("invoices", "debtor_id", "INTEGER REFERENCES debtors(debtor_id)"),
+    ("invoices", "funding_deadline", "DATETIME"),
+    ("invoices", "due_date", "DATE"),
+    ("invoices", "days_to_due", "INTEGER"),
+]
+
+def _backfill_ledger_rollups(conn):
+    """Rebuild ledger_rollups from the transfers written before the rollup trigger existed"""
+    conn.execute("DELETE FROM ledger_rollups")
+    conn.execute("""
+        INSERT INTO ledger_rollups (bucket, period, event_type, party_role, transfer_count, total_amount)
+        SELECT
+            b.bucket,
+            CASE b.bucket WHEN 'day' THEN date(c.event_timestamp) ELSE strftime('%Y-%m', c.event_timestamp) END AS period,
+            c.event_type,
+            c.party_role,
+            COUNT(*),
+            SUM(c.amount)
+        FROM cash_transfer_classes c, (SELECT 'day' AS bucket UNION ALL SELECT 'month') b
+        GROUP BY b.bucket, period, c.event_type, c.party_role
+    """)
+
+def _backfill_system_accounts(conn):
+    """Flag the platform owner created by older versions as a system account"""
+    conn.execute("UPDATE users SET is_system = 1 WHERE username = 'PLATFORM OWNER'")
+
+def _backfill_event_types(conn):
+    """Parse event codes out of older descriptions; rollups were bucketed on the text, so rebuild them"""
+    classify_transfers(conn)
+    _backfill_ledger_rollups(conn)
+
+def _backfill_debtors(conn):
+    """Create debtors from existing debtor names; the invoice triggers fill in their aggregates"""
+    assign_debtors(conn)
+
+def _backfill_buyer_exposure(conn):
+    """Per-buyer open exposure for positions bought before the exposure triggers existed"""
+    rebuild_buyer_exposure(conn)
+
+def _backfill_funding_deadlines(conn):
+    """Give invoices already raising funds a full window from now rather than expiring them on upgrade"""
+    conn.execute("""
+        UPDATE invoices SET funding_deadline = datetime('now', ?)
+        WHERE status = 'Pending' AND funding_deadline IS NULL
+    """, (f"+{FUNDING_WINDOW_DAYS} days",))
+
+def _backfill_due_dates(conn):
+    """Parse due dates out of the payment terms of existing invoices"""
+    assign_due_dates(conn)
+
+def _backfill_unambiguous_due_dates(conn):
+    """Numeric dates that read both day and month first no longer parse; drop the due dates guessed from them"""
+    clear_unreadable_due_dates(conn)
+
+def _backfill_positions(conn):
+    """Net existing transactions into positions; per-invoice exposure moved there, so rebuild it too"""
+    rebuild_positions(conn)
+    rebuild_buyer_exposure(conn)
+
+def _backfill_settlement_rounding(conn):
+    """
+    Book the satang each converted settlement lost or gained when its REAL rows
+    were rounded one by one (e.g. ฿1,000.01 paid out as three ฿330.003 payouts
+    and a ฿10.001 fee), so the ledger balances exactly. Only differences of up to
+    a satang per converted row are treated as rounding; larger imbalances are
+    left for the reconciler to report.
+    """
+    conn.execute("""
+        INSERT INTO cash_transfers (
+            invoice_id, event_timestamp, event_description, amount, from_party, to_party, event_type
+        )
+        SELECT s.invoice_id, s.settled_at, '', s.debtor_paid - s.distributed,
+               'Settlement Rounding', 'Invoice Owner (User ' || i.owner_user_id || ')', 'rounding_adjustment'
+        FROM (
+            SELECT
+                invoice_id,
+                MAX(event_timestamp) AS settled_at,
+                COUNT(*) AS settlement_rows,
+                SUM(CASE WHEN event_type = 'debtor_payment' THEN amount ELSE 0 END) AS debtor_paid,
+                SUM(CASE WHEN event_type != 'debtor_payment' THEN amount ELSE 0 END) AS distributed
+            FROM cash_transfers
+            WHERE event_type IN ('debtor_payment', 'platform_fee', 'buyer_payout', 'owner_remainder')
+            GROUP BY invoice_id
+        ) s
+        JOIN invoices i ON i.invoice_id = s.invoice_id
+        WHERE i.status = 'Paid'
+          AND s.debtor_paid = i.original_amount
+          AND s.distributed != s.debtor_paid
+          AND ABS(s.distributed - s.debtor_paid) <= s.settlement_rows
+    """)
+
+def _backfill_satang_totals(conn):
+    """Re-add aggregates from the converted satang rows, so they match what the triggers will add and subtract"""
+    rebuild_debtor_totals(conn)
+    _backfill_ledger_rollups(conn)
+
+# Data backfills, run once for databases older than the version that introduced them
+BACKFILLS = [
+    (1, _backfill_ledger_rollups),
+    (3, _backfill_system_accounts),
+    (6, _backfill_event_types),
+    (7, _backfill_debtors),
+    (8, _backfill_buyer_exposure),
+    (9, _backfill_funding_deadlines),
+    (10, _backfill_due_dates),
+    (11, _backfill_positions),
+    (SATANG_SCHEMA_VERSION, _backfill_settlement_rounding),
+    (SATANG_SCHEMA_VERSION, _backfill_satang_totals),
+    (13, _backfill_unambiguous_due_dates),
+]
+
+SCHEMA_VERSION = 13
+
+def migrate_db(conn):
+    """
+    Bring a database up to SCHEMA_VERSION.
+    Adds missing columns, (re)creates schema objects from schema.sql and runs pending backfills.
+    Safe to call on every startup.
+    """
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA user_version")
+    current_version = cursor.fetchone()[0]
+
+    if current_version >= SCHEMA_VERSION:
+        return
+
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    existing_tables = {row[0] for row in cursor.fetchall()}
+    is_new_database = "invoices" not in existing_tables
+
+    for table, column, declaration in ADDED_COLUMNS:
+        if table not in existing_tables:
+            continue
+        cursor.execute(f"PRAGMA table_info({table})")
+        if column not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+    # Views and triggers hold no data, so always recreate them from the current schema
+    cursor.execute("SELECT type, name FROM sqlite_master WHERE type IN ('view', 'trigger')")
+    for object_type, name in cursor.fetchall():
+        cursor.execute(f"DROP {object_type.upper()} IF EXISTS {name}")
+
+    # Money moved from REAL baht to INTEGER satang; the tables are rebuilt before
+    # schema.sql runs so it recreates their indexes
+    if not is_new_database and current_version < SATANG_SCHEMA_VERSION:
+        for table in SATANG_COLUMNS:
+            if table in existing_tables:
+                convert_table_to_satang(cursor, table)
+
+    with open(SCHEMA_PATH, "r") as f:
+        cursor.executescript(f.read())
+
+    if not is_new_database:
+        for version, backfill in BACKFILLS:
+            if version > current_version:
+                backfill(conn)
+
+    cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.commit()
 
 def init_db():
-    if not os.path.exists("invoice.db"):
-        conn = sqlite3.connect("invoice.db")
-        with open("database/schema.sql", "r") as f:
-            conn.executescript(f.read())
+    database_exists = os.path.exists("invoice.db")
+    
+    conn = sqlite3.connect("invoice.db")
+    migrate_db(conn)
+    conn.close()
+    
+    if not database_exists:
         print("Database initialized successfully")
     else:
         print("Database already exists")
 
 if __name__ == "__main__":
-    init_db()
\ No newline at end of file
+    # --check reconciles the ledger after migrating and exits non-zero on any violation,
+    # so an upgrade can be verified before the app is restarted on it:
+    #   python -m database.init_db --check
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Create or upgrade invoice.db")
+    parser.add_argument("--check", action="store_true", help="Reconcile the ledger after migrating")
+    args = parser.parse_args()
+
+    init_db()
+    if args.check:
+        from utils.reconcile_ledger import reconcile_ledger
+        conn = sqlite3.connect("invoice.db")
+        report = reconcile_ledger(conn)
+        conn.close()
+        violations = {check: count for check, count in report['discrepancies'].items() if count}
+        print(f"Reconciled {report['invoices_checked']} invoices: "
+              + (", ".join(f"{check} {count}" for check, count in violations.items()) or "no violations"))
+        sys.exit(1 if violations else 0)
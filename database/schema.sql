@@ -1,40 +1,305 @@
 -- schema.sql
-CREATE TABLE users (
+-- Money columns hold integer satang (฿1 = 100 satang); see utils/money.py
+CREATE TABLE IF NOT EXISTS users (
     user_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    username TEXT NOT NULL UNIQUE
+    username TEXT NOT NULL UNIQUE,
+    is_system INTEGER NOT NULL DEFAULT 0
 );
 
-CREATE TABLE invoices (
+-- One row per debtor, keyed by normalized name (see models/debtor.py).
+-- The aggregates are maintained by the trg_invoices_debtor_* triggers below.
+CREATE TABLE IF NOT EXISTS debtors (
+    debtor_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    normalized_name TEXT NOT NULL UNIQUE,
+    invoice_count INTEGER NOT NULL DEFAULT 0,
+    open_invoice_count INTEGER NOT NULL DEFAULT 0,
+    open_amount INTEGER NOT NULL DEFAULT 0,
+    funded_amount INTEGER NOT NULL DEFAULT 0,
+    paid_invoice_count INTEGER NOT NULL DEFAULT 0,
+    paid_amount INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS invoices (
     invoice_id INTEGER PRIMARY KEY AUTOINCREMENT,
     owner_user_id INTEGER NOT NULL,
     debtor_name TEXT NOT NULL,
-    original_amount REAL NOT NULL,
+    original_amount INTEGER NOT NULL,
     payment_terms TEXT,
-    desired_sale_price REAL NOT NULL,
+    desired_sale_price INTEGER NOT NULL,
     chunks_total INTEGER NOT NULL,
     chunks_sold INTEGER DEFAULT 0,
     status TEXT DEFAULT 'Pending',
+    debtor_id INTEGER REFERENCES debtors(debtor_id),
+    funding_deadline DATETIME,
+    -- Parsed from payment_terms at creation; days_to_due is the term length from issue to due date
+    due_date DATE,
+    days_to_due INTEGER,
     FOREIGN KEY (owner_user_id) REFERENCES users(user_id)
 );
 
-CREATE TABLE transactions (
+CREATE TABLE IF NOT EXISTS transactions (
     transaction_id INTEGER PRIMARY KEY AUTOINCREMENT,
     invoice_id INTEGER NOT NULL,
     buyer_user_id INTEGER NOT NULL,
     chunks_purchased INTEGER NOT NULL,
     purchase_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
     status TEXT DEFAULT 'Pending Activation',
+    market_order_id INTEGER,
     FOREIGN KEY (invoice_id) REFERENCES invoices(invoice_id),
     FOREIGN KEY (buyer_user_id) REFERENCES users(user_id)
 );
 
-CREATE TABLE cash_transfers (
+CREATE TABLE IF NOT EXISTS cash_transfers (
     transfer_id INTEGER PRIMARY KEY AUTOINCREMENT,
     invoice_id INTEGER NOT NULL,
     event_description TEXT NOT NULL,
     event_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-    amount REAL NOT NULL,
+    amount INTEGER NOT NULL,
     from_party TEXT NOT NULL,
     to_party TEXT NOT NULL,
+    event_type TEXT NOT NULL DEFAULT 'other',
+    event_chunks INTEGER,
+    event_rate INTEGER,
+    event_profit INTEGER,
     FOREIGN KEY (invoice_id) REFERENCES invoices(invoice_id)
-);
\ No newline at end of file
+);
+
+-- Secondary market sell orders (see models/market.py)
+CREATE TABLE IF NOT EXISTS market_orders (
+    order_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    invoice_id INTEGER NOT NULL,
+    seller_user_id INTEGER NOT NULL,
+    price_per_chunk INTEGER NOT NULL,
+    chunks_listed INTEGER NOT NULL,
+    chunks_remaining INTEGER NOT NULL,
+    status TEXT DEFAULT 'Open',
+    created_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (invoice_id) REFERENCES invoices(invoice_id),
+    FOREIGN KEY (seller_user_id) REFERENCES users(user_id)
+);
+
+-- Order book: open orders per invoice in price-time priority
+CREATE INDEX IF NOT EXISTS idx_market_orders_book
+    ON market_orders(invoice_id, price_per_chunk, order_id) WHERE status = 'Open';
+CREATE INDEX IF NOT EXISTS idx_market_orders_seller ON market_orders(seller_user_id, status);
+
+CREATE INDEX IF NOT EXISTS idx_transactions_invoice ON transactions(invoice_id);
+-- A buyer's transaction history (user management counts, rebuilding positions)
+CREATE INDEX IF NOT EXISTS idx_transactions_buyer_position
+    ON transactions(buyer_user_id, invoice_id, status, chunks_purchased);
+CREATE INDEX IF NOT EXISTS idx_invoices_debtor ON invoices(debtor_id);
+-- Expiry sweeper: Pending invoices in deadline order (see utils/expire_invoices.py)
+CREATE INDEX IF NOT EXISTS idx_invoices_funding_deadline
+    ON invoices(funding_deadline) WHERE status = 'Pending';
+-- Due dates parsed from payment_terms (utils/payment_terms.py): Browse timeline
+-- filter and the owner cash-flow view
+CREATE INDEX IF NOT EXISTS idx_invoices_due_date ON invoices(due_date);
+CREATE INDEX IF NOT EXISTS idx_invoices_owner_due ON invoices(owner_user_id, due_date);
+-- Debtor Exposure panel: largest open exposure first
+CREATE INDEX IF NOT EXISTS idx_debtors_open_amount ON debtors(open_amount);
+CREATE INDEX IF NOT EXISTS idx_cash_transfers_invoice ON cash_transfers(invoice_id);
+CREATE INDEX IF NOT EXISTS idx_cash_transfers_to_party ON cash_transfers(to_party);
+-- Event filter on the Cash Transfers page (codes: see models/cash_transfer.py)
+CREATE INDEX IF NOT EXISTS idx_cash_transfers_event_type ON cash_transfers(event_type, invoice_id);
+
+-- System accounts (e.g. PLATFORM OWNER) are filtered out of user lists by is_system
+CREATE INDEX IF NOT EXISTS idx_users_is_system ON users(is_system, username);
+CREATE INDEX IF NOT EXISTS idx_users_search ON users(is_system, username COLLATE NOCASE);
+
+-- One row per (invoice, buyer): net chunks held across every purchase and secondary-market
+-- fill, maintained by trg_transactions_position. transactions stays the audit trail; settlement,
+-- refunds, holdings, the portfolio and per-invoice purchase limits read this table.
+CREATE TABLE IF NOT EXISTS positions (
+    invoice_id INTEGER NOT NULL REFERENCES invoices(invoice_id),
+    buyer_user_id INTEGER NOT NULL REFERENCES users(user_id),
+    chunks INTEGER NOT NULL DEFAULT 0,
+    purchases INTEGER NOT NULL DEFAULT 0,
+    first_purchase DATETIME,
+    last_purchase DATETIME,
+    PRIMARY KEY (invoice_id, buyer_user_id)
+) WITHOUT ROWID;
+-- Investor portfolio, most recent purchase first (models/portfolio.py)
+CREATE INDEX IF NOT EXISTS idx_positions_buyer ON positions(buyer_user_id, last_purchase);
+
+-- Yield accrued by each Active position as of the last accrual run (utils/accrue_yield.py),
+-- replaced wholesale by every run; the portfolio reads it alongside positions.
+CREATE TABLE IF NOT EXISTS position_accruals (
+    buyer_user_id INTEGER NOT NULL,
+    invoice_id INTEGER NOT NULL,
+    accrual_date DATE NOT NULL,
+    chunks INTEGER NOT NULL,
+    expected_profit INTEGER NOT NULL,
+    accrued INTEGER NOT NULL,
+    PRIMARY KEY (buyer_user_id, invoice_id)
+) WITHOUT ROWID;
+
+-- One row per day the accrual job has completed, with platform-wide totals;
+-- the job restarts from the day after the latest row.
+CREATE TABLE IF NOT EXISTS accrual_days (
+    accrual_date DATE PRIMARY KEY,
+    positions INTEGER NOT NULL,
+    chunks INTEGER NOT NULL,
+    accrued INTEGER NOT NULL,
+    completed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Open chunks each buyer holds per debtor and in total ('total', 0), counting only open
+-- (not Paid or Expired) invoices; the per-invoice figure is the buyer's positions row.
+-- Maintained by trg_transactions_buyer_exposure and trg_invoices_buyer_exposure_closed;
+-- read by the purchase limits in models/buyer_limits.py.
+CREATE TABLE IF NOT EXISTS buyer_exposure (
+    buyer_user_id INTEGER NOT NULL,
+    scope TEXT NOT NULL,
+    scope_id INTEGER NOT NULL,
+    open_chunks INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (buyer_user_id, scope, scope_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_buyer_exposure_scope ON buyer_exposure(scope, scope_id);
+
+-- Per-day and per-month ledger aggregates, maintained by trg_cash_transfers_rollup
+CREATE TABLE IF NOT EXISTS ledger_rollups (
+    bucket TEXT NOT NULL,
+    period TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    party_role TEXT NOT NULL,
+    transfer_count INTEGER NOT NULL DEFAULT 0,
+    total_amount INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket, period, event_type, party_role)
+);
+
+-- Event type and receiving party role of every cash transfer
+CREATE VIEW IF NOT EXISTS cash_transfer_classes AS
+SELECT
+    transfer_id,
+    invoice_id,
+    event_timestamp,
+    amount,
+    event_type,
+    CASE
+        WHEN to_party LIKE 'PLATFORM OWNER%' THEN 'platform'
+        WHEN to_party LIKE 'Buyer%' THEN 'buyer'
+        WHEN to_party LIKE 'Invoice Owner%' THEN 'owner'
+        ELSE 'other'
+    END AS party_role
+FROM cash_transfers;
+
+CREATE TRIGGER IF NOT EXISTS trg_cash_transfers_rollup
+AFTER INSERT ON cash_transfers
+BEGIN
+    INSERT INTO ledger_rollups (bucket, period, event_type, party_role, transfer_count, total_amount)
+    SELECT
+        b.bucket,
+        CASE b.bucket WHEN 'day' THEN date(c.event_timestamp) ELSE strftime('%Y-%m', c.event_timestamp) END,
+        c.event_type,
+        c.party_role,
+        1,
+        c.amount
+    FROM cash_transfer_classes c, (SELECT 'day' AS bucket UNION ALL SELECT 'month') b
+    WHERE c.transfer_id = NEW.transfer_id
+    ON CONFLICT (bucket, period, event_type, party_role) DO UPDATE SET
+        transfer_count = transfer_count + excluded.transfer_count,
+        total_amount = total_amount + excluded.total_amount;
+END;
+
+-- Debtor aggregates. An invoice contributes to open_* until it is Paid (then to
+-- paid_*) or Expired (then only to invoice_count); funded_amount is the buyer
+-- capital (chunks_sold * 10000 satang) still out.
+CREATE TRIGGER IF NOT EXISTS trg_invoices_debtor_insert
+AFTER INSERT ON invoices
+WHEN NEW.debtor_id IS NOT NULL
+BEGIN
+    UPDATE debtors SET
+        invoice_count = invoice_count + 1,
+        open_invoice_count = open_invoice_count + (NEW.status NOT IN ('Paid', 'Expired')),
+        open_amount = open_amount + CASE WHEN NEW.status NOT IN ('Paid', 'Expired') THEN NEW.original_amount ELSE 0 END,
+        funded_amount = funded_amount + CASE WHEN NEW.status NOT IN ('Paid', 'Expired') THEN NEW.chunks_sold * 10000 ELSE 0 END,
+        paid_invoice_count = paid_invoice_count + (NEW.status = 'Paid'),
+        paid_amount = paid_amount + CASE WHEN NEW.status = 'Paid' THEN NEW.original_amount ELSE 0 END
+    WHERE debtor_id = NEW.debtor_id;
+END;
+
+-- Funding (chunks_sold), settlement (status) and debtor assignment: take the old
+-- contribution off the old debtor, then add the new one
+CREATE TRIGGER IF NOT EXISTS trg_invoices_debtor_update
+AFTER UPDATE OF debtor_id, status, chunks_sold, original_amount ON invoices
+WHEN OLD.debtor_id IS NOT NULL OR NEW.debtor_id IS NOT NULL
+BEGIN
+    UPDATE debtors SET
+        invoice_count = invoice_count - 1,
+        open_invoice_count = open_invoice_count - (OLD.status NOT IN ('Paid', 'Expired')),
+        open_amount = open_amount - CASE WHEN OLD.status NOT IN ('Paid', 'Expired') THEN OLD.original_amount ELSE 0 END,
+        funded_amount = funded_amount - CASE WHEN OLD.status NOT IN ('Paid', 'Expired') THEN OLD.chunks_sold * 10000 ELSE 0 END,
+        paid_invoice_count = paid_invoice_count - (OLD.status = 'Paid'),
+        paid_amount = paid_amount - CASE WHEN OLD.status = 'Paid' THEN OLD.original_amount ELSE 0 END
+    WHERE debtor_id = OLD.debtor_id;
+    UPDATE debtors SET
+        invoice_count = invoice_count + 1,
+        open_invoice_count = open_invoice_count + (NEW.status NOT IN ('Paid', 'Expired')),
+        open_amount = open_amount + CASE WHEN NEW.status NOT IN ('Paid', 'Expired') THEN NEW.original_amount ELSE 0 END,
+        funded_amount = funded_amount + CASE WHEN NEW.status NOT IN ('Paid', 'Expired') THEN NEW.chunks_sold * 10000 ELSE 0 END,
+        paid_invoice_count = paid_invoice_count + (NEW.status = 'Paid'),
+        paid_amount = paid_amount + CASE WHEN NEW.status = 'Paid' THEN NEW.original_amount ELSE 0 END
+    WHERE debtor_id = NEW.debtor_id;
+END;
+
+-- Archiving deletes settled invoices from main; counts and paid volume are
+-- lifetime history, so only the open side is taken back
+CREATE TRIGGER IF NOT EXISTS trg_invoices_debtor_delete
+AFTER DELETE ON invoices
+WHEN OLD.debtor_id IS NOT NULL AND OLD.status NOT IN ('Paid', 'Expired')
+BEGIN
+    UPDATE debtors SET
+        open_invoice_count = open_invoice_count - 1,
+        open_amount = open_amount - OLD.original_amount,
+        funded_amount = funded_amount - OLD.chunks_sold * 10000
+    WHERE debtor_id = OLD.debtor_id;
+END;
+
+-- Positions: every purchase or market fill moves the buyer's row for the invoice;
+-- sales (negative rows) reduce the chunks without counting as a purchase
+CREATE TRIGGER IF NOT EXISTS trg_transactions_position
+AFTER INSERT ON transactions
+BEGIN
+    INSERT INTO positions (invoice_id, buyer_user_id, chunks, purchases, first_purchase, last_purchase)
+    VALUES (
+        NEW.invoice_id, NEW.buyer_user_id, NEW.chunks_purchased, NEW.chunks_purchased > 0,
+        NEW.purchase_timestamp, NEW.purchase_timestamp
+    )
+    ON CONFLICT (invoice_id, buyer_user_id) DO UPDATE SET
+        chunks = chunks + excluded.chunks,
+        purchases = purchases + excluded.purchases,
+        last_purchase = CASE WHEN excluded.purchases > 0 THEN excluded.last_purchase ELSE last_purchase END;
+END;
+
+-- Buyer exposure: every position change on an unpaid invoice (purchases, market fills)
+CREATE TRIGGER IF NOT EXISTS trg_transactions_buyer_exposure
+AFTER INSERT ON transactions
+BEGIN
+    INSERT INTO buyer_exposure (buyer_user_id, scope, scope_id, open_chunks)
+    SELECT
+        NEW.buyer_user_id,
+        s.scope,
+        CASE s.scope WHEN 'debtor' THEN i.debtor_id ELSE 0 END,
+        NEW.chunks_purchased
+    FROM invoices i, (SELECT 'debtor' AS scope UNION ALL SELECT 'total') s
+    WHERE i.invoice_id = NEW.invoice_id
+      AND i.status NOT IN ('Paid', 'Expired')
+      AND (s.scope != 'debtor' OR i.debtor_id IS NOT NULL)
+    ON CONFLICT (buyer_user_id, scope, scope_id) DO UPDATE SET
+        open_chunks = open_chunks + excluded.open_chunks;
+END;
+
+-- Settlement or expiry closes the invoice's positions: take them off each holder's debtor and total exposure
+CREATE TRIGGER IF NOT EXISTS trg_invoices_buyer_exposure_closed
+AFTER UPDATE OF status ON invoices
+WHEN NEW.status IN ('Paid', 'Expired') AND OLD.status NOT IN ('Paid', 'Expired')
+BEGIN
+    UPDATE buyer_exposure
+    SET open_chunks = open_chunks - (
+        SELECT p.chunks FROM positions p
+        WHERE p.invoice_id = NEW.invoice_id AND p.buyer_user_id = buyer_exposure.buyer_user_id
+    )
+    WHERE ((scope = 'total' AND scope_id = 0) OR (scope = 'debtor' AND scope_id = NEW.debtor_id))
+      AND buyer_user_id IN (SELECT buyer_user_id FROM positions WHERE invoice_id = NEW.invoice_id);
+END;
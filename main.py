@@ -1,5 +1,4 @@
 import streamlit as st
-import sqlite3
 import os
 
 # Set page config FIRST - before any other Streamlit commands
@@ -7,7 +6,12 @@ st.set_page_config(page_title="Poor Mans Refactoring", initial_sidebar_state="co
 
 # Now import pages and other modules
 from pages import browse_invoices, home, create_invoice, dashboard, user_management, cash_transfers_page
-from database.init_db import init_db
+from database.init_db import init_db, migrate_db
+from database.connection import connect_shared, write_transaction
+from utils.system_accounts import get_platform_owner_id
+from components.user_picker import render_user_picker
+from utils.data_loader import begin_rerun, get_loader
+from utils.profiler import PageProfile
 
 # Initialize database if not exists (without displaying messages during initial load)
 DB_PATH = "invoice.db"
@@ -31,22 +35,19 @@ def init_navigation():
     if 'current_page' not in st.session_state:
         st.session_state.current_page = 'Home'
 
-# Database connection
+# Database connection, shared by every session; transactions on it are serialized
 @st.cache_resource
 def get_connection():
-    return sqlite3.connect("invoice.db", check_same_thread=False)
+    connection = connect_shared("invoice.db")
+    # Upgrade databases created by older versions of the app
+    migrate_db(connection)
+    return connection
 
 conn = get_connection()
 
-# Ensure PLATFORM OWNER exists
-def ensure_platform_owner():
-    cursor = conn.cursor()
-    cursor.execute("SELECT user_id FROM users WHERE username = 'PLATFORM OWNER'")
-    if not cursor.fetchone():
-        cursor.execute("INSERT INTO users (username) VALUES ('PLATFORM OWNER')")
-        conn.commit()
-
-ensure_platform_owner()
+# Ensure PLATFORM OWNER exists (resolved once per process, then cached)
+with write_transaction(conn):
+    get_platform_owner_id(conn)
 
 # Session state initialization
 if "selected_user" not in st.session_state:
@@ -102,42 +103,11 @@ def create_top_navigation():
     
     with header_col2:
         # User selection in the center
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT user_id, username 
-            FROM users 
-            WHERE username != 'PLATFORM OWNER'
-            ORDER BY username
-        """)
-        users = cursor.fetchall()
-        
-        if users:
-            user_options = {f"{username} (ID: {user_id})": {"user_id": user_id, "username": username} 
-                           for user_id, username in users}
-            
-            current_key = None
-            if st.session_state.selected_user:
-                current_user = st.session_state.selected_user
-                current_key = f"{current_user['username']} (ID: {current_user['user_id']})"
-            
-            selected_key = st.selectbox(
-                "👤 Active User:",
-                options=["None"] + list(user_options.keys()),
-                index=0 if current_key is None else list(user_options.keys()).index(current_key) + 1 if current_key in user_options else 0,
-                key="top_user_selector"
-            )
-            
-            if selected_key != "None" and selected_key != current_key:
-                st.session_state.selected_user = user_options[selected_key]
-                st.rerun()
-            elif selected_key == "None":
-                st.session_state.selected_user = None
+        render_user_picker(conn)
     
     with header_col3:
         # Quick stats
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM invoices WHERE status = 'Active'")
-        active_count = cursor.fetchone()[0]
+        active_count = get_loader(conn).get('active_invoice_count')
         st.metric("🟢 Active Deals", f"{active_count:,}")
     
     st.markdown('</div>', unsafe_allow_html=True)
@@ -176,17 +146,39 @@ def create_user_status_bar():
         user_id = st.session_state.selected_user["user_id"]
         username = st.session_state.selected_user["username"]
         
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM invoices WHERE owner_user_id = ?", (user_id,))
-        owned_invoices = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM transactions WHERE buyer_user_id = ?", (user_id,))
-        investments = cursor.fetchone()[0]
+        loader = get_loader(conn)
+        owned_invoices = loader.get('owned_invoice_count', user_id=user_id)
+        investments = loader.get('investment_count', user_id=user_id)
         
         st.success(f"✅ **Acting as: {username}** | 📋 {owned_invoices} invoices created | 💰 {investments} investments made")
     else:
         st.info("ℹ️ No user selected - select a user from the dropdown above to access full features")
 
+PAGES = {
+    "Home": home,
+    "Create Invoice": create_invoice,
+    "Browse Invoices": browse_invoices,
+    "Dashboard": dashboard,
+    "User Management": user_management,
+    "Cash Transfers": cash_transfers_page
+}
+
+def load_page_data(current_page):
+    """Declare what the header, status bar and current page will read, then fetch it in one read transaction"""
+    loader = begin_rerun(conn)
+    user_id = st.session_state.selected_user["user_id"] if st.session_state.selected_user else None
+    
+    loader.request('active_invoice_count')
+    if user_id is not None:
+        loader.request('owned_invoice_count', user_id=user_id)
+        loader.request('investment_count', user_id=user_id)
+    
+    page = PAGES.get(current_page)
+    if hasattr(page, 'declare_data'):
+        page.declare_data(conn, loader, user_id)
+    
+    loader.load()
+
 # Main app
 def main():
     # Show database initialization message only if it just happened
@@ -195,28 +187,22 @@ def main():
         st.success("✅ Database initialized successfully!")
         database_just_initialized = False
     
+    # Get current page and load everything this rerun renders
+    current_page = get_current_page()
+    load_page_data(current_page)
+    
     # Create persistent top navigation
     create_top_navigation()
     
     # User status bar
     create_user_status_bar()
     
-    # Get current page and run it
-    current_page = get_current_page()
-    
-    # Page routing
-    if current_page == "Home":
-        home.app(conn)
-    elif current_page == "Create Invoice":
-        create_invoice.app(conn)
-    elif current_page == "Browse Invoices":
-        browse_invoices.app(conn)
-    elif current_page == "Dashboard":
-        dashboard.app(conn)
-    elif current_page == "User Management":
-        user_management.app(conn)
-    elif current_page == "Cash Transfers":
-        cash_transfers_page.app(conn)
+    # Page routing (sampled into profiles/ when profiling is on, see utils/profiler.py)
+    if current_page in PAGES:
+        with PageProfile(current_page) as profile:
+            PAGES[current_page].app(conn)
+        if profile.path:
+            st.caption(f"🔬 {profile.profiler.sample_count} samples in {profile.profiler.seconds:.2f}s → {profile.path}")
     else:
         # Default to home if unknown page
         st.session_state.current_page = "Home"
@@ -0,0 +1,67 @@
+"""
+Change feed over the append-only invoice and ledger tables.
+
+invoice_id and transfer_id are AUTOINCREMENT, so they only ever grow. A reader
+that remembers the highest ID it has seen (its cursor) asks only for newer
+rows, which is a range scan on the primary key however long the table gets.
+Filtered feeds also return the table's newest ID, so their cursor moves past
+rows that didn't match and the next poll doesn't scan them again.
+"""
+
+from models.cash_transfer import event_label_sql
+
+def get_invoices_since(conn, since_id=0, limit=5):
+    """Invoices created after `since_id`, newest first, as (invoice_id, debtor_name, original_amount, status, chunks_sold, chunks_total)"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT invoice_id, debtor_name, original_amount, status, chunks_sold, chunks_total
+        FROM invoices
+        WHERE invoice_id > ?
+        ORDER BY invoice_id DESC
+        LIMIT ?
+    """, (since_id, limit))
+    return cursor.fetchall()
+
+def get_invoice_progress(conn, invoice_ids):
+    """Current {invoice_id: (status, chunks_sold)} for invoices already on screen (primary-key lookups)"""
+    if not invoice_ids:
+        return {}
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT invoice_id, status, chunks_sold
+        FROM invoices
+        WHERE invoice_id IN ({', '.join('?' * len(invoice_ids))})
+    """, list(invoice_ids))
+    return {invoice_id: (status, chunks_sold) for invoice_id, status, chunks_sold in cursor.fetchall()}
+
+def get_user_transfers_since(conn, user_id, since_id=0, limit=10):
+    """
+    Cash transfers to or from a user after `since_id`, newest first, as
+    (transfer_id, event_description, event_timestamp, amount, from_party, to_party, debtor_name, invoice_id),
+    plus the newest transfer_id looked at, which is the caller's next cursor
+    whether or not any transfer matched.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT COALESCE(MAX(transfer_id), 0) FROM cash_transfers")
+    latest_id = cursor.fetchone()[0]
+    if latest_id <= since_id:
+        return [], since_id
+
+    cursor.execute(f"""
+        SELECT
+            ct.transfer_id,
+            {event_label_sql('ct')},
+            ct.event_timestamp,
+            ct.amount,
+            ct.from_party,
+            ct.to_party,
+            i.debtor_name,
+            ct.invoice_id
+        FROM cash_transfers ct
+        JOIN invoices i ON ct.invoice_id = i.invoice_id
+        WHERE ct.transfer_id > ? AND ct.transfer_id <= ?
+          AND (ct.from_party LIKE ? OR ct.to_party LIKE ?)
+        ORDER BY ct.transfer_id DESC
+        LIMIT ?
+    """, (since_id, latest_id, f"%(User {user_id})%", f"%(User {user_id})%", limit))
+    return cursor.fetchall(), latest_id
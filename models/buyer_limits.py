@@ -0,0 +1,91 @@
+"""
+Per-buyer concentration limits.
+
+A buyer's open chunks per debtor and in total live in buyer_exposure, and per
+invoice in positions, all kept current by triggers on transactions and invoices
+(see schema.sql), so a purchase checks its limits with three primary-key lookups
+instead of aggregating the buyer's transactions. Limits are set in config.py in ฿ of chunk principal;
+with every limit disabled the check is skipped entirely.
+"""
+
+from config import BUYER_LIMIT_PER_INVOICE, BUYER_LIMIT_PER_DEBTOR, BUYER_LIMIT_OPEN_TOTAL
+from utils.money import CHUNK_PRICE, Money
+
+# Limit name -> (exposure scope, description used in rejection messages)
+LIMIT_SCOPES = {
+    'invoice_limit': ('invoice', "this invoice"),
+    'debtor_limit': ('debtor', "this debtor"),
+    'open_total_limit': ('total', "all open invoices"),
+}
+
+def configured_limits():
+    """Active limits as {limit name: ฿ amount}"""
+    limits = {
+        'invoice_limit': BUYER_LIMIT_PER_INVOICE,
+        'debtor_limit': BUYER_LIMIT_PER_DEBTOR,
+        'open_total_limit': BUYER_LIMIT_OPEN_TOTAL,
+    }
+    return {name: amount for name, amount in limits.items() if amount is not None}
+
+def get_buyer_exposure(cursor, buyer_id, invoice_id, debtor_id=None):
+    """Open chunks held by a buyer as {'invoice', 'debtor', 'total'}, in one statement"""
+    cursor.execute("""
+        SELECT
+            (SELECT chunks FROM positions WHERE invoice_id = :invoice AND buyer_user_id = :buyer),
+            (SELECT open_chunks FROM buyer_exposure WHERE buyer_user_id = :buyer AND scope = 'debtor' AND scope_id = :debtor),
+            (SELECT open_chunks FROM buyer_exposure WHERE buyer_user_id = :buyer AND scope = 'total' AND scope_id = 0)
+    """, {'buyer': buyer_id, 'invoice': invoice_id, 'debtor': debtor_id})
+    invoice_chunks, debtor_chunks, total_chunks = cursor.fetchone()
+    return {'invoice': invoice_chunks or 0, 'debtor': debtor_chunks or 0, 'total': total_chunks or 0}
+
+def check_purchase_limits(cursor, buyer_id, invoice_id, debtor_id, chunks, limits=None):
+    """
+    None if buying `chunks` more keeps the buyer within every limit, otherwise a
+    rejection dict: {'status': 'rejected', 'reason', 'message', 'limit', 'current',
+    'requested', 'max_chunks'} for the first limit that would be exceeded.
+    Limits are in ฿ (as in config); the amounts returned are Money.
+    """
+    limits = configured_limits() if limits is None else limits
+    if not limits:
+        return None
+
+    exposure = get_buyer_exposure(cursor, buyer_id, invoice_id, debtor_id)
+    for reason, limit in limits.items():
+        scope, label = LIMIT_SCOPES[reason]
+        if scope == 'debtor' and debtor_id is None:
+            continue
+        limit = Money.from_baht(limit)
+        current = CHUNK_PRICE * exposure[scope]
+        requested = CHUNK_PRICE * chunks
+        if current + requested > limit:
+            max_chunks = max((limit - current) // CHUNK_PRICE, 0)
+            return {
+                'status': 'rejected',
+                'reason': reason,
+                'message': (
+                    f"Purchase limit reached: {limit} per buyer on {label} "
+                    f"(you hold {current}, at most {max_chunks} more chunks)"
+                ),
+                'limit': limit,
+                'current': current,
+                'requested': requested,
+                'max_chunks': max_chunks
+            }
+    return None
+
+def rebuild_buyer_exposure(conn):
+    """Recompute buyer_exposure from transactions (for databases that predate the triggers)"""
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM buyer_exposure")
+    cursor.execute("""
+        INSERT INTO buyer_exposure (buyer_user_id, scope, scope_id, open_chunks)
+        SELECT t.buyer_user_id, s.scope, s.scope_id, SUM(t.chunks_purchased)
+        FROM transactions t
+        JOIN invoices i ON i.invoice_id = t.invoice_id
+        JOIN (
+            SELECT invoice_id, 'debtor' AS scope, debtor_id AS scope_id FROM invoices WHERE debtor_id IS NOT NULL
+            UNION ALL SELECT invoice_id, 'total', 0 FROM invoices
+        ) s ON s.invoice_id = i.invoice_id
+        WHERE i.status NOT IN ('Paid', 'Expired')
+        GROUP BY t.buyer_user_id, s.scope, s.scope_id
+    """)
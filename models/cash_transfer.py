@@ -1,7 +1,146 @@
-def get_cash_transfers_by_invoice(conn, invoice_id):
-    cursor = conn.cursor()
+import re
+from models.records import CashTransfer, record_cursor
+from utils.money import Money, as_money
+
+# Event type codes stored in cash_transfers.event_type. The numbers a description
+# used to embed live in typed columns (event_chunks, event_rate, event_profit; money
+# in integer satang like amount) and
+# the display text is generated from them by event_label_sql, so a standard
+# transfer stores an empty event_description. Free text is only kept for rows
+# that carry a note (e.g. repair entries) or predate the codes.
+EVENT_TYPES = (
+    'funding', 'debtor_payment', 'platform_fee', 'buyer_payout',
+    'owner_remainder', 'market_sale', 'refund', 'rounding_adjustment', 'other'
+)
+
+# Legacy descriptions: code and the pattern that extracts (chunks, rate, profit)
+LEGACY_EVENT_PATTERNS = [
+    ('funding', re.compile(r"Invoice Fully Funded")),
+    ('debtor_payment', re.compile(r"Original Invoice Paid")),
+    ('platform_fee', re.compile(r"Platform Fee(?: \(10% of ฿(?P<profit>[\d.]+) profit\))?")),
+    ('buyer_payout', re.compile(r"Payout to Buyer(?: - (?P<chunks>\d+) chunks @ ฿(?P<rate>[\d.]+)/chunk)?")),
+    ('owner_remainder', re.compile(r"Remaining Amount")),
+    ('market_sale', re.compile(r"Secondary Market Sale(?: - (?P<chunks>\d+) chunks @ ฿(?P<rate>[\d.]+)/chunk)?")),
+]
+
+def event_label_sql(alias=None, stored_text=True):
+    """
+    SQL expression rendering a transfer's display text from its event code and parameters.
+    A non-empty stored event_description wins unless stored_text is False.
+    """
+    prefix = f"{alias}." if alias else ""
+    stored = f"NULLIF({prefix}event_description, '')" if stored_text else "NULL"
+    return f"""COALESCE({stored}, CASE {prefix}event_type
+        WHEN 'funding' THEN 'Invoice Fully Funded - Cash Released to Owner'
+        WHEN 'debtor_payment' THEN 'Original Invoice Paid by Debtor'
+        WHEN 'platform_fee' THEN printf('Platform Fee (10%% of ฿%.2f profit)', {prefix}event_profit / 100.0)
+        WHEN 'buyer_payout' THEN printf('Payout to Buyer - %d chunks @ ฿%.2f/chunk (after 10%% platform fee)',
+                                        {prefix}event_chunks, {prefix}event_rate / 100.0)
+        WHEN 'owner_remainder' THEN 'Remaining Amount with Invoice Owner'
+        WHEN 'market_sale' THEN printf('Secondary Market Sale - %d chunks @ ฿%.2f/chunk',
+                                       {prefix}event_chunks, {prefix}event_rate / 100.0)
+        WHEN 'refund' THEN printf('Refund - %d chunks voided (funding deadline passed)', {prefix}event_chunks)
+        WHEN 'rounding_adjustment' THEN 'Settlement Rounding Adjustment (Baht to Satang Conversion)'
+        ELSE 'Other'
+    END)"""
+
+CASH_TRANSFER_COLUMNS = ", ".join(
+    f"{event_label_sql()} AS event_description" if name == "event_description" else name
+    for name in CashTransfer.COLUMNS
+)
+
+def record_transfer(cursor, invoice_id, event_type, amount, from_party, to_party,
+                    chunks=None, rate=None, profit=None, note=""):
+    """
+    Write one ledger entry. Money (amount, rate, profit) is integer satang.
+    `note` replaces the generated description and should only be set for
+    entries that need extra context (e.g. repair runs).
+    """
+    if event_type not in EVENT_TYPES:
+        raise ValueError(f"Unknown event type: {event_type}")
+    amount = as_money(amount)
+    rate = None if rate is None else as_money(rate)
+    profit = None if profit is None else as_money(profit)
     cursor.execute("""
-        SELECT * FROM cash_transfers 
+        INSERT INTO cash_transfers (
+            invoice_id, event_description, amount, from_party, to_party,
+            event_type, event_chunks, event_rate, event_profit
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (invoice_id, note, amount, from_party, to_party, event_type, chunks, rate, profit))
+
+def record_transfers(cursor, invoice_id, event_type, transfers):
+    """
+    Write several standard entries of one event type in a single executemany.
+    `transfers` holds (amount, from_party, to_party, chunks, rate, profit) tuples;
+    money is integer satang as in record_transfer.
+    """
+    if event_type not in EVENT_TYPES:
+        raise ValueError(f"Unknown event type: {event_type}")
+    cursor.executemany("""
+        INSERT INTO cash_transfers (
+            invoice_id, event_description, amount, from_party, to_party,
+            event_type, event_chunks, event_rate, event_profit
+        ) VALUES (?, '', ?, ?, ?, ?, ?, ?, ?)
+    """, [
+        (invoice_id, as_money(amount), from_party, to_party, event_type, chunks,
+         None if rate is None else as_money(rate), None if profit is None else as_money(profit))
+        for amount, from_party, to_party, chunks, rate, profit in transfers
+    ])
+
+def classify_transfers(conn, table="cash_transfers", batch_size=1000):
+    """
+    Derive event codes and parameters for transfers written before the codes existed,
+    then drop the stored text wherever the generated label reproduces it exactly.
+    `table` may be schema-qualified (e.g. archive.cash_transfers). Returns rows classified.
+    """
+    cursor = conn.cursor()
+    classified = 0
+    last_id = 0
+    while True:
+        cursor.execute(f"""
+            SELECT transfer_id, event_description FROM {table}
+            WHERE transfer_id > ? AND (event_type IS NULL OR event_type = 'other')
+            ORDER BY transfer_id
+            LIMIT ?
+        """, (last_id, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        updates = []
+        for transfer_id, description in rows:
+            event_type, params = 'other', {}
+            for code, pattern in LEGACY_EVENT_PATTERNS:
+                match = pattern.match(description or "")
+                if match:
+                    event_type, params = code, match.groupdict()
+                    break
+            updates.append((
+                event_type,
+                int(params['chunks']) if params.get('chunks') else None,
+                Money.from_baht(params['rate']) if params.get('rate') else None,
+                Money.from_baht(params['profit']) if params.get('profit') else None,
+                transfer_id
+            ))
+        cursor.executemany(f"""
+            UPDATE {table}
+            SET event_type = ?, event_chunks = ?, event_rate = ?, event_profit = ?
+            WHERE transfer_id = ?
+        """, updates)
+        classified += len(updates)
+
+    cursor.execute(f"""
+        UPDATE {table} SET event_description = ''
+        WHERE event_type != 'other' AND event_description != ''
+          AND event_description = {event_label_sql(stored_text=False)}
+    """)
+    return classified
+
+def get_cash_transfers_by_invoice(conn, invoice_id):
+    cursor = record_cursor(conn, CashTransfer)
+    cursor.execute(f"""
+        SELECT {CASH_TRANSFER_COLUMNS} FROM cash_transfers
         WHERE invoice_id = ?
         ORDER BY event_timestamp
     """, (invoice_id,))
@@ -15,4 +154,50 @@ def get_all_cash_transfers(conn):
         JOIN invoices i ON ct.invoice_id = i.invoice_id
         ORDER BY ct.event_timestamp DESC
     """)
-    return cursor.fetchall()
\ No newline at end of file
+    return cursor.fetchall()
+
+# Sort names accepted by get_transfers_page, mapped to ORDER BY expressions
+TRANSFER_SORTS = {
+    'time': "ct.event_timestamp",
+    'amount': "ct.amount",
+    'invoice': "ct.invoice_id",
+    'event': "ct.event_type",
+}
+
+def get_transfers_page(conn, invoice_id=None, event_type=None, include_archived=False,
+                       sort='time', descending=True, limit=50, offset=0):
+    """
+    One page of cash transfers joined with their invoice, filtered and sorted in SQL.
+    Rows are (transfer_id, invoice_id, debtor_name, event_description, event_timestamp,
+    amount, from_party, to_party). Returns (rows, total_matching).
+    include_archived reads the *_all views, so attach_archive must have been called.
+    """
+    invoices_table, transfers_table = (
+        ("invoices_all", "cash_transfers_all") if include_archived else ("invoices", "cash_transfers")
+    )
+
+    conditions = []
+    params = []
+    if invoice_id is not None:
+        conditions.append("ct.invoice_id = ?")
+        params.append(invoice_id)
+    if event_type is not None:
+        conditions.append("ct.event_type = ?")
+        params.append(event_type)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    direction = "DESC" if descending else "ASC"
+
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM {transfers_table} ct {where}", params)
+    total = cursor.fetchone()[0]
+
+    cursor.execute(f"""
+        SELECT ct.transfer_id, ct.invoice_id, i.debtor_name, {event_label_sql('ct')},
+               ct.event_timestamp, ct.amount, ct.from_party, ct.to_party
+        FROM {transfers_table} ct
+        JOIN {invoices_table} i ON ct.invoice_id = i.invoice_id
+        {where}
+        ORDER BY {TRANSFER_SORTS[sort]} {direction}, ct.transfer_id {direction}
+        LIMIT ? OFFSET ?
+    """, params + [limit, offset])
+    return cursor.fetchall(), total
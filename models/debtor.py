@@ -0,0 +1,113 @@
+"""
+Debtor dimension.
+
+Invoices reference a debtors row through invoices.debtor_id. Names are matched
+on normalize_debtor_name, so "ACME  Co." and "acme co" are the same debtor; the
+first spelling seen is kept for display. Exposure aggregates on the debtors row
+are kept current by triggers on invoices (see schema.sql), so reading them is a
+primary-key or index lookup rather than a GROUP BY over every invoice.
+"""
+
+import re
+from models.records import Debtor, record_cursor, select_columns
+
+DEBTOR_COLUMNS = select_columns(Debtor)
+
+def normalize_debtor_name(name):
+    """Key for a debtor name that ignores case, spacing and . , punctuation"""
+    return " ".join(re.sub(r"[.,]", " ", name).split()).casefold()
+
+def get_or_create_debtor(cursor, name):
+    """debtor_id for `name`, creating the debtor on first use"""
+    name = " ".join(name.split())
+    if not name:
+        raise ValueError("Debtor name is required")
+    normalized = normalize_debtor_name(name)
+    cursor.execute("SELECT debtor_id FROM debtors WHERE normalized_name = ?", (normalized,))
+    row = cursor.fetchone()
+    if row:
+        return row[0]
+    cursor.execute("INSERT INTO debtors (name, normalized_name) VALUES (?, ?)", (name, normalized))
+    return cursor.lastrowid
+
+def get_debtor(conn, debtor_id):
+    cursor = record_cursor(conn, Debtor)
+    cursor.execute(f"SELECT {DEBTOR_COLUMNS} FROM debtors WHERE debtor_id = ?", (debtor_id,))
+    return cursor.fetchone()
+
+def get_debtor_exposure(conn, limit=20):
+    """Debtors with open invoices, largest open exposure first"""
+    cursor = record_cursor(conn, Debtor)
+    cursor.execute(f"""
+        SELECT {DEBTOR_COLUMNS} FROM debtors
+        WHERE open_invoice_count > 0
+        ORDER BY open_amount DESC
+        LIMIT ?
+    """, (limit,))
+    return cursor.fetchall()
+
+def get_exposure_totals(conn):
+    """Platform-wide (debtors with open invoices, open_amount, funded_amount, paid_amount)"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT
+            COALESCE(SUM(open_invoice_count > 0), 0),
+            COALESCE(SUM(open_amount), 0),
+            COALESCE(SUM(funded_amount), 0),
+            COALESCE(SUM(paid_amount), 0)
+        FROM debtors
+    """)
+    return cursor.fetchone()
+
+def assign_debtors(conn):
+    """
+    Link invoices without a debtor_id to their debtor, creating debtors as needed.
+    The invoice triggers add each linked invoice to its debtor's aggregates.
+    Returns the number of invoices linked.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT DISTINCT debtor_name FROM invoices WHERE debtor_id IS NULL")
+    names = [row[0] for row in cursor.fetchall()]
+
+    cursor.execute("DROP TABLE IF EXISTS temp.debtor_names")
+    cursor.execute("CREATE TEMP TABLE debtor_names (debtor_name TEXT PRIMARY KEY, debtor_id INTEGER)")
+    cursor.executemany(
+        "INSERT INTO debtor_names (debtor_name, debtor_id) VALUES (?, ?)",
+        [(name, get_or_create_debtor(cursor, name)) for name in names if name.strip()]
+    )
+    cursor.execute("""
+        UPDATE invoices
+        SET debtor_id = (SELECT n.debtor_id FROM debtor_names n WHERE n.debtor_name = invoices.debtor_name)
+        WHERE debtor_id IS NULL
+          AND debtor_name IN (SELECT debtor_name FROM debtor_names)
+    """)
+    linked = cursor.rowcount
+    cursor.execute("DROP TABLE temp.debtor_names")
+    return linked
+
+def rebuild_debtor_totals(conn):
+    """Recompute every debtor's aggregates from its invoices, as the invoice triggers would have kept them"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        UPDATE debtors SET
+            invoice_count = t.invoice_count,
+            open_invoice_count = t.open_invoice_count,
+            open_amount = t.open_amount,
+            funded_amount = t.funded_amount,
+            paid_invoice_count = t.paid_invoice_count,
+            paid_amount = t.paid_amount
+        FROM (
+            SELECT
+                d.debtor_id,
+                COUNT(i.invoice_id) AS invoice_count,
+                COALESCE(SUM(i.status NOT IN ('Paid', 'Expired')), 0) AS open_invoice_count,
+                COALESCE(SUM(CASE WHEN i.status NOT IN ('Paid', 'Expired') THEN i.original_amount ELSE 0 END), 0) AS open_amount,
+                COALESCE(SUM(CASE WHEN i.status NOT IN ('Paid', 'Expired') THEN i.chunks_sold * 10000 ELSE 0 END), 0) AS funded_amount,
+                COALESCE(SUM(i.status = 'Paid'), 0) AS paid_invoice_count,
+                COALESCE(SUM(CASE WHEN i.status = 'Paid' THEN i.original_amount ELSE 0 END), 0) AS paid_amount
+            FROM debtors d
+            LEFT JOIN invoices i ON i.debtor_id = d.debtor_id
+            GROUP BY d.debtor_id
+        ) t
+        WHERE t.debtor_id = debtors.debtor_id
+    """)
@@ -1,47 +1,159 @@
-def create_invoice(conn, owner_id, debtor, original_amount, terms, sale_price):
-    chunks_total = int(sale_price // 100)
+from datetime import datetime
+
+from database.connection import write_transaction
+from models.records import Invoice, record_cursor, select_columns
+from models.debtor import get_or_create_debtor
+from models import transaction as transaction_model
+from config import FUNDING_WINDOW_DAYS
+from utils.payment_terms import parse_payment_terms, days_until
+from utils.money import CHUNK_PRICE, as_money
+
+INVOICE_COLUMNS = select_columns(Invoice)
+
+def create_invoice(conn, owner_id, debtor, original_amount, terms, sale_price,
+                   funding_days=FUNDING_WINDOW_DAYS):
+    """Amounts are Money (integer satang); one chunk per whole CHUNK_PRICE of the sale price"""
+    original_amount = as_money(original_amount)
+    sale_price = as_money(sale_price)
+    chunks_total = sale_price // CHUNK_PRICE
     
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO invoices (
-            owner_user_id, debtor_name, original_amount, 
-            payment_terms, desired_sale_price, chunks_total
-        ) VALUES (?, ?, ?, ?, ?, ?)
-    """, (owner_id, debtor, original_amount, terms, sale_price, chunks_total))
+    due_date = parse_payment_terms(terms)
+    
+    with write_transaction(conn) as cursor:
+        debtor_id = get_or_create_debtor(cursor, debtor)
+        cursor.execute("""
+            INSERT INTO invoices (
+                owner_user_id, debtor_name, original_amount, 
+                payment_terms, desired_sale_price, chunks_total, debtor_id, funding_deadline,
+                due_date, days_to_due
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, datetime('now', ?), ?, ?)
+        """, (owner_id, debtor, original_amount, terms, sale_price, chunks_total, debtor_id,
+              f"{int(funding_days):+d} days", due_date and due_date.isoformat(), days_until(due_date)))
     
-    conn.commit()
     return cursor.lastrowid
 
 def get_all_invoices(conn):
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT * FROM invoices 
+    cursor = record_cursor(conn, Invoice)
+    cursor.execute(f"""
+        SELECT {INVOICE_COLUMNS} FROM invoices
         WHERE status IN ('Pending', 'Active')
         ORDER BY invoice_id DESC
     """)
     return cursor.fetchall()
 
-def purchase_chunks(conn, invoice_id, buyer_id, chunks):
-    cursor = conn.cursor()
-    cursor.execute("""
-        UPDATE invoices 
-        SET chunks_sold = chunks_sold + ?
-        WHERE invoice_id = ?
-    """, (chunks, invoice_id))
-    
-    cursor.execute("""
-        INSERT INTO transactions (
-            invoice_id, buyer_user_id, chunks_purchased
-        ) VALUES (?, ?, ?)
-    """, (invoice_id, buyer_id, chunks))
-    
-    conn.commit()
+def purchase_chunks(conn, invoice_id, buyer_id, chunks, limits=None):
+    """Guarded primary purchase; see models.transaction.purchase_chunks"""
+    return transaction_model.purchase_chunks(conn, invoice_id, buyer_id, chunks, limits)
 
 def get_invoices_by_owner(conn, owner_id):
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT * FROM invoices 
+    cursor = record_cursor(conn, Invoice)
+    cursor.execute(f"""
+        SELECT {INVOICE_COLUMNS} FROM invoices
         WHERE owner_user_id = ?
         ORDER BY invoice_id DESC
     """, (owner_id,))
-    return cursor.fetchall()
\ No newline at end of file
+    return cursor.fetchall()
+
+# Sort names accepted by get_invoices_page, mapped to ORDER BY expressions
+INVOICE_SORTS = {
+    'newest': "invoice_id",
+    'status': "status = 'Pending', invoice_id",
+    'debtor': "debtor_name COLLATE NOCASE",
+    'amount': "original_amount",
+    'return': "original_amount * 1.0 / chunks_total",
+    'remaining': "chunks_total - chunks_sold",
+    # Net per-chunk return scaled to a year over the invoice's term, terms under a day counted as
+    # one (NULL without a parsed due date, sorted last); no commas, since multi-column sorts are split on ", "
+    'annualized': "(original_amount * 1.0 / chunks_total - 10000) * 0.9 * 365.0"
+                  " / (CASE WHEN days_to_due IS NULL THEN NULL WHEN days_to_due > 1 THEN days_to_due ELSE 1 END)",
+    'due': "due_date",
+}
+
+def get_invoices_page(conn, owner_id=None, statuses=None, min_net_roi=0, max_remaining_amount=None,
+                      max_days_to_due=None, sort='newest', descending=True, limit=50, offset=0):
+    """
+    One page of invoices, filtered and sorted in SQL. Returns (invoices, total_matching).
+    min_net_roi is the per-chunk return in percent after the 10% platform fee on profit;
+    max_remaining_amount is Money (satang).
+    max_days_to_due keeps invoices due within that many days from today (a due_date range).
+    """
+    conditions = []
+    params = []
+
+    if owner_id is not None:
+        conditions.append("owner_user_id = ?")
+        params.append(owner_id)
+    if statuses:
+        conditions.append(f"status IN ({', '.join('?' * len(statuses))})")
+        params.extend(statuses)
+    if min_net_roi > 0:
+        # Net profit per 10,000-satang chunk after the fee, as a percent of the chunk price
+        conditions.append("(chunks_total = 0 OR (original_amount * 1.0 / chunks_total - 10000) * 0.9 / 100 >= ?)")
+        params.append(min_net_roi)
+    if max_remaining_amount is not None:
+        conditions.append("(chunks_total - chunks_sold) * 10000 <= ?")
+        params.append(max_remaining_amount)
+    if max_days_to_due is not None:
+        conditions.append("due_date <= date('now', ?)")
+        params.append(f"{int(max_days_to_due):+d} days")
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    direction = "DESC" if descending else "ASC"
+    # Invoices missing the sort value (no parsed due date) come last in either direction
+    order_by = ", ".join(f"{term} {direction} NULLS LAST" for term in INVOICE_SORTS[sort].split(", "))
+
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM invoices {where}", params)
+    total = cursor.fetchone()[0]
+
+    cursor = record_cursor(conn, Invoice)
+    cursor.execute(f"""
+        SELECT {INVOICE_COLUMNS} FROM invoices
+        {where}
+        ORDER BY {order_by}, invoice_id {direction}
+        LIMIT ? OFFSET ?
+    """, params + [limit, offset])
+    return cursor.fetchall(), total
+
+def get_owner_cash_flow(conn, owner_id):
+    """
+    Money owed to an owner by month of due date, for invoices not yet Paid, as
+    (month, invoice_count, amount_due); invoices without a due date are left out.
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT strftime('%Y-%m', due_date) AS month, COUNT(*), SUM(original_amount)
+        FROM invoices
+        WHERE owner_user_id = ? AND due_date IS NOT NULL AND status IN ('Pending', 'Active')
+        GROUP BY month
+        ORDER BY month
+    """, (owner_id,))
+    return cursor.fetchall()
+
+def assign_due_dates(conn):
+    """
+    Parse due dates for invoices created before they were stored, counting
+    from each invoice's first purchase (or today, if nothing was bought yet)
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT i.invoice_id, i.payment_terms, MIN(t.purchase_timestamp)
+        FROM invoices i
+        LEFT JOIN transactions t ON t.invoice_id = i.invoice_id
+        WHERE i.due_date IS NULL
+        GROUP BY i.invoice_id
+    """)
+    updates = []
+    for invoice_id, terms, first_purchase in cursor.fetchall():
+        issued = datetime.fromisoformat(first_purchase).date() if first_purchase else None
+        due_date = parse_payment_terms(terms, issued)
+        if due_date is not None:
+            updates.append((due_date.isoformat(), days_until(due_date, issued), invoice_id))
+    cursor.executemany("UPDATE invoices SET due_date = ?, days_to_due = ? WHERE invoice_id = ?", updates)
+
+def clear_unreadable_due_dates(conn):
+    """Drop due dates stored for terms the parser no longer reads, e.g. an ambiguous "04/05/2027" once guessed day first"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT invoice_id, payment_terms FROM invoices WHERE due_date IS NOT NULL")
+    cleared = [(invoice_id,) for invoice_id, terms in cursor.fetchall() if parse_payment_terms(terms) is None]
+    cursor.executemany("UPDATE invoices SET due_date = NULL, days_to_due = NULL WHERE invoice_id = ?", cleared)
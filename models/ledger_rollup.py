@@ -0,0 +1,32 @@
+def get_rollups(conn, bucket="day", periods=90, event_types=None, party_role=None):
+    """
+    Get ledger aggregates for the most recent `periods` days or months.
+    Rows are (period, event_type, party_role, transfer_count, total_amount), oldest first.
+    """
+    if bucket == "day":
+        since_sql = "date('now', ?)"
+        since_param = f"-{int(periods)} days"
+    else:
+        since_sql = "strftime('%Y-%m', 'now', ?)"
+        since_param = f"-{int(periods)} months"
+    
+    query = f"""
+        SELECT period, event_type, party_role, transfer_count, total_amount
+        FROM ledger_rollups
+        WHERE bucket = ? AND period >= {since_sql}
+    """
+    params = [bucket, since_param]
+    
+    if event_types:
+        query += f" AND event_type IN ({', '.join('?' for _ in event_types)})"
+        params.extend(event_types)
+    
+    if party_role:
+        query += " AND party_role = ?"
+        params.append(party_role)
+    
+    query += " ORDER BY period"
+    
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    return cursor.fetchall()
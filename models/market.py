@@ -0,0 +1,183 @@
+"""
+Secondary market for chunk positions in Active invoices.
+
+Sell orders live in market_orders. The partial index idx_market_orders_book keeps
+each invoice's open orders sorted by (price_per_chunk, order_id), so finding the
+best order is a single O(log n) index seek (price-time priority). A fill moves
+the position with two transactions rows (-chunks for the seller, +chunks for the
+buyer), which the position trigger nets into each side's positions row, so
+positions.chunks is always the current holding and chunks_sold on the invoice
+never changes.
+"""
+
+from database.connection import write_transaction
+from models.cash_transfer import record_transfer
+from models.buyer_limits import check_purchase_limits
+from utils.money import Money, as_money
+
+def get_holdings(conn, user_id, invoice_id):
+    """Chunks held and chunks still free to list: (held, available)"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT
+            (SELECT COALESCE(SUM(chunks), 0) FROM positions
+             WHERE invoice_id = ? AND buyer_user_id = ?),
+            (SELECT COALESCE(SUM(chunks_remaining), 0) FROM market_orders
+             WHERE invoice_id = ? AND seller_user_id = ? AND status = 'Open')
+    """, (invoice_id, user_id, invoice_id, user_id))
+    held, listed = cursor.fetchone()
+    return held, held - listed
+
+def get_sellable_positions(conn, user_id):
+    """Active-invoice positions of a user as (invoice_id, debtor_name, held, listed)"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT
+            i.invoice_id,
+            i.debtor_name,
+            p.chunks AS held,
+            (SELECT COALESCE(SUM(o.chunks_remaining), 0) FROM market_orders o
+             WHERE o.invoice_id = i.invoice_id AND o.seller_user_id = ? AND o.status = 'Open') AS listed
+        FROM positions p
+        JOIN invoices i ON p.invoice_id = i.invoice_id
+        WHERE p.buyer_user_id = ? AND i.status = 'Active' AND p.chunks > 0
+        ORDER BY i.invoice_id DESC
+    """, (user_id, user_id))
+    return cursor.fetchall()
+
+def list_chunks(conn, invoice_id, seller_id, chunks, price_per_chunk):
+    """Place a sell order for chunks the seller holds and has not already listed (price in Money)"""
+    price_per_chunk = as_money(price_per_chunk)
+    if chunks <= 0 or price_per_chunk <= 0:
+        raise ValueError("Chunks and price must be positive")
+
+    with write_transaction(conn) as cursor:
+        cursor.execute("SELECT status FROM invoices WHERE invoice_id = ?", (invoice_id,))
+        invoice = cursor.fetchone()
+        if not invoice:
+            raise ValueError("Invoice not found")
+        if invoice[0] != 'Active':
+            raise ValueError("Only chunks of Active invoices can be sold")
+
+        _, available = get_holdings(conn, seller_id, invoice_id)
+        if chunks > available:
+            raise ValueError(f"Only {available} chunks available to list")
+
+        cursor.execute("""
+            INSERT INTO market_orders (
+                invoice_id, seller_user_id, price_per_chunk, chunks_listed, chunks_remaining
+            ) VALUES (?, ?, ?, ?, ?)
+        """, (invoice_id, seller_id, price_per_chunk, chunks, chunks))
+        order_id = cursor.lastrowid
+
+    return order_id
+
+def cancel_order(conn, order_id, seller_id):
+    with write_transaction(conn) as cursor:
+        cursor.execute("""
+            UPDATE market_orders
+            SET status = 'Cancelled'
+            WHERE order_id = ? AND seller_user_id = ? AND status = 'Open'
+        """, (order_id, seller_id))
+    return cursor.rowcount > 0
+
+def get_open_orders_by_seller(conn, seller_id):
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT o.order_id, o.invoice_id, i.debtor_name, o.price_per_chunk,
+               o.chunks_listed, o.chunks_remaining, o.created_timestamp
+        FROM market_orders o
+        JOIN invoices i ON o.invoice_id = i.invoice_id
+        WHERE o.seller_user_id = ? AND o.status = 'Open'
+        ORDER BY o.order_id DESC
+    """, (seller_id,))
+    return cursor.fetchall()
+
+def get_order_book(conn, invoice_id, levels=10):
+    """Best price levels for an invoice as (price_per_chunk, chunks, orders)"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT price_per_chunk, SUM(chunks_remaining), COUNT(*)
+        FROM market_orders
+        WHERE invoice_id = ? AND status = 'Open'
+        GROUP BY price_per_chunk
+        ORDER BY price_per_chunk
+        LIMIT ?
+    """, (invoice_id, levels))
+    return cursor.fetchall()
+
+def _record_fill(cursor, order_id, invoice_id, seller_id, buyer_id, chunks, price_per_chunk):
+    """Move `chunks` from seller to buyer and write the ledger entry"""
+    cursor.executemany("""
+        INSERT INTO transactions (
+            invoice_id, buyer_user_id, chunks_purchased, status, market_order_id
+        ) VALUES (?, ?, ?, 'Active', ?)
+    """, [
+        (invoice_id, seller_id, -chunks, order_id),
+        (invoice_id, buyer_id, chunks, order_id)
+    ])
+
+    record_transfer(
+        cursor, invoice_id, 'market_sale', chunks * price_per_chunk,
+        f"Buyer (User {buyer_id})", f"Buyer (User {seller_id})",
+        chunks=chunks, rate=price_per_chunk
+    )
+
+def buy_from_market(conn, invoice_id, buyer_id, chunks, max_price=None):
+    """
+    Buy up to `chunks` from the cheapest open orders (oldest first at equal price).
+    The whole purchase is one write transaction: every fill moves the position and
+    writes its ledger entry atomically. The buyer's own orders are skipped.
+    Prices are Money. Returns {'filled', 'cost', 'fills': [(order_id, seller_id, chunks, price_per_chunk)]}.
+    """
+    if chunks <= 0:
+        raise ValueError("Chunks must be positive")
+    if max_price is not None:
+        max_price = as_money(max_price)
+
+    with write_transaction(conn) as cursor:
+        cursor.execute("SELECT status, debtor_id FROM invoices WHERE invoice_id = ?", (invoice_id,))
+        invoice = cursor.fetchone()
+        if not invoice or invoice[0] != 'Active':
+            raise ValueError("Only chunks of Active invoices can be traded")
+
+        # Market buys count against the same concentration limits as primary purchases
+        rejection = check_purchase_limits(cursor, buyer_id, invoice_id, invoice[1], chunks)
+        if rejection:
+            raise ValueError(rejection['message'])
+
+        fills = []
+        wanted = chunks
+        while wanted > 0:
+            # Best order by price-time priority: one seek on idx_market_orders_book
+            cursor.execute("""
+                SELECT order_id, seller_user_id, price_per_chunk, chunks_remaining
+                FROM market_orders
+                WHERE invoice_id = ? AND status = 'Open' AND seller_user_id != ?
+                ORDER BY price_per_chunk, order_id
+                LIMIT 1
+            """, (invoice_id, buyer_id))
+            order = cursor.fetchone()
+
+            if not order or (max_price is not None and order[2] > max_price):
+                break
+
+            order_id, seller_id, price_per_chunk, remaining = order
+            fill = min(wanted, remaining)
+
+            cursor.execute("""
+                UPDATE market_orders
+                SET chunks_remaining = chunks_remaining - ?,
+                    status = CASE WHEN chunks_remaining - ? = 0 THEN 'Filled' ELSE 'Open' END
+                WHERE order_id = ?
+            """, (fill, fill, order_id))
+            _record_fill(cursor, order_id, invoice_id, seller_id, buyer_id, fill, price_per_chunk)
+
+            fills.append((order_id, seller_id, fill, price_per_chunk))
+            wanted -= fill
+
+    return {
+        'filled': chunks - wanted,
+        'cost': Money(sum(fill * price for _, _, fill, price in fills)),
+        'fills': fills
+    }
@@ -0,0 +1,146 @@
+"""
+Investor portfolio, read from the positions table.
+
+Each (invoice, buyer) pair has one positions row, maintained by a trigger on
+transactions (see schema.sql), so repeated purchases and secondary-market sales
+of the same chunks are already netted and the dashboard pages through positions
+without touching the transaction history. A position's status follows its
+invoice, the same way the transaction statuses do. Totals and projected returns
+come from the same rows grouped by status, so Python only adds up a handful of
+per-status rows. Money is in satang; expected returns are projections and
+keep their fractional satang. Yield accrued so far on Active positions comes
+from the position_accruals snapshot written by the nightly accrual job
+(utils/accrue_yield.py), so it is as of that run, not the current moment.
+"""
+
+from models.records import Position, record_cursor
+
+# Return per chunk in satang after the 10% platform fee on the invoice's profit
+NET_RETURN_PER_CHUNK = """
+    (i.original_amount * 1.0 / i.chunks_total
+     - (i.original_amount - i.chunks_total * 10000) * 0.10 / i.chunks_total)
+"""
+
+# Transaction status of a position, from its invoice's status
+POSITION_STATUS = """
+    CASE i.status
+        WHEN 'Pending' THEN 'Pending Activation'
+        WHEN 'Paid' THEN 'Paid Out'
+        WHEN 'Expired' THEN 'Voided'
+        ELSE i.status
+    END
+"""
+
+POSITION_COLUMNS = f"""
+    p.invoice_id, {POSITION_STATUS} AS status, p.chunks, p.purchases,
+    p.first_purchase, p.last_purchase,
+    i.debtor_name, i.status, i.original_amount, i.chunks_total,
+    p.chunks * 10000 AS invested,
+    p.chunks * {NET_RETURN_PER_CHUNK} AS expected_return,
+    a.accrued, a.accrual_date
+"""
+
+# Sort names accepted by get_positions_page, mapped to ORDER BY expressions
+POSITION_SORTS = {
+    'recent': "p.last_purchase",
+    'invoice': "p.invoice_id",
+    'chunks': "p.chunks",
+    'return': "expected_return - invested",
+    'debtor': "i.debtor_name COLLATE NOCASE",
+    'status': "i.status",
+}
+
+# Positions that no longer hold money at risk for the buyer
+CLOSED_STATUSES = ('Voided',)
+
+def get_positions_page(conn, user_id, sort='recent', descending=True, limit=50, offset=0):
+    """
+    One page of a buyer's positions. Returns (positions, total_positions).
+    Positions fully sold on the secondary market (net zero chunks) are left out.
+    """
+    direction = "DESC" if descending else "ASC"
+
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM positions WHERE buyer_user_id = ? AND chunks > 0", (user_id,))
+    total = cursor.fetchone()[0]
+
+    cursor = record_cursor(conn, Position)
+    cursor.execute(f"""
+        SELECT {POSITION_COLUMNS}
+        FROM positions p
+        JOIN invoices i ON p.invoice_id = i.invoice_id
+        LEFT JOIN position_accruals a
+            ON a.buyer_user_id = p.buyer_user_id AND a.invoice_id = p.invoice_id AND i.status = 'Active'
+        WHERE p.buyer_user_id = ? AND p.chunks > 0
+        ORDER BY {POSITION_SORTS[sort]} {direction}, p.invoice_id {direction}
+        LIMIT ? OFFSET ?
+    """, (user_id, limit, offset))
+    return cursor.fetchall(), total
+
+def get_portfolio_summary(conn, user_id):
+    """
+    A buyer's holdings by position status plus headline totals:
+    {'by_status': {status: {'positions', 'chunks', 'invested', 'expected_return'}},
+     'positions', 'invested', 'expected_return', 'expected_profit', 'accrued', 'accrual_date'}.
+    Headline totals leave out CLOSED_STATUSES (refunded positions). 'accrued' is
+    the yield accrued on Active positions as of 'accrual_date', the last accrual
+    run (None if there hasn't been one).
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT {POSITION_STATUS} AS status, COUNT(*), SUM(p.chunks), SUM(p.chunks) * 10000,
+               SUM(p.chunks * {NET_RETURN_PER_CHUNK})
+        FROM positions p
+        JOIN invoices i ON p.invoice_id = i.invoice_id
+        WHERE p.buyer_user_id = ? AND p.chunks > 0
+        GROUP BY status
+    """, (user_id,))
+
+    by_status = {
+        status: {'positions': positions, 'chunks': chunks, 'invested': invested, 'expected_return': expected}
+        for status, positions, chunks, invested, expected in cursor.fetchall()
+    }
+    open_totals = [totals for status, totals in by_status.items() if status not in CLOSED_STATUSES]
+    invested = sum(totals['invested'] for totals in open_totals)
+    expected_return = sum(totals['expected_return'] for totals in open_totals)
+
+    cursor.execute("""
+        SELECT MAX(a.accrual_date), COALESCE(SUM(a.accrued), 0)
+        FROM position_accruals a
+        JOIN invoices i ON a.invoice_id = i.invoice_id
+        WHERE a.buyer_user_id = ? AND i.status = 'Active'
+    """, (user_id,))
+    accrual_date, accrued = cursor.fetchone()
+    return {
+        'by_status': by_status,
+        'positions': sum(totals['positions'] for totals in open_totals),
+        'invested': invested,
+        'expected_return': expected_return,
+        'expected_profit': expected_return - invested,
+        'accrued': accrued,
+        'accrual_date': accrual_date
+    }
+
+def get_invoice_holders(cursor, invoice_id):
+    """(buyer_user_id, chunks) for everyone currently holding chunks of an invoice"""
+    cursor.execute("""
+        SELECT buyer_user_id, chunks FROM positions
+        WHERE invoice_id = ? AND chunks > 0
+        ORDER BY buyer_user_id
+    """, (invoice_id,))
+    return cursor.fetchall()
+
+def rebuild_positions(conn):
+    """Recompute positions from transactions (for databases that predate the position trigger)"""
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM positions")
+    cursor.execute("""
+        INSERT INTO positions (invoice_id, buyer_user_id, chunks, purchases, first_purchase, last_purchase)
+        SELECT
+            invoice_id, buyer_user_id, SUM(chunks_purchased),
+            SUM(chunks_purchased > 0),
+            MIN(purchase_timestamp),
+            COALESCE(MAX(CASE WHEN chunks_purchased > 0 THEN purchase_timestamp END), MIN(purchase_timestamp))
+        FROM transactions
+        GROUP BY invoice_id, buyer_user_id
+    """)
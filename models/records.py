@@ -0,0 +1,159 @@
+"""
+Typed row objects for the model layer.
+
+Each record lists its table's columns once, in COLUMNS, and model queries select
+exactly that list (see select_columns), so pages read fields by name and adding
+a column to a table no longer shifts positional unpacking. Records use
+__slots__, so a cached row carries no per-instance __dict__ and costs about the
+same memory as the tuple it replaces (benchmarks/bench_records.py).
+"""
+
+class Record:
+    __slots__ = ()
+    COLUMNS = ()
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.COLUMNS)
+        return f"{type(self).__name__}({fields})"
+
+class User(Record):
+    __slots__ = COLUMNS = ("user_id", "username", "is_system")
+
+    def __init__(self, user_id, username, is_system=0):
+        self.user_id = user_id
+        self.username = username
+        self.is_system = is_system
+
+class Invoice(Record):
+    __slots__ = COLUMNS = (
+        "invoice_id", "owner_user_id", "debtor_name", "original_amount", "payment_terms",
+        "desired_sale_price", "chunks_total", "chunks_sold", "status", "debtor_id", "funding_deadline",
+        "due_date", "days_to_due"
+    )
+
+    def __init__(self, invoice_id, owner_user_id, debtor_name, original_amount, payment_terms,
+                 desired_sale_price, chunks_total, chunks_sold, status, debtor_id=None,
+                 funding_deadline=None, due_date=None, days_to_due=None):
+        self.invoice_id = invoice_id
+        self.owner_user_id = owner_user_id
+        self.debtor_name = debtor_name
+        self.original_amount = original_amount
+        self.payment_terms = payment_terms
+        self.desired_sale_price = desired_sale_price
+        self.chunks_total = chunks_total
+        self.chunks_sold = chunks_sold
+        self.status = status
+        self.debtor_id = debtor_id
+        self.funding_deadline = funding_deadline
+        self.due_date = due_date
+        self.days_to_due = days_to_due
+
+    @property
+    def chunks_remaining(self):
+        return self.chunks_total - self.chunks_sold
+
+class Transaction(Record):
+    __slots__ = COLUMNS = (
+        "transaction_id", "invoice_id", "buyer_user_id", "chunks_purchased",
+        "purchase_timestamp", "status", "market_order_id"
+    )
+
+    def __init__(self, transaction_id, invoice_id, buyer_user_id, chunks_purchased,
+                 purchase_timestamp, status, market_order_id=None):
+        self.transaction_id = transaction_id
+        self.invoice_id = invoice_id
+        self.buyer_user_id = buyer_user_id
+        self.chunks_purchased = chunks_purchased
+        self.purchase_timestamp = purchase_timestamp
+        self.status = status
+        self.market_order_id = market_order_id
+
+class CashTransfer(Record):
+    __slots__ = COLUMNS = (
+        "transfer_id", "invoice_id", "event_description", "event_timestamp",
+        "amount", "from_party", "to_party", "event_type", "event_chunks", "event_rate", "event_profit"
+    )
+
+    def __init__(self, transfer_id, invoice_id, event_description, event_timestamp,
+                 amount, from_party, to_party, event_type='other', event_chunks=None,
+                 event_rate=None, event_profit=None):
+        self.transfer_id = transfer_id
+        self.invoice_id = invoice_id
+        self.event_description = event_description
+        self.event_timestamp = event_timestamp
+        self.amount = amount
+        self.from_party = from_party
+        self.to_party = to_party
+        self.event_type = event_type
+        self.event_chunks = event_chunks
+        self.event_rate = event_rate
+        self.event_profit = event_profit
+
+class Debtor(Record):
+    __slots__ = COLUMNS = (
+        "debtor_id", "name", "normalized_name", "invoice_count", "open_invoice_count",
+        "open_amount", "funded_amount", "paid_invoice_count", "paid_amount"
+    )
+
+    def __init__(self, debtor_id, name, normalized_name, invoice_count=0, open_invoice_count=0,
+                 open_amount=0, funded_amount=0, paid_invoice_count=0, paid_amount=0):
+        self.debtor_id = debtor_id
+        self.name = name
+        self.normalized_name = normalized_name
+        self.invoice_count = invoice_count
+        self.open_invoice_count = open_invoice_count
+        self.open_amount = open_amount
+        self.funded_amount = funded_amount
+        self.paid_invoice_count = paid_invoice_count
+        self.paid_amount = paid_amount
+
+class Position(Record):
+    """A buyer's positions row for one invoice with its invoice fields, read by models.portfolio"""
+    __slots__ = COLUMNS = (
+        "invoice_id", "status", "chunks", "purchases", "first_purchase", "last_purchase",
+        "debtor_name", "invoice_status", "original_amount", "chunks_total", "invested", "expected_return",
+        "accrued", "accrual_date"
+    )
+
+    def __init__(self, invoice_id, status, chunks, purchases, first_purchase, last_purchase,
+                 debtor_name, invoice_status, original_amount, chunks_total, invested, expected_return,
+                 accrued=None, accrual_date=None):
+        self.invoice_id = invoice_id
+        self.status = status
+        self.chunks = chunks
+        self.purchases = purchases
+        self.first_purchase = first_purchase
+        self.last_purchase = last_purchase
+        self.debtor_name = debtor_name
+        self.invoice_status = invoice_status
+        self.original_amount = original_amount
+        self.chunks_total = chunks_total
+        self.invested = invested
+        self.expected_return = expected_return
+        self.accrued = accrued
+        self.accrual_date = accrual_date
+
+    @property
+    def expected_profit(self):
+        return self.expected_return - self.invested
+
+    @property
+    def roi(self):
+        return self.expected_profit / self.invested * 100 if self.invested > 0 else 0
+
+def select_columns(record_class, alias=None):
+    """SELECT list for a record's columns, optionally qualified with a table alias"""
+    prefix = f"{alias}." if alias else ""
+    return ", ".join(prefix + name for name in record_class.COLUMNS)
+
+def record_factory(record_class):
+    """sqlite3 row factory that builds `record_class` instances straight from row tuples"""
+    def factory(cursor, row):
+        return record_class(*row)
+    return factory
+
+def record_cursor(conn, record_class):
+    """A cursor whose rows come back as `record_class`; other cursors on conn are unaffected"""
+    cursor = conn.cursor()
+    cursor.row_factory = record_factory(record_class)
+    return cursor
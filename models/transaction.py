@@ -1,86 +1,59 @@
-def check_invoice_activation(conn, invoice_id):
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT chunks_sold, chunks_total, invoice_id 
-        FROM invoices WHERE invoice_id = ?
-    """, (invoice_id,))
-    
-    invoice = cursor.fetchone()
-    
-    if invoice and invoice[0] >= invoice[1]:
-        cursor.execute("""
-            UPDATE invoices 
-            SET status = 'Active' 
-            WHERE invoice_id = ?
-        """, (invoice_id,))
-        
-        # Create cash transfer for funding
-        cursor.execute("""
-            INSERT INTO cash_transfers (
-                invoice_id, event_description, amount, from_party, to_party
-            ) VALUES (?, ?, ?, ?, ?)
-        """, (invoice_id, "Invoice Fully Funded", invoice[1]*100, "Buyers", "Invoice Owner"))
-        
-        conn.commit()
-        return True
-    return False
-
-def process_invoice_payment(conn, invoice_id):
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT original_amount, chunks_total, invoice_id 
-        FROM invoices WHERE invoice_id = ?
-    """, (invoice_id,))
-    
-    invoice = cursor.fetchone()
-    
-    if invoice and invoice[2]:
-        cursor.execute("UPDATE invoices SET status = 'Paid' WHERE invoice_id = ?", (invoice_id,))
-        
-        # Get all transactions for this invoice
-        cursor.execute("""
-            SELECT buyer_user_id, chunks_purchased 
-            FROM transactions 
-            WHERE invoice_id = ?
-        """, (invoice_id,))
-        
-        transactions = cursor.fetchall()
-        payout_per_chunk = invoice[0] / invoice[1]
-        
-        for buyer_id, chunks in transactions:
-            amount = chunks * payout_per_chunk
-            
-            cursor.execute("""
-                INSERT INTO cash_transfers (
-                    invoice_id, event_description, amount, from_party, to_party
-                ) VALUES (?, ?, ?, ?, ?)
-            """, (invoice_id, f"Payout to Buyer {buyer_id}", amount, "Debtor", f"Buyer {buyer_id}"))
-        
-        conn.commit()
-        return True
-    return False
+from database.connection import write_transaction
+from models.records import Transaction, record_cursor, select_columns
+from models.cash_transfer import record_transfer
+from models.buyer_limits import check_purchase_limits
+from utils.money import CHUNK_PRICE
+from config import BASKET_MAX_LINES
+
+TRANSACTION_COLUMNS = select_columns(Transaction)
 
 def get_transactions_by_invoice(conn, invoice_id):
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT * FROM transactions 
+    cursor = record_cursor(conn, Transaction)
+    cursor.execute(f"""
+        SELECT {TRANSACTION_COLUMNS} FROM transactions
         WHERE invoice_id = ?
         ORDER BY purchase_timestamp DESC
     """, (invoice_id,))
     return cursor.fetchall()
 
 def get_user_transactions(conn, user_id):
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT * FROM transactions 
+    cursor = record_cursor(conn, Transaction)
+    cursor.execute(f"""
+        SELECT {TRANSACTION_COLUMNS} FROM transactions
         WHERE buyer_user_id = ?
         ORDER BY purchase_timestamp DESC
     """, (user_id,))
     return cursor.fetchall()
 
-def purchase_chunks(conn, invoice_id, buyer_id, chunks):
-    cursor = conn.cursor()
-    
+def _apply_purchase(cursor, invoice_id, buyer_id, chunks, limits=None):
+    """
+    Check and write one purchase inside the caller's write transaction.
+    Returns the 'filled' result, or a rejection dict having written nothing.
+    """
+    cursor.execute("""
+        SELECT status, chunks_total - chunks_sold, debtor_id,
+               funding_deadline IS NOT NULL AND funding_deadline <= CURRENT_TIMESTAMP
+        FROM invoices
+        WHERE invoice_id = ?
+    """, (invoice_id,))
+    invoice = cursor.fetchone()
+
+    if not invoice:
+        return {'status': 'rejected', 'reason': 'not_found', 'message': "Invoice not found"}
+    if invoice[0] != 'Pending':
+        return {'status': 'rejected', 'reason': 'not_pending',
+                'message': "This invoice is no longer open for funding"}
+    # Past its deadline but not yet swept: the sweeper would refund the purchase anyway
+    if invoice[3]:
+        return {'status': 'rejected', 'reason': 'deadline_passed',
+                'message': "The funding deadline for this invoice has passed"}
+    if chunks > invoice[1]:
+        return {'status': 'rejected', 'reason': 'not_enough_chunks',
+                'message': f"Only {invoice[1]} chunks are still available", 'max_chunks': invoice[1]}
+    rejection = check_purchase_limits(cursor, buyer_id, invoice_id, invoice[2], chunks, limits)
+    if rejection:
+        return rejection
+
     # Insert the transaction
     cursor.execute("""
         INSERT INTO transactions (
@@ -94,5 +67,127 @@ def purchase_chunks(conn, invoice_id, buyer_id, chunks):
         SET chunks_sold = chunks_sold + ?
         WHERE invoice_id = ?
     """, (chunks, invoice_id))
+
+    return {
+        'status': 'filled',
+        'chunks': chunks,
+        'cost': CHUNK_PRICE * chunks,
+        'chunks_remaining': invoice[1] - chunks
+    }
+
+def activate_funded_invoice(cursor, invoice_id):
+    """
+    Activate a Pending invoice whose chunks are all sold: its transactions go
+    Active and the funding transfer to the owner is recorded. Runs in the
+    caller's transaction (utils.helpers.check_invoice_activation commits it).
+    Returns True if the invoice was activated.
+    """
+    # Guarded on the status it leaves, so a repeat or concurrent activation posts no second funding
+    cursor.execute("""
+        UPDATE invoices 
+        SET status = 'Active' 
+        WHERE invoice_id = ? AND status = 'Pending' AND chunks_sold >= chunks_total
+    """, (invoice_id,))
+    if cursor.rowcount != 1:
+        return False
+    
+    cursor.execute("SELECT chunks_total, owner_user_id FROM invoices WHERE invoice_id = ?", (invoice_id,))
+    chunks_total, owner_id = cursor.fetchone()
+    
+    # Update all related transactions to Active status
+    cursor.execute("""
+        UPDATE transactions 
+        SET status = 'Active'
+        WHERE invoice_id = ? AND status = 'Pending Activation'
+    """, (invoice_id,))
     
-    conn.commit()
\ No newline at end of file
+    # Create cash transfer record for the funding event
+    record_transfer(
+        cursor, invoice_id, 'funding', CHUNK_PRICE * chunks_total,
+        "Collective Buyers", f"Invoice Owner (User {owner_id})"
+    )
+    return True
+
+def purchase_chunks(conn, invoice_id, buyer_id, chunks, limits=None):
+    """
+    Buy `chunks` of a Pending invoice, checked and applied in one write transaction:
+    the invoice must still have the chunks and the buyer must stay within the
+    concentration limits (models/buyer_limits.py; `limits` overrides config).
+    Returns {'status': 'filled', 'chunks', 'cost', 'chunks_remaining'} or a
+    {'status': 'rejected', 'reason', 'message', ...} dict; nothing is written on rejection.
+    """
+    if chunks <= 0:
+        raise ValueError("Chunks must be positive")
+
+    with write_transaction(conn) as cursor:
+        result = _apply_purchase(cursor, invoice_id, buyer_id, chunks, limits)
+        if result['status'] == 'rejected':
+            conn.rollback()
+
+    return result
+
+BASKET_MODES = ('all_or_nothing', 'best_effort')
+
+def purchase_basket(conn, buyer_id, lines, mode='all_or_nothing', limits=None):
+    """
+    Buy chunks of several Pending invoices in one write transaction.
+    `lines` is a list of (invoice_id, chunks); repeated invoices are merged.
+    Each line is applied under its own SAVEPOINT with the same checks as
+    purchase_chunks, and every invoice it sells out is activated in the same
+    transaction. In 'all_or_nothing' mode one rejected line rolls the whole
+    basket back (the other lines come back 'cancelled'); in 'best_effort' mode
+    rejected lines are skipped and the rest are committed.
+    Returns {'status': 'filled' | 'partial' | 'rejected', 'lines', 'chunks',
+    'cost', 'activated'}; each line is the purchase_chunks result plus
+    'invoice_id', 'requested' and, when filled, 'activated'.
+    """
+    if mode not in BASKET_MODES:
+        raise ValueError(f"Unknown basket mode: {mode}")
+    if len(lines) > BASKET_MAX_LINES:
+        raise ValueError(f"A basket holds at most {BASKET_MAX_LINES} invoices")
+
+    requested = {}
+    for invoice_id, chunks in lines:
+        if chunks <= 0:
+            raise ValueError("Chunks must be positive")
+        requested[invoice_id] = requested.get(invoice_id, 0) + chunks
+    if not requested:
+        raise ValueError("The basket is empty")
+
+    results = []
+    with write_transaction(conn) as cursor:
+        for invoice_id, chunks in requested.items():
+            cursor.execute("SAVEPOINT basket_line")
+            try:
+                result = _apply_purchase(cursor, invoice_id, buyer_id, chunks, limits)
+            except Exception:
+                cursor.execute("ROLLBACK TO basket_line")
+                raise
+            if result['status'] == 'rejected':
+                cursor.execute("ROLLBACK TO basket_line")
+            cursor.execute("RELEASE basket_line")
+            results.append({'invoice_id': invoice_id, 'requested': chunks, **result})
+
+        rejected = [line for line in results if line['status'] == 'rejected']
+        if rejected and mode == 'all_or_nothing':
+            conn.rollback()
+            for n, line in enumerate(results):
+                if line['status'] == 'filled':
+                    results[n] = {
+                        'invoice_id': line['invoice_id'], 'requested': line['requested'],
+                        'status': 'cancelled', 'reason': 'basket_rejected',
+                        'message': "Not bought: another line in the basket was rejected"
+                    }
+        else:
+            for line in results:
+                if line['status'] == 'filled':
+                    line['activated'] = activate_funded_invoice(cursor, line['invoice_id'])
+
+    filled = [line for line in results if line['status'] == 'filled']
+    return {
+        'status': 'filled' if len(filled) == len(results) else 'partial' if filled else 'rejected',
+        'lines': results,
+        'chunks': sum(line['chunks'] for line in filled),
+        'cost': CHUNK_PRICE * sum(line['chunks'] for line in filled),
+        'activated': [line['invoice_id'] for line in filled if line['activated']]
+    }
@@ -1,16 +1,74 @@
+from database.connection import write_transaction
+from models.records import User, record_cursor, select_columns
+
+USER_COLUMNS = select_columns(User)
+
 def create_user(conn, username):
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO users (username) VALUES (?)", 
-        (username,)
-    )
-    conn.commit()
+    with write_transaction(conn) as cursor:
+        cursor.execute(
+            "INSERT INTO users (username) VALUES (?)", 
+            (username,)
+        )
     return cursor.lastrowid
 
 def get_user_by_username(conn, username):
-    cursor = conn.cursor()
+    cursor = record_cursor(conn, User)
     cursor.execute(
-        "SELECT * FROM users WHERE username = ?", 
+        f"SELECT {USER_COLUMNS} FROM users WHERE username = ?",
         (username,)
     )
-    return cursor.fetchone()
\ No newline at end of file
+    return cursor.fetchone()
+
+def get_user(conn, user_id):
+    cursor = record_cursor(conn, User)
+    cursor.execute(
+        f"SELECT {USER_COLUMNS} FROM users WHERE user_id = ? AND is_system = 0",
+        (user_id,)
+    )
+    return cursor.fetchone()
+
+def search_users(conn, prefix, limit=20):
+    """
+    Regular users whose username starts with `prefix` (case-insensitive).
+    Runs as a range scan on idx_users_search, so cost depends on `limit`, not the user count.
+    """
+    cursor = record_cursor(conn, User)
+    
+    if not prefix:
+        cursor.execute(f"""
+            SELECT {USER_COLUMNS}
+            FROM users 
+            WHERE is_system = 0
+            ORDER BY username COLLATE NOCASE
+            LIMIT ?
+        """, (limit,))
+        return cursor.fetchall()
+    
+    # Every string starting with the prefix sorts between prefix and prefix + U+10FFFF
+    cursor.execute(f"""
+        SELECT {USER_COLUMNS}
+        FROM users 
+        WHERE is_system = 0
+          AND username >= ? COLLATE NOCASE
+          AND username < ? COLLATE NOCASE
+        ORDER BY username COLLATE NOCASE
+        LIMIT ?
+    """, (prefix, prefix + "\U0010ffff", limit))
+    return cursor.fetchall()
+
+def get_newest_users(conn, limit=10):
+    cursor = record_cursor(conn, User)
+    cursor.execute(f"""
+        SELECT {USER_COLUMNS}
+        FROM users 
+        WHERE is_system = 0
+        ORDER BY user_id DESC
+        LIMIT ?
+    """, (limit,))
+    return cursor.fetchall()
+
+def get_latest_user_id(conn):
+    """Highest user id (0 with no users); changes whenever a user is created"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT COALESCE(MAX(user_id), 0) FROM users")
+    return cursor.fetchone()[0]
@@ -1,8 +1,15 @@
+import math
 import streamlit as st
 from models import invoice as invoice_model
 from models import transaction as transaction_model
-from utils.helpers import check_invoice_activation, format_currency, format_number
-from datetime import datetime, timedelta
+from utils.helpers import check_invoice_activation, format_currency, format_money, format_number
+from utils.money import Money, to_baht
+from components.market_panel import render_market_panel
+from components.basket_panel import add_to_basket, get_basket, render_basket_panel
+from components.data_grid import render_grid_toggle, render_paged_grid
+from config import GRID_PAGE_SIZE
+from components.invoice_card import opportunity_header_html, investment_summary_html, all_or_nothing_html
+from datetime import date
 
 def navigate_to(page_name):
     """Navigate to a specific page"""
@@ -41,25 +48,27 @@ def calculate_investment_metrics(original_amount, chunks_total, chunks_to_buy):
         'net_return_per_chunk': gross_return_per_chunk - (platform_fee_total / chunks_to_buy) if chunks_to_buy > 0 else 0
     }
 
-def render_investment_opportunity(invoice_data, conn):
+def annualized_yield(net_roi, days_to_due):
+    """Net ROI over the invoice's term scaled to a year, as in the 'annualized' grid sort"""
+    return net_roi * 365.0 / max(days_to_due or 0, 1)
+
+def render_investment_opportunity(invoice, conn):
     """Render a detailed investment opportunity card with slider interface"""
-    invoice_id, owner_id, debtor, amount, terms, sale_price, chunks_total, chunks_sold, status = invoice_data
+    invoice_id = invoice.invoice_id
+    debtor = invoice.debtor_name
+    amount = to_baht(invoice.original_amount)  # the card's figures are worked out in baht
+    terms = invoice.payment_terms
+    sale_price = to_baht(invoice.desired_sale_price)
+    chunks_total = invoice.chunks_total
+    chunks_sold = invoice.chunks_sold
+    status = invoice.status
     
     remaining_chunks = chunks_total - chunks_sold
     funding_progress = (chunks_sold / chunks_total * 100) if chunks_total > 0 else 0
     
     # Main container with enhanced styling
     with st.container():
-        st.markdown(f"""
-        <div style="border: 2px solid #e1e5e9; border-radius: 15px; padding: 25px; margin: 20px 0; background: linear-gradient(135deg, #f8f9fa 0%, #ffffff 100%); box-shadow: 0 4px 6px rgba(0,0,0,0.1);">
-            <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 20px;">
-                <h2 style="color: #2c3e50; margin: 0; font-size: 1.5em;">🏢 {debtor}</h2>
-                <span style="background: {'linear-gradient(45deg, #28a745, #20c997)' if status == 'Active' else 'linear-gradient(45deg, #ffc107, #fd7e14)'}; color: white; padding: 8px 20px; border-radius: 20px; font-weight: bold; font-size: 0.9em;">
-                    {status}
-                </span>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(opportunity_header_html(invoice_id, debtor, status), unsafe_allow_html=True)
         
         # Two column layout for main info
         col_left, col_right = st.columns([2, 1])
@@ -118,16 +127,9 @@ def render_investment_opportunity(invoice_data, conn):
                 metrics = calculate_investment_metrics(amount, chunks_total, chunks_to_buy)
                 
                 # Enhanced Investment summary box
-                st.markdown(f"""
-                <div style="background: linear-gradient(135deg, #e8f5e8 0%, #d4edda 100%); padding: 20px; border-radius: 12px; border-left: 5px solid #28a745; margin: 15px 0;">
-                    <h4 style="margin-top: 0; color: #155724; text-align: center;">💎 Your Investment</h4>
-                    <div style="text-align: center;">
-                        <p style="font-size: 1.1em; margin: 8px 0;"><strong>💰 You Pay:</strong> <span style="color: #dc3545;">{format_currency(metrics['investment_amount'])}</span></p>
-                        <p style="font-size: 1.1em; margin: 8px 0;"><strong>💵 You Get Back:</strong> <span style="color: #28a745;">{format_currency(metrics['net_return'])}</span></p>
-                        <p style="font-size: 1.2em; margin: 8px 0; font-weight: bold;"><strong>🚀 Your Profit:</strong> <span style="color: #007bff;">{format_currency(metrics['net_profit'])} ({metrics['net_roi']:.1f}% ROI)</span></p>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
+                st.markdown(investment_summary_html(
+                    metrics['investment_amount'], metrics['net_return'], metrics['net_profit'], metrics['net_roi']
+                ), unsafe_allow_html=True)
                 
                 # Enhanced Buy button
                 if st.button(f"🛒 Buy {chunks_to_buy} Chunk{'s' if chunks_to_buy > 1 else ''} for {format_currency(investment_amount)}", 
@@ -135,22 +137,36 @@ def render_investment_opportunity(invoice_data, conn):
                            use_container_width=True,
                            type="primary"):
                     if st.session_state.selected_user:
-                        transaction_model.purchase_chunks(
-                            conn, invoice_id, st.session_state.selected_user['user_id'], chunks_to_buy
-                        )
-                        
-                        # Check activation
-                        activated = check_invoice_activation(conn, invoice_id)
+                        try:
+                            result = transaction_model.purchase_chunks(
+                                conn, invoice_id, st.session_state.selected_user['user_id'], chunks_to_buy
+                            )
+                        except ValueError as e:
+                            result = {'status': 'rejected', 'message': str(e)}
                         
-                        if activated:
-                            st.success(f"🎉 Purchased {chunks_to_buy} chunks! Invoice is now FULLY FUNDED and ACTIVE!")
-                            st.balloons()
+                        if result['status'] == 'rejected':
+                            st.error(f"❌ {result['message']}")
                         else:
-                            st.success(f"✅ Successfully purchased {chunks_to_buy} chunks!")
-                        
-                        st.rerun()
+                            # Check activation
+                            activated = check_invoice_activation(conn, invoice_id)
+                            
+                            if activated:
+                                st.success(f"🎉 Purchased {chunks_to_buy} chunks! Invoice is now FULLY FUNDED and ACTIVE!")
+                                st.balloons()
+                            else:
+                                st.success(f"✅ Successfully purchased {chunks_to_buy} chunks!")
+                            
+                            st.rerun()
                     else:
                         st.error("Please select a user first!")
+                
+                # Or queue it and buy several invoices at once from the basket
+                in_basket = invoice_id in get_basket()
+                if st.button("🧺 Update Basket" if in_basket else "🧺 Add to Basket",
+                             key=f"basket_add_{invoice_id}",
+                             use_container_width=True):
+                    add_to_basket(invoice_id, debtor, chunks_to_buy)
+                    st.rerun()
             
             elif status == 'Active':
                 st.markdown("""
@@ -159,6 +175,9 @@ def render_investment_opportunity(invoice_data, conn):
                     <p style="margin: 10px 0; color: #0c5460;">This invoice is active and waiting for debtor payment.</p>
                 </div>
                 """, unsafe_allow_html=True)
+                
+                # Holders can resell chunks of Active invoices
+                render_market_panel(conn, invoice_id, st.session_state.selected_user)
             
             else:
                 st.info("No chunks available")
@@ -185,23 +204,18 @@ def render_investment_opportunity(invoice_data, conn):
             with fin_col2:
                 st.markdown("#### ⚖️ Risk & Timeline Analysis")
                 
-                # Calculate estimated timeline (assuming payment terms)
-                if 'net' in terms.lower():
-                    try:
-                        days = int(''.join(filter(str.isdigit, terms)))
-                        expected_date = datetime.now() + timedelta(days=days)
-                        risk_level = "🟢 Low Risk" if days <= 30 else "🟡 Medium Risk" if days <= 60 else "🔴 High Risk"
-                        st.markdown(f"""
-                        **📅 Expected Payment:** ~{expected_date.strftime('%B %d, %Y')}  
-                        **⏰ Timeline:** ~{days} days from activation  
-                        **⚖️ Risk Level:** {risk_level}
-                        """)
-                    except:
-                        st.markdown(f"""
-                        **📋 Payment Terms:** {terms}  
-                        **⏰ Timeline:** Variable - Review carefully  
-                        **⚖️ Risk Level:** 🟡 Medium - Assess terms
-                        """)
+                # Timeline from the due date parsed out of the payment terms at creation
+                if invoice.due_date:
+                    due = date.fromisoformat(invoice.due_date)
+                    days = (due - date.today()).days
+                    risk_level = "🟢 Low Risk" if days <= 30 else "🟡 Medium Risk" if days <= 60 else "🔴 High Risk"
+                    net_roi = calculate_investment_metrics(amount, chunks_total, 1)['net_roi']
+                    st.markdown(f"""
+                    **📅 Expected Payment:** {due.strftime('%B %d, %Y')}  
+                    **⏰ Timeline:** {days} days from today  
+                    **📈 Annualized Net Yield:** {annualized_yield(net_roi, invoice.days_to_due):.1f}%  
+                    **⚖️ Risk Level:** {risk_level}
+                    """)
                 else:
                     st.markdown(f"""
                     **📋 Payment Terms:** {terms}  
@@ -220,16 +234,76 @@ def render_investment_opportunity(invoice_data, conn):
         
         # All-or-Nothing Warning with enhanced styling
         if status == 'Pending':
-            st.markdown(f"""
-            <div style="background: linear-gradient(135deg, #fff3cd 0%, #ffeaa7 100%); padding: 15px; border-radius: 10px; border-left: 5px solid #ffc107; margin: 15px 0;">
-                <h4 style="color: #856404; margin: 0;">⚠️ All-or-Nothing Funding</h4>
-                <p style="color: #856404; margin: 10px 0;">This invoice only activates if <strong>ALL {format_number(chunks_total)} chunks</strong> are purchased. 
-                If not fully funded, all purchases will be voided and money returned.</p>
-            </div>
-            """, unsafe_allow_html=True)
+            st.markdown(all_or_nothing_html(chunks_total, invoice.funding_deadline), unsafe_allow_html=True)
         
         st.markdown("---")
 
+BROWSE_GRID_SORTS = {
+    "Pending first": "status",
+    "Newest": "newest",
+    "Return per chunk": "return",
+    "Remaining chunks": "remaining",
+    "Annualized yield": "annualized",
+    "Due date": "due",
+    "Invoice amount": "amount",
+    "Debtor": "debtor"
+}
+
+STATUS_FILTERS = {
+    "All": ['Pending', 'Active'],
+    "Pending Only": ['Pending'],
+    "Active Only": ['Active']
+}
+
+MAX_INVESTMENT_AMOUNTS = {
+    "Any Amount": None,
+    "≤ ฿1,000": 1000,
+    "≤ ฿5,000": 5000,
+    "≤ ฿10,000": 10000
+}
+
+# Latest acceptable due date, in days from today; invoices without a parsed due date only show under "Any"
+MAX_TIMELINES = {
+    "Any": None,
+    "≤30 days": 30,
+    "≤60 days": 60,
+    "≤90 days": 90
+}
+
+def opportunities_page(conn, show_status, min_roi, max_investment, max_timeline):
+    """Grid page fetcher applying the browse filters in SQL; rows are keyed by Invoice record"""
+    max_amount = MAX_INVESTMENT_AMOUNTS[max_investment]
+
+    def fetch_page(sort, descending, limit, offset):
+        invoices, total = invoice_model.get_invoices_page(
+            conn,
+            statuses=STATUS_FILTERS[show_status],
+            min_net_roi=min_roi,
+            max_remaining_amount=None if max_amount is None else Money.from_baht(max_amount),
+            max_days_to_due=MAX_TIMELINES[max_timeline],
+            sort=sort, descending=descending, limit=limit, offset=offset
+        )
+        metrics = [
+            calculate_investment_metrics(to_baht(invoice.original_amount), invoice.chunks_total, 1)
+            for invoice in invoices
+        ]
+        table = {
+            "#": [invoice.invoice_id for invoice in invoices],
+            "Debtor": [invoice.debtor_name for invoice in invoices],
+            "Status": [invoice.status for invoice in invoices],
+            "Amount": [format_money(invoice.original_amount) for invoice in invoices],
+            "Net ROI": [f"{m['net_roi']:.1f}%" for m in metrics],
+            "Yield p.a.": [
+                f"{annualized_yield(m['net_roi'], invoice.days_to_due):.1f}%" if invoice.due_date else "-"
+                for invoice, m in zip(invoices, metrics)
+            ],
+            "Remaining": [f"{invoice.chunks_remaining}/{invoice.chunks_total}" for invoice in invoices],
+            "Terms": [invoice.payment_terms for invoice in invoices],
+            "Due": [invoice.due_date or "-" for invoice in invoices]
+        }
+        return table, invoices, total
+    return fetch_page
+
 def app(conn):
     st.title("🛒 Browse Investment Opportunities")
     st.markdown("**Find high-yield short-term investments backed by real invoices**")
@@ -243,6 +317,8 @@ def app(conn):
         """, unsafe_allow_html=True)
         return
     
+    render_basket_panel(conn, st.session_state.selected_user)
+    
     # Enhanced Filter Section
     st.markdown("### 🔍 Investment Filters")
     
@@ -259,12 +335,23 @@ def app(conn):
             max_investment = st.selectbox("💰 Max Investment:", ["Any Amount", "≤ ฿1,000", "≤ ฿5,000", "≤ ฿10,000"])
         
         with filter_col4:
-            max_timeline = st.selectbox("⏰ Max Timeline:", ["Any", "≤30 days", "≤60 days", "≤90 days"])
+            max_timeline = st.selectbox("⏰ Max Timeline:", list(MAX_TIMELINES))
+    
+    # Compact grid: one table filtered, sorted and paged in SQL; the full card opens for the selected row
+    if render_grid_toggle("browse_grid"):
+        selected = render_paged_grid(
+            "browse",
+            opportunities_page(conn, show_status, min_roi, max_investment, max_timeline),
+            BROWSE_GRID_SORTS
+        )
+        if selected:
+            render_investment_opportunity(selected, conn)
+        return
     
     # Get invoices
-    invoices = invoice_model.get_all_invoices(conn)
+    _, invoice_count = invoice_model.get_invoices_page(conn, limit=0)
     
-    if not invoices:
+    if not invoice_count:
         st.markdown("""
         <div style="background: linear-gradient(135deg, #d1ecf1 0%, #bee5eb 100%); padding: 30px; border-radius: 15px; text-align: center; margin: 30px 0;">
             <h2 style="color: #0c5460; margin: 0;">🎯 No Investment Opportunities Available</h2>
@@ -273,44 +360,22 @@ def app(conn):
         """, unsafe_allow_html=True)
         return
     
-    # Apply filters
-    filtered_invoices = []
-    for invoice in invoices:
-        invoice_id, owner_id, debtor, amount, terms, sale_price, chunks_total, chunks_sold, status = invoice
-        
-        # Status filter
-        if show_status == "Pending Only" and status != "Pending":
-            continue
-        elif show_status == "Active Only" and status != "Active":
-            continue
-        
-        # ROI filter
-        if chunks_total > 0:
-            gross_profit_per_chunk = (amount / chunks_total) - 100
-            platform_fee_per_chunk = gross_profit_per_chunk * 0.10
-            net_profit_per_chunk = gross_profit_per_chunk - platform_fee_per_chunk
-            roi = (net_profit_per_chunk / 100 * 100) if net_profit_per_chunk > 0 else 0
-            
-            if roi < min_roi:
-                continue
-        
-        # Investment amount filter
-        remaining_chunks = chunks_total - chunks_sold
-        min_investment_needed = remaining_chunks * 100
-        
-        if max_investment == "≤ ฿1,000" and min_investment_needed > 1000:
-            continue
-        elif max_investment == "≤ ฿5,000" and min_investment_needed > 5000:
-            continue
-        elif max_investment == "≤ ฿10,000" and min_investment_needed > 10000:
-            continue
-        
-        filtered_invoices.append(invoice)
+    # Cards for one page of the filtered invoices, Pending first; filters, order and paging run in SQL as in the grid
+    fetch_page = opportunities_page(conn, show_status, min_roi, max_investment, max_timeline)
+    page = st.session_state.get("browse_cards_page", 1)
+    _, filtered_invoices, total = fetch_page("status", True, GRID_PAGE_SIZE, (page - 1) * GRID_PAGE_SIZE)
+    
+    # Filters may have shrunk the result since the page was chosen
+    page_count = max(1, math.ceil(total / GRID_PAGE_SIZE))
+    if page > page_count:
+        page = page_count
+        _, filtered_invoices, total = fetch_page("status", True, GRID_PAGE_SIZE, (page - 1) * GRID_PAGE_SIZE)
+    st.session_state.browse_cards_page = page
     
     # Enhanced Results Summary
     st.markdown(f"""
     <div style="background: linear-gradient(135deg, #e2e3e5 0%, #f8f9fa 100%); padding: 20px; border-radius: 10px; margin: 20px 0; text-align: center;">
-        <h3 style="color: #495057; margin: 0;">📊 Found {len(filtered_invoices)} Investment Opportunities</h3>
+        <h3 style="color: #495057; margin: 0;">📊 Found {total:,} Investment Opportunities</h3>
     </div>
     """, unsafe_allow_html=True)
     
@@ -318,8 +383,8 @@ def app(conn):
         st.info("No invoices match your current filters. Try adjusting the criteria above.")
         return
     
-    # Sort by status (Pending first, then Active)
-    filtered_invoices.sort(key=lambda x: (x[8] != 'Pending', x[0]))  # Sort by status, then by ID
+    if page_count > 1:
+        st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, step=1, key="browse_cards_page")
     
     # Display opportunities
     for invoice in filtered_invoices:
@@ -1,10 +1,90 @@
 import streamlit as st
+from models import cash_transfer as cash_transfer_model
+from models.cash_transfer import event_label_sql
+from utils.archive_invoices import attach_archive
+from components.data_grid import render_grid_toggle, render_paged_grid
+from components.invoice_card import transfer_item_html
+from components.trend_charts import EVENT_TYPE_LABELS
+from utils.helpers import format_money
 
 def navigate_to(page_name):
     """Navigate to a specific page"""
     st.session_state.current_page = page_name
     st.rerun()
 
+def render_transfer_timeline(transfers):
+    """Colour-coded timeline of (event_description, timestamp, amount, from_party, to_party) rows with money in/out totals"""
+    # Calculate totals for this invoice
+    total_in = sum(amount for _, _, amount, from_party, to_party in transfers if "User" not in from_party or from_party == "Debtor")
+    total_out = sum(amount for _, _, amount, from_party, to_party in transfers if "User" in to_party)
+    
+    # Transfer timeline
+    for event_desc, timestamp, amount, from_party, to_party in transfers:
+        st.markdown(transfer_item_html(event_desc, timestamp, amount, from_party, to_party), unsafe_allow_html=True)
+    
+    # Invoice summary
+    st.markdown("---")
+    summary_detail_col1, summary_detail_col2 = st.columns(2)
+    
+    with summary_detail_col1:
+        st.markdown(f"**Total Money In:** {format_money(total_in)}")
+    
+    with summary_detail_col2:
+        st.markdown(f"**Total Money Out:** {format_money(total_out)}")
+
+def render_transfers_by_invoice(cursor, invoices, transfers_table, event_type):
+    """One expander per invoice with its transfer timeline, optionally limited to one event type the invoice query already filtered on"""
+    for invoice in invoices:
+        invoice_id, debtor_name, original_amount = invoice
+        
+        # Get transfers for this invoice
+        transfer_query = f"""
+            SELECT {event_label_sql()}, event_timestamp, amount, from_party, to_party
+            FROM {transfers_table}
+            WHERE invoice_id = ?
+        """
+        transfer_params = [invoice_id]
+        
+        if event_type is not None:
+            transfer_query += " AND event_type = ?"
+            transfer_params.append(event_type)
+        
+        transfer_query += " ORDER BY event_timestamp ASC"
+        
+        cursor.execute(transfer_query, transfer_params)
+        transfers = cursor.fetchall()
+        
+        with st.expander(
+            f"#{invoice_id} - {debtor_name} | {format_money(original_amount)} | {len(transfers)} transfers", 
+            expanded=(len(invoices) <= 3)  # Auto-expand if few invoices
+        ):
+            render_transfer_timeline(transfers)
+
+TRANSFER_GRID_SORTS = {
+    "Time": "time",
+    "Amount": "amount",
+    "Invoice": "invoice",
+    "Event": "event"
+}
+
+def transfers_page(conn, invoice_filter, event_type, include_archived):
+    """Grid page fetcher over individual transfers; rows are keyed by the transfer row itself"""
+    def fetch_page(sort, descending, limit, offset):
+        rows, total = cash_transfer_model.get_transfers_page(
+            conn, invoice_filter, event_type, include_archived,
+            sort=sort, descending=descending, limit=limit, offset=offset
+        )
+        table = {
+            "Time": [row[4] for row in rows],
+            "Invoice": [f"#{row[1]} - {row[2]}" for row in rows],
+            "Event": [row[3] for row in rows],
+            "Amount": [format_money(row[5]) for row in rows],
+            "From": [row[6] for row in rows],
+            "To": [row[7] for row in rows]
+        }
+        return table, rows, total
+    return fetch_page
+
 def app(conn):
     # Breadcrumb navigation
     st.markdown("🏠 [Home](#) > 💰 **Cash Transfers**")
@@ -15,18 +95,30 @@ def app(conn):
     st.title("💰 All Cash Transfer History")
     st.markdown("**Complete financial transaction history across all invoices and users**")
     
+    # History from the archive database is only read when asked for
+    include_archived = st.checkbox(
+        "📦 Include archived invoices",
+        help="Settled invoices older than the archive window live in a separate archive database"
+    )
+    
+    if include_archived:
+        attach_archive(conn)
+        invoices_table, transfers_table = "invoices_all", "cash_transfers_all"
+    else:
+        invoices_table, transfers_table = "invoices", "cash_transfers"
+    
     cursor = conn.cursor()
     
     # Summary statistics
     st.subheader("📊 Transfer Summary")
     
     # Get summary stats
-    cursor.execute("SELECT COUNT(*), COALESCE(SUM(amount), 0) FROM cash_transfers")
+    cursor.execute(f"SELECT COUNT(*), COALESCE(SUM(amount), 0) FROM {transfers_table}")
     total_transfers, total_amount = cursor.fetchone()
     
-    cursor.execute("""
+    cursor.execute(f"""
         SELECT COUNT(DISTINCT invoice_id) 
-        FROM cash_transfers
+        FROM {transfers_table}
     """)
     invoices_with_transfers = cursor.fetchone()[0]
     
@@ -36,7 +128,7 @@ def app(conn):
         st.metric("💸 Total Transfers", f"{total_transfers:,}")
     
     with summary_col2:
-        st.metric("💰 Total Amount", f"฿{total_amount:,.2f}")
+        st.metric("💰 Total Amount", format_money(total_amount))
     
     with summary_col3:
         st.metric("📋 Invoices Involved", f"{invoices_with_transfers:,}")
@@ -50,10 +142,10 @@ def app(conn):
     
     with filter_col1:
         # Invoice filter
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT DISTINCT i.invoice_id, i.debtor_name
-            FROM invoices i
-            JOIN cash_transfers ct ON i.invoice_id = ct.invoice_id
+            FROM {invoices_table} i
+            JOIN {transfers_table} ct ON i.invoice_id = ct.invoice_id
             ORDER BY i.invoice_id DESC
         """)
         invoice_options = cursor.fetchall()
@@ -64,13 +156,11 @@ def app(conn):
         )
     
     with filter_col2:
-        # Event type filter
-        cursor.execute("SELECT DISTINCT event_description FROM cash_transfers ORDER BY event_description")
-        event_types = [row[0] for row in cursor.fetchall()]
-        
-        selected_event = st.selectbox(
+        # Event type filter: a fixed list of event codes
+        event_type = st.selectbox(
             "Filter by Event Type:",
-            options=["All Events"] + event_types
+            options=[None] + list(EVENT_TYPE_LABELS),
+            format_func=lambda code: "All Events" if code is None else EVENT_TYPE_LABELS[code]
         )
     
     # Get filtered data
@@ -79,23 +169,35 @@ def app(conn):
     else:
         invoice_filter = int(selected_invoice.split('#')[1].split(' -')[0])
     
-    # Build query based on filters
-    query = """
+    # Build query based on filters: the invoices with at least one matching transfer
+    query = f"""
         SELECT DISTINCT i.invoice_id, i.debtor_name, i.original_amount
-        FROM invoices i
-        JOIN cash_transfers ct ON i.invoice_id = ct.invoice_id
+        FROM {invoices_table} i
+        JOIN {transfers_table} ct ON i.invoice_id = ct.invoice_id
     """
+    conditions = []
     params = []
     
     if invoice_filter:
-        query += " WHERE i.invoice_id = ?"
+        conditions.append("i.invoice_id = ?")
         params.append(invoice_filter)
     
+    if event_type is not None:
+        conditions.append("ct.event_type = ?")
+        params.append(event_type)
+    
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    
     query += " ORDER BY i.invoice_id DESC"
     
     cursor.execute(query, params)
     invoices = cursor.fetchall()
     
+    if not invoices and total_transfers:
+        st.info("No cash transfers match these filters.")
+        return
+    
     if not invoices:
         st.info("No cash transfers recorded yet.")
         
@@ -116,80 +218,25 @@ def app(conn):
     # Results summary
     st.subheader(f"📋 Transfer History ({len(invoices)} invoices)")
     
-    # Display transfers by invoice
-    for invoice in invoices:
-        invoice_id, debtor_name, original_amount = invoice
-        
-        # Get transfers for this invoice
-        transfer_query = """
-            SELECT event_description, event_timestamp, amount, from_party, to_party
-            FROM cash_transfers
-            WHERE invoice_id = ?
-        """
-        transfer_params = [invoice_id]
-        
-        if selected_event != "All Events":
-            transfer_query += " AND event_description = ?"
-            transfer_params.append(selected_event)
-        
-        transfer_query += " ORDER BY event_timestamp ASC"
-        
-        cursor.execute(transfer_query, transfer_params)
-        transfers = cursor.fetchall()
-        
-        if not transfers:
-            continue
-        
-        # Calculate total for this invoice
-        total_in = sum(amount for _, _, amount, from_party, to_party in transfers if "User" not in from_party or from_party == "Debtor")
-        total_out = sum(amount for _, _, amount, from_party, to_party in transfers if "User" in to_party)
-        
-        with st.expander(
-            f"#{invoice_id} - {debtor_name} | ฿{original_amount:,.2f} | {len(transfers)} transfers", 
-            expanded=(len(invoices) <= 3)  # Auto-expand if few invoices
-        ):
-            # Transfer timeline
-            for i, transfer in enumerate(transfers):
-                event_desc, timestamp, amount, from_party, to_party = transfer
-                
-                # Determine transfer direction and color
-                if "PLATFORM OWNER" in to_party:
-                    color = "#ff9500"  # Orange for platform fees
-                    icon = "🏦"
-                elif "Buyer" in to_party:
-                    color = "#28a745"  # Green for payouts
-                    icon = "💰"
-                elif "Invoice Owner" in to_party and "Funded" in event_desc:
-                    color = "#007bff"  # Blue for funding
-                    icon = "💸"
-                else:
-                    color = "#6c757d"  # Gray for other
-                    icon = "📄"
-                
-                st.markdown(f"""
-                <div style="border-left: 4px solid {color}; padding: 12px; margin: 8px 0; background-color: #f8f9fa; border-radius: 0 8px 8px 0;">
-                    <div style="display: flex; justify-content: space-between; align-items: center;">
-                        <div>
-                            <strong>{icon} {event_desc}</strong><br>
-                            <small style="color: #6c757d;">{timestamp}</small>
-                        </div>
-                        <div style="text-align: right;">
-                            <strong style="font-size: 1.1em;">฿{amount:,.2f}</strong><br>
-                            <small>{from_party} → {to_party}</small>
-                        </div>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            # Invoice summary
-            st.markdown("---")
-            summary_detail_col1, summary_detail_col2 = st.columns(2)
-            
-            with summary_detail_col1:
-                st.markdown(f"**Total Money In:** ฿{total_in:,.2f}")
-            
-            with summary_detail_col2:
-                st.markdown(f"**Total Money Out:** ฿{total_out:,.2f}")
+    if render_grid_toggle("transfers_grid"):
+        # One table over all matching transfers; the selected transfer's invoice timeline opens below
+        selected = render_paged_grid(
+            "transfers",
+            transfers_page(conn, invoice_filter, event_type, include_archived),
+            TRANSFER_GRID_SORTS
+        )
+        if selected:
+            _, selected_invoice_id, debtor_name, *_ = selected
+            cursor.execute(f"""
+                SELECT {event_label_sql()}, event_timestamp, amount, from_party, to_party
+                FROM {transfers_table}
+                WHERE invoice_id = ?
+                ORDER BY event_timestamp ASC
+            """, (selected_invoice_id,))
+            st.markdown(f"**#{selected_invoice_id} - {debtor_name}: full timeline**")
+            render_transfer_timeline(cursor.fetchall())
+    else:
+        render_transfers_by_invoice(cursor, invoices, transfers_table, event_type)
     
     # Footer with navigation
     st.markdown("---")
@@ -1,6 +1,8 @@
 import streamlit as st
 from models import invoice as invoice_model
 from utils.helpers import check_invoice_activation
+from utils.money import Money
+from utils.payment_terms import parse_payment_terms
 
 def navigate_to(page_name):
     """Navigate to a specific page"""
@@ -109,24 +111,28 @@ def app(conn):
             else:
                 # Create the invoice
                 owner_id = st.session_state.selected_user["user_id"]
-                invoice_id = invoice_model.create_invoice(
-                    conn, owner_id, debtor, original_amount, terms, sale_price
-                )
-                
-                # Store success details in session state
-                st.session_state.invoice_created = True
-                st.session_state.created_invoice_id = invoice_id
-                st.session_state.created_invoice_details = {
-                    'debtor': debtor,
-                    'original_amount': original_amount,
-                    'sale_price': sale_price,
-                    'chunks_total': int(sale_price // 100)
-                }
-                
-                # Check if activation needed (shouldn't happen immediately, but good to check)
-                check_invoice_activation(conn, invoice_id)
-                
-                st.rerun()  # Rerun to show success message outside form
+                try:
+                    invoice_id = invoice_model.create_invoice(
+                        conn, owner_id, debtor, Money.from_baht(original_amount), terms, Money.from_baht(sale_price)
+                    )
+                except ValueError as e:
+                    st.error(f"❌ {str(e)}")
+                else:
+                    # Store success details in session state
+                    st.session_state.invoice_created = True
+                    st.session_state.created_invoice_id = invoice_id
+                    st.session_state.created_invoice_details = {
+                        'debtor': debtor,
+                        'original_amount': original_amount,
+                        'sale_price': sale_price,
+                        'chunks_total': int(sale_price // 100),
+                        'terms': terms
+                    }
+                    
+                    # Check if activation needed (shouldn't happen immediately, but good to check)
+                    check_invoice_activation(conn, invoice_id)
+                    
+                    st.rerun()  # Rerun to show success message outside form
     
     # Show success message and navigation OUTSIDE the form
     if st.session_state.invoice_created and st.session_state.created_invoice_id:
@@ -136,6 +142,14 @@ def app(conn):
         st.success(f"🎉 Invoice created successfully! ID: #{invoice_id}")
         st.balloons()
         
+        # The due date drives Browse's timeline filter, so say when the terms couldn't be read
+        due_date = parse_payment_terms(details.get('terms'))
+        if due_date:
+            st.caption(f"📅 Due date from payment terms: {due_date.strftime('%B %d, %Y')}")
+        else:
+            st.warning("📅 Couldn't read a due date from these payment terms; "
+                       "the invoice won't appear under Browse's timeline filters.")
+        
         # Show next steps
         st.markdown("### 🎯 What's Next?")
         st.info(f"""
@@ -1,7 +1,21 @@
+import math
 import streamlit as st
 from models import invoice as invoice_model
-from models import transaction as transaction_model
-from utils.helpers import process_invoice_owner_payment, format_currency, get_user_summary, format_number
+from models import portfolio as portfolio_model
+from models.cash_transfer import event_label_sql
+from utils.helpers import process_invoice_owner_payment, format_currency, format_money, format_number
+from utils.data_loader import get_loader
+from utils.fix_invoices import fix_all_pending_invoices
+from database.connection import write_transaction
+from utils.system_accounts import platform_owner_party
+from utils.risk_engine import get_open_positions, positions_version, simulate_portfolio_risk
+from components.trend_charts import render_volume_chart, render_earnings_chart
+from components.market_panel import render_sell_panel
+from components.data_grid import render_grid_toggle, render_paged_grid
+from config import GRID_PAGE_SIZE
+from components.activity_feed import render_user_activity_feed
+from components.debtor_exposure import render_debtor_exposure
+from components.settlement_panel import render_bulk_settlement
 
 def navigate_to(page_name):
     """Navigate to a specific page"""
@@ -9,11 +23,201 @@ def navigate_to(page_name):
     st.session_state.current_page = page_name
     st.rerun()
 
+@st.cache_data(show_spinner="🎲 Simulating default and late-payment scenarios...", max_entries=256)
+def simulate_risk_cached(version, user_id, _conn):
+    """Risk results are cached per positions version, so reruns neither re-read positions nor re-simulate"""
+    return simulate_portfolio_risk(get_open_positions(_conn, user_id))
+
+def render_risk_simulation(conn, user_id=None):
+    """Show the Monte Carlo loss distribution for one investor, or the whole platform, once asked for"""
+    # Expander bodies run even when collapsed, so nothing is read until the toggle is on
+    if not st.toggle("Run simulation", key=f"risk_simulation_{user_id}"):
+        return
+    
+    risk = simulate_risk_cached(positions_version(conn, user_id), user_id, conn)
+    if not risk:
+        st.info("No open positions to simulate.")
+        return
+    
+    metrics = risk['investors'][user_id] if user_id is not None else risk['platform']
+    
+    col_a, col_b, col_c, col_d = st.columns(4)
+    with col_a:
+        st.metric("Expected Return", f"{metrics['expected_return'] * 100:.1f}%")
+    with col_b:
+        st.metric("VaR 95%", format_currency(max(metrics['var_95'], 0)))
+    with col_c:
+        st.metric("VaR 99%", format_currency(max(metrics['var_99'], 0)))
+    with col_d:
+        st.metric("Chance of Loss", f"{metrics['probability_of_loss'] * 100:.1f}%")
+    
+    counts, edges = risk['histogram']
+    st.bar_chart({
+        "Profit/Loss (฿)": [round((low + high) / 2) for low, high in zip(edges, edges[1:])],
+        "Scenarios": counts
+    }, x="Profit/Loss (฿)", y="Scenarios")
+    
+    st.caption(
+        f"{risk['scenarios']:,} simulated scenarios of debtor default and late payment. "
+        f"Expected profit {format_currency(metrics['expected_pnl'])} on {format_currency(metrics['invested'])} invested; "
+        f"average loss in the worst 5% of scenarios {format_currency(max(metrics['expected_shortfall_95'], 0))}."
+    )
+
+INVOICE_GRID_SORTS = {
+    "Newest": "newest",
+    "Status": "status",
+    "Debtor": "debtor",
+    "Amount": "amount",
+    "Remaining chunks": "remaining",
+    "Due date": "due"
+}
+
+INVESTMENT_GRID_SORTS = {
+    "Last purchase": "recent",
+    "Invoice": "invoice",
+    "Chunks": "chunks",
+    "Expected profit": "return",
+    "Debtor": "debtor",
+    "Invoice status": "status"
+}
+
+def render_owned_invoice(conn, invoice, user_id):
+    """Details and the debtor-paid action for one of the user's own invoices"""
+    col_a, col_b = st.columns([2, 1])
+    
+    with col_a:
+        st.write(f"**Original Amount:** {format_money(invoice.original_amount)}")
+        st.write(f"**Sale Price:** {format_money(invoice.desired_sale_price)}")
+        st.write(f"**Payment Terms:** {invoice.payment_terms}")
+        if invoice.due_date:
+            st.write(f"**Due Date:** {invoice.due_date}")
+        
+        # Progress bar
+        progress = (invoice.chunks_sold / invoice.chunks_total) if invoice.chunks_total > 0 else 0
+        st.progress(progress, text=f"{invoice.chunks_sold}/{invoice.chunks_total} chunks sold ({progress*100:.0f}%)")
+        
+        # Status indicator
+        status_colors = {
+            'Pending': '🟡',
+            'Active': '🟢', 
+            'Paid': '✅',
+            'Expired': '⌛'
+        }
+        st.write(f"**Status:** {status_colors.get(invoice.status, '❓')} {invoice.status}")
+        
+        if invoice.status == 'Active':
+            st.info("💡 Invoice is fully funded! Waiting for debtor payment.")
+        elif invoice.status == 'Pending':
+            remaining = invoice.chunks_remaining
+            st.info(f"⏳ Need {remaining} more chunks (฿{remaining * 100}) to activate")
+            if invoice.funding_deadline:
+                st.caption(f"Funding deadline: {invoice.funding_deadline[:16]} UTC")
+        elif invoice.status == 'Expired':
+            st.warning("⌛ Funding deadline passed before the invoice was fully funded. Buyers were refunded.")
+    
+    with col_b:
+        if invoice.status == 'Active':
+            st.write("**Mark as Paid**")
+            st.write("Click when debtor pays:")
+            if st.button("💰 Debtor Paid", key=f"pay_{invoice.invoice_id}"):
+                try:
+                    process_invoice_owner_payment(conn, invoice.invoice_id, user_id)
+                    st.success("✅ Payment processed! Buyers have been paid out.")
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Error: {str(e)}")
+        elif invoice.status == 'Paid':
+            st.success("✅ Completed")
+        else:
+            st.write("**Potential Profit:**")
+            profit = invoice.original_amount - invoice.desired_sale_price
+            st.write(format_money(profit))
+
+def render_investment(position):
+    """Details for one portfolio Position"""
+    col_a, col_b = st.columns([2, 1])
+    
+    with col_a:
+        st.write(f"**Investment:** {position.chunks} chunks = {format_money(position.invested)}")
+        st.write(f"**Expected Return:** {format_money(position.expected_return)}")
+        st.write(f"**Expected Profit:** {format_money(position.expected_profit)}")
+        if position.accrued is not None:
+            st.write(f"**Accrued So Far:** {format_money(position.accrued)} (as of {position.accrual_date})")
+        st.write(f"**ROI:** {position.roi:.1f}%")
+        
+        if position.purchases > 1:
+            st.write(f"**Purchases:** {position.purchases} ({position.first_purchase} – {position.last_purchase})")
+        else:
+            st.write(f"**Purchase Date:** {position.last_purchase}")
+    
+    with col_b:
+        status_info = {
+            'Pending Activation': ('⏳', 'Waiting for full funding'),
+            'Active': ('🟢', 'Invoice is active!'),
+            'Paid Out': ('✅', 'You\'ve been paid!'),
+            'Voided': ('↩️', 'Refunded - funding deadline passed'),
+            'Paid': ('✅', 'Completed')
+        }
+        
+        emoji, description = status_info.get(position.status, ('❓', 'Unknown status'))
+        st.write(f"**Status:** {emoji}")
+        st.write(description)
+
+def render_owner_cash_flow(conn, user_id):
+    """Expected debtor payments on the user's open invoices, by month of due date"""
+    months = invoice_model.get_owner_cash_flow(conn, user_id)
+    if not months:
+        st.info("No open invoices with a due date.")
+        return
+    st.dataframe({
+        "Month": [month for month, _, _ in months],
+        "Invoices": [count for _, count, _ in months],
+        "Expected": [format_money(amount) for _, _, amount in months]
+    }, hide_index=True, use_container_width=True)
+
+def owned_invoices_page(conn, user_id):
+    """Grid page fetcher for the user's own invoices; rows are keyed by Invoice record"""
+    def fetch_page(sort, descending, limit, offset):
+        invoices, total = invoice_model.get_invoices_page(
+            conn, owner_id=user_id, sort=sort, descending=descending, limit=limit, offset=offset
+        )
+        table = {
+            "#": [invoice.invoice_id for invoice in invoices],
+            "Debtor": [invoice.debtor_name for invoice in invoices],
+            "Amount": [format_money(invoice.original_amount) for invoice in invoices],
+            "Sale Price": [format_money(invoice.desired_sale_price) for invoice in invoices],
+            "Chunks Sold": [f"{invoice.chunks_sold}/{invoice.chunks_total}" for invoice in invoices],
+            "Due": [invoice.due_date or "-" for invoice in invoices],
+            "Status": [invoice.status for invoice in invoices]
+        }
+        return table, invoices, total
+    return fetch_page
+
+def investments_page(conn, user_id):
+    """Grid page fetcher for the user's positions; rows are keyed by Position record"""
+    def fetch_page(sort, descending, limit, offset):
+        positions, total = portfolio_model.get_positions_page(
+            conn, user_id, sort=sort, descending=descending, limit=limit, offset=offset
+        )
+        table = {
+            "#": [position.invoice_id for position in positions],
+            "Debtor": [position.debtor_name for position in positions],
+            "Chunks": [position.chunks for position in positions],
+            "Invested": [format_money(position.invested) for position in positions],
+            "Expected Profit": [format_money(position.expected_profit) for position in positions],
+            "Accrued": [format_money(position.accrued) if position.accrued is not None else "-" for position in positions],
+            "Last Purchase": [position.last_purchase for position in positions],
+            "Status": [position.status for position in positions]
+        }
+        return table, positions, total
+    return fetch_page
+
 def show_platform_dashboard(conn):
     """Display platform owner earnings and statistics"""
     st.subheader("🏦 Platform Owner Dashboard")
     
     cursor = conn.cursor()
+    platform_party = platform_owner_party(conn)
     
     # Platform earnings summary
     cursor.execute("""
@@ -21,32 +225,57 @@ def show_platform_dashboard(conn):
             COUNT(*) as total_fees,
             COALESCE(SUM(amount), 0) as total_earnings
         FROM cash_transfers 
-        WHERE to_party LIKE '%PLATFORM OWNER%'
-    """)
+        WHERE to_party = ?
+    """, (platform_party,))
     fee_stats = cursor.fetchone()
     
     col1, col2 = st.columns(2)
     with col1:
-        st.metric("💰 Total Platform Earnings", format_currency(fee_stats[1]))
+        st.metric("💰 Total Platform Earnings", format_money(fee_stats[1]))
     with col2:
         st.metric("📊 Number of Fee Collections", fee_stats[0])
+
+    # Platform totals of the last nightly yield accrual (utils/accrue_yield.py)
+    cursor.execute("""
+        SELECT accrual_date, positions, accrued FROM accrual_days
+        ORDER BY accrual_date DESC LIMIT 1
+    """)
+    accrual = cursor.fetchone()
+    if accrual:
+        st.caption(f"📅 Investor yield accrued on {accrual[1]:,} Active positions: "
+                   f"{format_money(accrual[2])} as of {accrual[0]}")
+
+    with st.expander("🎲 Platform Risk Simulation"):
+        render_risk_simulation(conn)
+    
+    # Month-end settlement of many paid invoices in one run
+    with st.expander("🧾 Bulk Settlement", expanded=bool(st.session_state.get('settlement_report'))):
+        render_bulk_settlement(conn)
+    
+    # Concentration per debtor
+    st.subheader("🏢 Debtor Exposure")
+    render_debtor_exposure(conn)
+    
+    # Earnings trend from the ledger rollups
+    st.subheader("📈 Monthly Earnings")
+    render_earnings_chart(conn, bucket="month", periods=24)
     
     # Detailed earnings breakdown
     st.subheader("💸 Earnings Breakdown")
     
-    cursor.execute("""
+    cursor.execute(f"""
         SELECT 
             ct.invoice_id,
             ct.amount,
             ct.event_timestamp,
-            ct.event_description,
+            {event_label_sql('ct')},
             i.debtor_name,
             i.original_amount
         FROM cash_transfers ct
         JOIN invoices i ON ct.invoice_id = i.invoice_id
-        WHERE ct.to_party LIKE '%PLATFORM OWNER%'
+        WHERE ct.to_party = ?
         ORDER BY ct.event_timestamp DESC
-    """)
+    """, (platform_party,))
     
     earnings = cursor.fetchall()
     
@@ -58,13 +287,13 @@ def show_platform_dashboard(conn):
             
             st.markdown(f"""
             <div style='padding: 10px; border-left: 3px solid green; margin: 5px 0; background-color: #f9f9f9;'>
-                <strong>💰 {format_currency(amount)}</strong> from Invoice #{invoice_id}<br>
-                <em>{debtor}</em> (Original: {format_currency(original)})<br>
+                <strong>💰 {format_money(amount)}</strong> from Invoice #{invoice_id}<br>
+                <em>{debtor}</em> (Original: {format_money(original)})<br>
                 <small>{timestamp} - {description}</small>
             </div>
             """, unsafe_allow_html=True)
         
-        st.info(f"Total shown: {format_currency(total_shown)}")
+        st.info(f"Total shown: {format_money(total_shown)}")
     else:
         st.info("No platform earnings yet. Earnings will appear when deals are completed!")
     
@@ -73,6 +302,11 @@ def show_platform_dashboard(conn):
         st.session_state.show_platform_dashboard = False
         st.rerun()
 
+def declare_data(conn, loader, user_id):
+    """The user summary, fetched together with the header by main.py"""
+    if user_id is not None:
+        loader.request_user_summary(user_id)
+
 def app(conn):
     # Breadcrumb navigation
     st.markdown("🏠 [Home](#) > 📊 **Dashboard**")
@@ -108,54 +342,22 @@ def app(conn):
         st.write("If you have invoices that are fully funded but still show as 'Pending', click below to fix them:")
         
         if st.button("🔄 Fix Pending Invoices", help="This will check all pending invoices and activate those that are fully funded"):
-            cursor = conn.cursor()
-            
-            # Get all pending invoices that are actually fully funded
-            cursor.execute("""
-                SELECT invoice_id, chunks_sold, chunks_total, desired_sale_price, owner_user_id, debtor_name
-                FROM invoices 
-                WHERE status = 'Pending' AND chunks_sold >= chunks_total
-            """)
-            
-            invoices_to_fix = cursor.fetchall()
-            
-            if invoices_to_fix:
-                for invoice_data in invoices_to_fix:
-                    invoice_id, chunks_sold, chunks_total, sale_price, owner_id, debtor = invoice_data
-                    
-                    # Update invoice status to Active
-                    cursor.execute("UPDATE invoices SET status = 'Active' WHERE invoice_id = ?", (invoice_id,))
-                    
-                    # Update all related transactions to Active status
-                    cursor.execute("""
-                        UPDATE transactions 
-                        SET status = 'Active'
-                        WHERE invoice_id = ? AND status = 'Pending Activation'
-                    """, (invoice_id,))
-                    
-                    # Create cash transfer record
-                    funding_amount = chunks_total * 100
-                    cursor.execute("""
-                        INSERT INTO cash_transfers (
-                            invoice_id, event_description, amount, from_party, to_party
-                        ) VALUES (?, ?, ?, ?, ?)
-                    """, (
-                        invoice_id, 
-                        "Invoice Fully Funded - Cash Released to Owner (Auto-Fixed)", 
-                        funding_amount, 
-                        "Collective Buyers", 
-                        f"Invoice Owner (User {owner_id})"
-                    ))
-                
-                conn.commit()
-                st.success(f"✅ Fixed {len(invoices_to_fix)} invoices! They are now Active.")
-                st.rerun()
+            try:
+                with write_transaction(conn):
+                    fixed_count = fix_all_pending_invoices(conn)
+            except ValueError as e:
+                st.error(f"Error: {str(e)}")
             else:
-                st.info("No invoices need fixing. All fully-funded invoices are already Active.")
+                if fixed_count:
+                    st.success(f"✅ Fixed {fixed_count} invoices! They are now Active.")
+                    st.rerun()
+                else:
+                    st.info("No invoices need fixing. All fully-funded invoices are already Active.")
     
     
     # Get user summary
-    summary = get_user_summary(conn, user_id)
+    loader = get_loader(conn)
+    summary = loader.user_summary(user_id)
     
     # Portfolio Overview
     col1, col2, col3, col4 = st.columns(4)
@@ -163,11 +365,15 @@ def app(conn):
     with col1:
         st.metric("📋 Invoices Created", format_number(summary['owned_invoices']))
     with col2:
-        st.metric("💰 Total Invoice Value", format_currency(summary['owned_value']))
+        st.metric("💰 Total Invoice Value", format_money(summary['owned_value']))
     with col3:
         st.metric("🎯 Investment Deals", format_number(summary['investments']))
     with col4:
-        st.metric("💸 Total Invested", format_currency(summary['investment_value']))
+        st.metric("💸 Total Invested", format_money(summary['investment_value']))
+    
+    with st.expander("📈 Market Trends"):
+        st.write("**Monthly funding and payouts across the platform:**")
+        render_volume_chart(conn, bucket="month", periods=12, event_types=["funding", "buyer_payout"])
     
     st.markdown("---")
     
@@ -176,148 +382,93 @@ def app(conn):
     
     with col_left:
         st.subheader("📄 Your Invoices")
-        owned_invoices = invoice_model.get_invoices_by_owner(conn, user_id)
         
-        if owned_invoices:
-            for invoice in owned_invoices:
-                invoice_id, _, debtor, amount, terms, sale_price, total_chunks, sold_chunks, status = invoice
-                
-                # Create expandable card for each invoice
-                with st.expander(f"#{invoice_id} - {debtor} | {status}", expanded=(status == 'Active')):
-                    col_a, col_b = st.columns([2, 1])
-                    
-                    with col_a:
-                        st.write(f"**Original Amount:** {format_currency(amount)}")
-                        st.write(f"**Sale Price:** {format_currency(sale_price)}")
-                        st.write(f"**Payment Terms:** {terms}")
-                        
-                        # Progress bar
-                        progress = (sold_chunks / total_chunks) if total_chunks > 0 else 0
-                        st.progress(progress, text=f"{sold_chunks}/{total_chunks} chunks sold ({progress*100:.0f}%)")
-                        
-                        # Status indicator
-                        status_colors = {
-                            'Pending': '🟡',
-                            'Active': '🟢', 
-                            'Paid': '✅'
-                        }
-                        st.write(f"**Status:** {status_colors.get(status, '❓')} {status}")
-                        
-                        if status == 'Active':
-                            st.info("💡 Invoice is fully funded! Waiting for debtor payment.")
-                        elif status == 'Pending':
-                            remaining = total_chunks - sold_chunks
-                            st.info(f"⏳ Need {remaining} more chunks (฿{remaining * 100}) to activate")
-                    
-                    with col_b:
-                        if status == 'Active':
-                            st.write("**Mark as Paid**")
-                            st.write("Click when debtor pays:")
-                            if st.button("💰 Debtor Paid", key=f"pay_{invoice_id}"):
-                                try:
-                                    process_invoice_owner_payment(conn, invoice_id, user_id)
-                                    st.success("✅ Payment processed! Buyers have been paid out.")
-                                    st.rerun()
-                                except Exception as e:
-                                    st.error(f"Error: {str(e)}")
-                        elif status == 'Paid':
-                            st.success("✅ Completed")
-                        else:
-                            st.write("**Potential Profit:**")
-                            profit = amount - sale_price
-                            st.write(format_currency(profit))
-        else:
+        if summary['owned_invoices'] == 0:
             st.info("🎯 You haven't created any invoices yet.")
             if st.button("📝 Create Your First Invoice", use_container_width=True):
                 navigate_to("Create Invoice")
+        else:
+            with st.expander("📅 Expected Cash Flow"):
+                render_owner_cash_flow(conn, user_id)
+            
+            if render_grid_toggle("dashboard_invoices_grid"):
+                selected = render_paged_grid("dashboard_invoices", owned_invoices_page(conn, user_id), INVOICE_GRID_SORTS)
+                if selected:
+                    st.markdown(f"**#{selected.invoice_id} - {selected.debtor_name}**")
+                    render_owned_invoice(conn, selected, user_id)
+            else:
+                # Cards for one page of invoices, newest first, fetched with LIMIT/OFFSET like the grid
+                page_count = max(1, math.ceil(summary['owned_invoices'] / GRID_PAGE_SIZE))
+                page = min(st.session_state.get("dashboard_invoice_cards_page", 1), page_count)
+                st.session_state.dashboard_invoice_cards_page = page
+                if page_count > 1:
+                    page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, step=1,
+                                           key="dashboard_invoice_cards_page")
+                invoices, _ = invoice_model.get_invoices_page(
+                    conn, owner_id=user_id, limit=GRID_PAGE_SIZE, offset=(page - 1) * GRID_PAGE_SIZE
+                )
+                for invoice in invoices:
+                    # Create expandable card for each invoice
+                    with st.expander(f"#{invoice.invoice_id} - {invoice.debtor_name} | {invoice.status}", expanded=(invoice.status == 'Active')):
+                        render_owned_invoice(conn, invoice, user_id)
     
     with col_right:
         st.subheader("💼 Your Investments")
         
-        # Get user's investments
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT 
-                t.invoice_id,
-                t.chunks_purchased,
-                t.status as transaction_status,
-                t.purchase_timestamp,
-                i.debtor_name,
-                i.original_amount,
-                i.desired_sale_price,
-                i.chunks_total,
-                i.status as invoice_status
-            FROM transactions t
-            JOIN invoices i ON t.invoice_id = i.invoice_id
-            WHERE t.buyer_user_id = ?
-            ORDER BY t.purchase_timestamp DESC
-        """, (user_id,))
-        
-        investments = cursor.fetchall()
-        
-        if investments:
-            total_investment = 0
-            potential_returns = 0
-            
-            for investment in investments:
-                (inv_id, chunks, trans_status, timestamp, debtor, orig_amount, 
-                 sale_price, total_chunks, inv_status) = investment
-                
-                investment_amount = chunks * 100
-                total_investment += investment_amount
-                
-                # Calculate potential return AFTER 10% platform fee
-                base_return_per_chunk = orig_amount / total_chunks
-                total_profit = orig_amount - (total_chunks * 100)  # Total profit in the deal
-                platform_fee_total = total_profit * 0.10  # 10% of total profit
-                platform_fee_per_chunk = platform_fee_total / total_chunks
-                net_return_per_chunk = base_return_per_chunk - platform_fee_per_chunk
-                
-                potential_return = chunks * net_return_per_chunk
-                potential_returns += potential_return
-                profit = potential_return - investment_amount
-                
-                with st.expander(f"#{inv_id} - {debtor} | {inv_status}", expanded=(inv_status == 'Active')):
-                    col_a, col_b = st.columns([2, 1])
-                    
-                    with col_a:
-                        st.write(f"**Investment:** {chunks} chunks = {format_currency(investment_amount)}")
-                        st.write(f"**Expected Return:** {format_currency(potential_return)}")
-                        st.write(f"**Expected Profit:** {format_currency(profit)}")
-                        
-                        roi = (profit / investment_amount * 100) if investment_amount > 0 else 0
-                        st.write(f"**ROI:** {roi:.1f}%")
-                        
-                        st.write(f"**Purchase Date:** {timestamp}")
-                    
-                    with col_b:
-                        status_info = {
-                            'Pending Activation': ('⏳', 'Waiting for full funding'),
-                            'Active': ('🟢', 'Invoice is active!'),
-                            'Paid Out': ('✅', 'You\'ve been paid!'),
-                            'Paid': ('✅', 'Completed')
-                        }
-                        
-                        emoji, description = status_info.get(trans_status, ('❓', 'Unknown status'))
-                        st.write(f"**Status:** {emoji}")
-                        st.write(description)
+        if summary['investments'] > 0:
+            if render_grid_toggle("dashboard_investments_grid"):
+                selected = render_paged_grid("dashboard_investments", investments_page(conn, user_id), INVESTMENT_GRID_SORTS)
+                if selected:
+                    st.markdown(f"**#{selected.invoice_id} - {selected.debtor_name}**")
+                    render_investment(selected)
+            else:
+                # Cards for the most recent positions; more load a page at a time
+                shown = st.session_state.get("dashboard_positions_shown", GRID_PAGE_SIZE)
+                positions, total_positions = portfolio_model.get_positions_page(conn, user_id, limit=shown)
+                for position in positions:
+                    with st.expander(f"#{position.invoice_id} - {position.debtor_name} | {position.invoice_status}",
+                                     expanded=(position.status == 'Active')):
+                        render_investment(position)
+                if total_positions > shown:
+                    st.caption(f"Showing {shown:,} of {total_positions:,} positions")
+                    if st.button("Show more positions", key="dashboard_positions_more"):
+                        st.session_state.dashboard_positions_shown = shown + GRID_PAGE_SIZE
+                        st.rerun()
             
             # Investment Summary
+            portfolio = portfolio_model.get_portfolio_summary(conn, user_id)
+            
             st.markdown("---")
             st.subheader("💰 Investment Summary")
             
             col_a, col_b = st.columns(2)
             with col_a:
-                st.metric("Total Invested", format_currency(total_investment))
+                st.metric("Total Invested", format_money(portfolio['invested']))
             with col_b:
-                st.metric("Potential Returns", format_currency(potential_returns))
+                st.metric("Potential Returns", format_money(portfolio['expected_return']))
             
-            total_profit = potential_returns - total_investment
-            overall_roi = (total_profit / total_investment * 100) if total_investment > 0 else 0
+            total_investment = portfolio['invested']
+            overall_roi = (portfolio['expected_profit'] / total_investment * 100) if total_investment > 0 else 0
             
-            st.write(f"**Expected Total Profit:** {format_currency(total_profit)}")
+            st.write(f"**Expected Total Profit:** {format_money(portfolio['expected_profit'])}")
+            if portfolio['accrual_date']:
+                st.write(f"**Accrued Yield:** {format_money(portfolio['accrued'])} (as of {portfolio['accrual_date']})")
             st.write(f"**Overall ROI:** {overall_roi:.1f}%")
             
+            if len(portfolio['by_status']) > 1:
+                st.dataframe({
+                    "Status": list(portfolio['by_status']),
+                    "Positions": [totals['positions'] for totals in portfolio['by_status'].values()],
+                    "Chunks": [totals['chunks'] for totals in portfolio['by_status'].values()],
+                    "Invested": [format_money(totals['invested']) for totals in portfolio['by_status'].values()]
+                }, hide_index=True, use_container_width=True)
+            
+            with st.expander("🎲 Risk Simulation"):
+                render_risk_simulation(conn, user_id)
+            
+            with st.expander("🔁 Sell on Secondary Market"):
+                render_sell_panel(conn, user_id)
+            
         else:
             st.info("🎯 You haven't made any investments yet.")
             if st.button("🛒 Browse Investment Opportunities", use_container_width=True):
@@ -327,48 +478,8 @@ def app(conn):
     st.markdown("---")
     st.subheader("📈 Recent Activity")
     
-    # Get recent cash transfers involving this user
-    cursor.execute("""
-        SELECT 
-            ct.event_description,
-            ct.event_timestamp,
-            ct.amount,
-            ct.from_party,
-            ct.to_party,
-            i.debtor_name,
-            ct.invoice_id
-        FROM cash_transfers ct
-        JOIN invoices i ON ct.invoice_id = i.invoice_id
-        WHERE ct.from_party LIKE ? OR ct.to_party LIKE ?
-        ORDER BY ct.event_timestamp DESC
-        LIMIT 10
-    """, (f"%User {user_id}%", f"%User {user_id}%"))
-    
-    recent_transfers = cursor.fetchall()
-    
-    if recent_transfers:
-        for transfer in recent_transfers:
-            event, timestamp, amount, from_party, to_party, debtor, inv_id = transfer
-            
-            # Determine if money was received or sent
-            if f"User {user_id}" in to_party:
-                direction = "received"
-                color = "green"
-                emoji = "💰"
-            else:
-                direction = "sent"
-                color = "red"
-                emoji = "💸"
-            
-            st.markdown(f"""
-            <div style='padding: 10px; border-left: 3px solid {color}; margin: 5px 0; background-color: #f9f9f9;'>
-                <strong>{emoji} {event}</strong><br>
-                Invoice #{inv_id} - {debtor}<br>
-                {direction.title()} {format_currency(amount)} on {timestamp}
-            </div>
-            """, unsafe_allow_html=True)
-    else:
-        st.info("No recent activity. Your financial transactions will appear here.")
+    # Recent cash transfers involving this user (polls for new transfers on a timer)
+    render_user_activity_feed(conn, user_id)
     
     # Navigation footer
     st.markdown("---")
@@ -1,5 +1,9 @@
 import streamlit as st
-from utils.helpers import format_currency, format_number
+from utils.helpers import format_money, format_number
+from utils.system_accounts import platform_owner_party
+from components.trend_charts import render_volume_chart, render_earnings_chart
+from utils.data_loader import get_loader
+from components.activity_feed import render_recent_invoices_feed
 
 def navigate_to(page_name):
     """Navigate to a specific page"""
@@ -29,54 +33,45 @@ def create_quick_actions():
         if st.button("📊 My Dashboard", use_container_width=True):
             navigate_to("Dashboard")
 
+HOME_SCALARS = [
+    'invoice_count', 'active_invoice_count', 'invoice_value_total', 'available_investment',
+    'unpaid_invoice_count', 'funded_unpaid_invoice_count', 'transfer_total',
+    'average_invoice_amount', 'average_sale_price'
+]
+
+def declare_data(conn, loader, user_id):
+    """Everything the home page reads, fetched together with the header by main.py"""
+    for name in HOME_SCALARS:
+        loader.request(name)
+    loader.request('party_received_total', party=platform_owner_party(conn))
+    loader.request('invoice_status_counts')
+
 def app(conn):
     st.title("🏦 Invoice Refactoring MVP")
     st.markdown("**Turn your outstanding invoices into immediate cash flow**")
     
-    # Get real-time platform statistics
-    cursor = conn.cursor()
+    # Get real-time platform statistics (declared up front, loaded before the page renders)
+    loader = get_loader(conn)
     
     # Platform Overview Metrics
     col1, col2, col3, col4, col5 = st.columns(5)
     
-    # Total Invoices
-    cursor.execute("SELECT COUNT(*) FROM invoices")
-    total_invoices = cursor.fetchone()[0]
-    
-    # Active Deals (fully funded)
-    cursor.execute("SELECT COUNT(*) FROM invoices WHERE status = 'Active'")
-    active_deals = cursor.fetchone()[0]
-    
-    # Total Value Processed
-    cursor.execute("SELECT COALESCE(SUM(original_amount), 0) FROM invoices")
-    total_value = cursor.fetchone()[0]
-    
-    # Available Investment Opportunities
-    cursor.execute("""
-        SELECT COALESCE(SUM((chunks_total - chunks_sold) * 100), 0) 
-        FROM invoices 
-        WHERE status = 'Pending'
-    """)
-    available_investment = cursor.fetchone()[0]
-    
-    # Platform earnings
-    cursor.execute("""
-        SELECT COALESCE(SUM(amount), 0)
-        FROM cash_transfers 
-        WHERE to_party LIKE '%PLATFORM OWNER%'
-    """)
-    platform_earnings = cursor.fetchone()[0]
+    total_invoices = loader.get('invoice_count')
+    active_deals = loader.get('active_invoice_count')  # fully funded
+    total_value = loader.get('invoice_value_total')
+    available_investment = loader.get('available_investment')
+    platform_earnings = loader.get('party_received_total', party=platform_owner_party(conn))
     
     with col1:
         st.metric("📋 Total Invoices", format_number(total_invoices))
     with col2:
         st.metric("✅ Active Deals", format_number(active_deals))
     with col3:
-        st.metric("💰 Total Value", format_currency(total_value))
+        st.metric("💰 Total Value", format_money(total_value))
     with col4:
-        st.metric("🎯 Available Investment", format_currency(available_investment))
+        st.metric("🎯 Available Investment", format_money(available_investment))
     with col5:
-        st.metric("🏦 Platform Earnings", format_currency(platform_earnings))
+        st.metric("🏦 Platform Earnings", format_money(platform_earnings))
     
     st.markdown("---")
     
@@ -110,32 +105,8 @@ def app(conn):
     with col_right:
         st.subheader("📈 Recent Activity")
         
-        # Recent Invoices
-        cursor.execute("""
-            SELECT debtor_name, original_amount, status, chunks_sold, chunks_total
-            FROM invoices 
-            ORDER BY invoice_id DESC 
-            LIMIT 5
-        """)
-        recent_invoices = cursor.fetchall()
-        
-        if recent_invoices:
-            for invoice in recent_invoices:
-                debtor, amount, status, sold, total = invoice
-                progress = (sold / total * 100) if total > 0 else 0
-                
-                status_emoji = {
-                    'Pending': '⏳',
-                    'Active': '✅', 
-                    'Paid': '💰'
-                }.get(status, '❓')
-                
-                st.markdown(f"""
-                **{status_emoji} {debtor}**  
-                {format_currency(amount)} | {progress:.0f}% funded
-                """)
-        else:
-            st.info("No invoices yet - be the first!")
+        # Recent Invoices (polls for new invoices on a timer)
+        render_recent_invoices_feed(conn)
         
         st.markdown("---")
         
@@ -147,19 +118,14 @@ def app(conn):
     st.markdown("---")
     st.subheader("📊 Platform Statistics")
     
-    tab1, tab2 = st.tabs(["💼 Invoice Status", "💰 Financial Overview"])
+    tab1, tab2, tab3 = st.tabs(["💼 Invoice Status", "💰 Financial Overview", "📈 Trends"])
     
     with tab1:
         col1, col2 = st.columns(2)
         
         with col1:
             # Invoice status breakdown
-            cursor.execute("""
-                SELECT status, COUNT(*) as count
-                FROM invoices 
-                GROUP BY status
-            """)
-            status_data = cursor.fetchall()
+            status_data = loader.get('invoice_status_counts')
             
             if status_data:
                 st.write("**Invoice Status Breakdown:**")
@@ -170,17 +136,10 @@ def app(conn):
         
         with col2:
             # Funding progress
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total,
-                    SUM(CASE WHEN chunks_sold >= chunks_total THEN 1 ELSE 0 END) as fully_funded
-                FROM invoices 
-                WHERE status != 'Paid'
-            """)
-            funding_stats = cursor.fetchone()
+            total = loader.get('unpaid_invoice_count')
+            funded = loader.get('funded_unpaid_invoice_count')
             
-            if funding_stats and funding_stats[0] > 0:
-                total, funded = funding_stats
+            if total > 0:
                 funding_rate = (funded / total * 100) if total > 0 else 0
                 st.write("**Funding Success Rate:**")
                 st.write(f"- {funded}/{total} invoices fully funded")
@@ -193,31 +152,26 @@ def app(conn):
         
         with col1:
             # Money flow
-            cursor.execute("""
-                SELECT 
-                    COALESCE(SUM(amount), 0) as total_transferred
-                FROM cash_transfers
-            """)
-            total_transferred = cursor.fetchone()[0]
+            total_transferred = loader.get('transfer_total')
             
-            st.metric("💸 Total Money Flow", format_currency(total_transferred))
+            st.metric("💸 Total Money Flow", format_money(total_transferred))
         
         with col2:
             # Average deal size
-            cursor.execute("""
-                SELECT 
-                    COALESCE(AVG(original_amount), 0) as avg_invoice,
-                    COALESCE(AVG(desired_sale_price), 0) as avg_sale_price
-                FROM invoices
-            """)
-            avg_data = cursor.fetchone()
+            avg_invoice = loader.get('average_invoice_amount')
+            avg_sale = loader.get('average_sale_price')
             
-            if avg_data:
-                avg_invoice, avg_sale = avg_data
-                st.metric("📊 Avg Invoice Size", format_currency(avg_invoice))
-                if avg_invoice > 0:
-                    discount_rate = ((avg_invoice - avg_sale) / avg_invoice * 100)
-                    st.write(f"*Avg discount: {discount_rate:.1f}%*")
+            st.metric("📊 Avg Invoice Size", format_money(avg_invoice))
+            if avg_invoice > 0:
+                discount_rate = ((avg_invoice - avg_sale) / avg_invoice * 100)
+                st.write(f"*Avg discount: {discount_rate:.1f}%*")
+    
+    with tab3:
+        st.write("**Daily Ledger Volume (last 90 days):**")
+        render_volume_chart(conn, bucket="day", periods=90)
+        
+        st.write("**Monthly Platform Earnings:**")
+        render_earnings_chart(conn, bucket="month", periods=12)
     
     # Footer
     st.markdown("---")
@@ -1,5 +1,6 @@
 import streamlit as st
 from models import user as user_model
+from utils.system_accounts import PLATFORM_OWNER_USERNAME
 
 def navigate_to(page_name):
     """Navigate to a specific page"""
@@ -30,8 +31,8 @@ def app(conn):
         
         if submit:
             if new_username:
-                if new_username == "PLATFORM OWNER":
-                    st.error("❌ Cannot create user with reserved name 'PLATFORM OWNER'")
+                if new_username == PLATFORM_OWNER_USERNAME:
+                    st.error(f"❌ Cannot create user with reserved name '{PLATFORM_OWNER_USERNAME}'")
                 else:
                     try:
                         user_id = user_model.create_user(conn, new_username)
@@ -54,7 +55,7 @@ def app(conn):
     cursor.execute("""
         SELECT user_id, username 
         FROM users 
-        WHERE username != 'PLATFORM OWNER'
+        WHERE is_system = 0
         ORDER BY user_id DESC
     """)
     users = cursor.fetchall()
@@ -132,7 +133,7 @@ def app(conn):
     st.subheader("📊 Platform Statistics")
     
     # Get platform stats
-    cursor.execute("SELECT COUNT(*) FROM users WHERE username != 'PLATFORM OWNER'")
+    cursor.execute("SELECT COUNT(*) FROM users WHERE is_system = 0")
     total_users = cursor.fetchone()[0]
     
     cursor.execute("SELECT COUNT(*) FROM invoices")
@@ -0,0 +1,164 @@
+# utils/accrue_yield.py
+
+"""
+Nightly yield accrual over Active positions.
+
+Each Active position earns its share of the invoice's net profit (what
+settle_invoice will pay the holder, less the chunks' price) evenly from the day
+it was first bought to the invoice's due date. A run loads every Active
+position once into numpy arrays and works out each day with whole-array
+integer arithmetic in satang, so a day costs a handful of vector operations
+however many positions there are. Every completed day is committed as an
+accrual_days row with platform totals; the last day of the run also replaces
+position_accruals, the per-position snapshot the investor dashboard reads.
+
+Runs pick up from the day after the latest accrual_days row, so an interrupted
+run or a missed night is caught up by the next one. Catch-up days are worked
+out from the positions as they are now, and a position accrues nothing before
+the day it was bought.
+
+    python -m utils.accrue_yield                      # accrue every day up to today
+    python -m utils.accrue_yield --since 2026-10-01   # first run: backfill from a date
+"""
+
+import datetime
+import time
+from itertools import repeat
+
+import numpy as np
+
+from database.connection import write_transaction
+from utils.money import CHUNK_PRICE, Money
+
+# julianday() of a date minus this is its date.toordinal()
+JULIAN_ORDINAL_OFFSET = 1721424.5
+
+# Arrays returned by load_active_positions, in query column order
+POSITION_FIELDS = ('buyer', 'invoice', 'chunks', 'original', 'chunks_total', 'start', 'due')
+
+def load_active_positions(conn):
+    """
+    Every Active position with its invoice terms as int64 arrays keyed by
+    POSITION_FIELDS; 'start' (date of first purchase) and 'due' are day
+    ordinals. Positions on invoices without a valid due date are left out.
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT p.buyer_user_id, p.invoice_id, p.chunks, i.original_amount, i.chunks_total,
+               CAST(julianday(date(p.first_purchase)) - {JULIAN_ORDINAL_OFFSET} AS INTEGER),
+               CAST(julianday(i.due_date) - {JULIAN_ORDINAL_OFFSET} AS INTEGER)
+        FROM positions p
+        JOIN invoices i ON p.invoice_id = i.invoice_id
+        WHERE i.status = 'Active' AND p.chunks > 0
+          AND julianday(i.due_date) IS NOT NULL AND julianday(p.first_purchase) IS NOT NULL
+    """)
+    rows = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, len(POSITION_FIELDS))
+    # In position_accruals key order, so the snapshot is written as appends to its B-tree
+    rows = rows[np.lexsort((rows[:, 1], rows[:, 0]))]
+    return dict(zip(POSITION_FIELDS, rows.T))
+
+def position_profits(positions):
+    """
+    Net profit per position in satang: the holder's share of the invoice amount
+    after the platform fee (10% of profit, rounded half up as settle_invoice
+    does), rounded down, less what the chunks cost.
+    """
+    chunk_price = int(CHUNK_PRICE)
+    total_profit = positions['original'] - positions['chunks_total'] * chunk_price
+    fee = np.where(total_profit > 0, (total_profit + 5) // 10, 0)
+    payout = (positions['original'] - fee) * positions['chunks'] // positions['chunks_total']
+    return payout - positions['chunks'] * chunk_price
+
+def accrued_on(day, profits, positions):
+    """
+    Profit accrued by each position by the end of `day` (an ordinal): straight
+    line from the first purchase to the due date, rounded down, the full profit
+    from the due date on and nothing before the purchase.
+    """
+    term = positions['due'] - positions['start']
+    elapsed = day - positions['start']
+    accrued = np.where(
+        elapsed >= term, profits, profits * np.clip(elapsed, 0, None) // np.maximum(term, 1)
+    )
+    return np.where(elapsed >= 0, accrued, 0)
+
+def last_accrual_day(conn):
+    """Date of the latest completed accrual day, or None before the first run"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT MAX(accrual_date) FROM accrual_days")
+    last = cursor.fetchone()[0]
+    return datetime.date.fromisoformat(last) if last else None
+
+def accrue_yield(conn, as_of=None, since=None):
+    """
+    Accrue every day from the day after the last completed one (or `since`, default
+    `as_of`, on the first run) through `as_of` (default today), one transaction per
+    day. Returns {'days', 'first_day', 'last_day', 'positions', 'chunks', 'accrued',
+    'seconds'}, the position totals being those of the last day accrued.
+    """
+    started = time.perf_counter()
+    as_of = as_of or datetime.date.today()
+    last = last_accrual_day(conn)
+    first = last + datetime.timedelta(days=1) if last else (since or as_of)
+
+    report = {'days': 0, 'first_day': None, 'last_day': None,
+              'positions': 0, 'chunks': 0, 'accrued': Money(0), 'seconds': 0.0}
+    if first > as_of:
+        report['seconds'] = time.perf_counter() - started
+        return report
+
+    positions = load_active_positions(conn)
+    profits = position_profits(positions)
+
+    for day in range(first.toordinal(), as_of.toordinal() + 1):
+        accrual_date = datetime.date.fromordinal(day).isoformat()
+        held = positions['start'] <= day
+        accrued = accrued_on(day, profits, positions)[held]
+        totals = (int(held.sum()), int(positions['chunks'][held].sum()), int(accrued.sum()))
+
+        with write_transaction(conn) as cursor:
+            cursor.execute("""
+                INSERT INTO accrual_days (accrual_date, positions, chunks, accrued)
+                VALUES (?, ?, ?, ?)
+            """, (accrual_date, *totals))
+            if day == as_of.toordinal():
+                cursor.execute("DELETE FROM position_accruals")
+                cursor.executemany("""
+                    INSERT INTO position_accruals (buyer_user_id, invoice_id, accrual_date, chunks, expected_profit, accrued)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, zip(
+                    positions['buyer'][held].tolist(), positions['invoice'][held].tolist(), repeat(accrual_date),
+                    positions['chunks'][held].tolist(), profits[held].tolist(), accrued.tolist()
+                ))
+
+        report['days'] += 1
+        report['first_day'] = report['first_day'] or accrual_date
+        report['last_day'] = accrual_date
+        report['positions'], report['chunks'] = totals[:2]
+        report['accrued'] = Money(totals[2])
+
+    report['seconds'] = time.perf_counter() - started
+    return report
+
+if __name__ == "__main__":
+    import argparse
+    import sqlite3
+    from config import DB_PATH
+
+    parser = argparse.ArgumentParser(description="Accrue the yield of Active positions for every day not yet accrued")
+    parser.add_argument("--as-of", type=datetime.date.fromisoformat, help="Last day to accrue (YYYY-MM-DD, default: today)")
+    parser.add_argument("--since", type=datetime.date.fromisoformat,
+                        help="First day to accrue when no day has been accrued yet (default: the --as-of day)")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    try:
+        report = accrue_yield(conn, as_of=args.as_of, since=args.since)
+    finally:
+        conn.close()
+
+    if report['days']:
+        print(f"Accrued {report['days']} days ({report['first_day']} to {report['last_day']}) in {report['seconds']:.2f}s: "
+              f"{report['positions']} positions, {report['chunks']} chunks, {report['accrued']} accrued")
+    else:
+        print("Nothing to accrue: already accrued through the requested day")
@@ -0,0 +1,157 @@
+# utils/archive_invoices.py
+
+from config import ARCHIVE_DB_PATH, ARCHIVE_AFTER_DAYS
+from database.connection import transaction_lock
+from models.cash_transfer import classify_transfers
+from utils.money import SATANG_COLUMNS, SATANG_SCHEMA_VERSION, convert_table_to_satang
+
+ARCHIVE_SCHEMA = "archive"
+
+# Tables that move to the archive together, parent first
+ARCHIVED_TABLES = ["invoices", "transactions", "cash_transfers", "market_orders"]
+
+def _table_columns(conn, schema, table):
+    cursor = conn.cursor()
+    cursor.execute(f"PRAGMA {schema}.table_info({table})")
+    return [row[1] for row in cursor.fetchall()]
+
+def _is_attached(conn):
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA database_list")
+    return any(row[1] == ARCHIVE_SCHEMA for row in cursor.fetchall())
+
+def _sync_archive_table(conn, table):
+    """Create the archive copy of a table, adding any columns added to main since"""
+    cursor = conn.cursor()
+    archive_columns = _table_columns(conn, ARCHIVE_SCHEMA, table)
+
+    if not archive_columns:
+        cursor.execute(f"CREATE TABLE {ARCHIVE_SCHEMA}.{table} AS SELECT * FROM main.{table} WHERE 0")
+    else:
+        cursor.execute(f"PRAGMA main.table_info({table})")
+        for _, column, column_type, _, _, _ in cursor.fetchall():
+            if column not in archive_columns:
+                cursor.execute(f"ALTER TABLE {ARCHIVE_SCHEMA}.{table} ADD COLUMN {column} {column_type}")
+        if table == "cash_transfers" and "event_type" not in archive_columns:
+            # History archived before event codes existed gets them the same way main did,
+            # once all the event columns are there
+            classify_transfers(conn, f"{ARCHIVE_SCHEMA}.cash_transfers")
+
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.idx_archived_{table}_invoice
+        ON {table}(invoice_id)
+    """)
+
+def _convert_archive_money(conn):
+    """Scale archived money from REAL baht to INTEGER satang once, like migrate_db does for main"""
+    cursor = conn.cursor()
+    cursor.execute(f"PRAGMA {ARCHIVE_SCHEMA}.user_version")
+    if cursor.fetchone()[0] >= SATANG_SCHEMA_VERSION:
+        return
+    for table in ARCHIVED_TABLES:
+        if table in SATANG_COLUMNS and _table_columns(conn, ARCHIVE_SCHEMA, table):
+            convert_table_to_satang(cursor, table, ARCHIVE_SCHEMA)
+    cursor.execute(f"PRAGMA {ARCHIVE_SCHEMA}.user_version = {SATANG_SCHEMA_VERSION}")
+
+def attach_archive(conn, path=ARCHIVE_DB_PATH):
+    """
+    Attach the archive database and expose history through temporary UNION views.
+    Views: <table>_all for every table in ARCHIVED_TABLES (e.g. cash_transfers_all).
+    Hot pages keep querying the main tables; only history views should use these.
+    """
+    if _is_attached(conn):
+        return
+
+    with transaction_lock(conn):
+        # ATTACH is not allowed inside an open transaction
+        conn.commit()
+        conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (path,))
+        try:
+            _convert_archive_money(conn)
+
+            for table in ARCHIVED_TABLES:
+                _sync_archive_table(conn, table)
+                columns = ", ".join(_table_columns(conn, "main", table))
+                conn.execute(f"DROP VIEW IF EXISTS temp.{table}_all")
+                conn.execute(f"""
+                    CREATE TEMP VIEW {table}_all AS
+                    SELECT {columns} FROM main.{table}
+                    UNION ALL
+                    SELECT {columns} FROM {ARCHIVE_SCHEMA}.{table}
+                """)
+
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+def archive_settled_invoices(conn, older_than_days=ARCHIVE_AFTER_DAYS, path=ARCHIVE_DB_PATH):
+    """
+    Move Paid invoices whose last cash transfer is older than `older_than_days`,
+    together with their transactions and cash transfers, into the archive database.
+    Returns the number of invoices archived.
+    """
+    attach_archive(conn, path)
+    cursor = conn.cursor()
+
+    cursor.execute("DROP TABLE IF EXISTS temp.archive_batch")
+    cursor.execute("CREATE TEMP TABLE archive_batch (invoice_id INTEGER PRIMARY KEY)")
+
+    try:
+        # Settlement time is the last ledger entry written for the invoice
+        cursor.execute("""
+            INSERT INTO archive_batch (invoice_id)
+            SELECT i.invoice_id
+            FROM main.invoices i
+            WHERE i.status = 'Paid'
+              AND (SELECT MAX(ct.event_timestamp)
+                   FROM main.cash_transfers ct
+                   WHERE ct.invoice_id = i.invoice_id) <= datetime('now', ?)
+        """, (f"-{int(older_than_days)} days",))
+        archived_count = cursor.rowcount
+
+        if archived_count > 0:
+            for table in ARCHIVED_TABLES:
+                columns = ", ".join(_table_columns(conn, "main", table))
+                cursor.execute(f"""
+                    INSERT INTO {ARCHIVE_SCHEMA}.{table} ({columns})
+                    SELECT {columns} FROM main.{table}
+                    WHERE invoice_id IN (SELECT invoice_id FROM archive_batch)
+                """)
+
+            # Children first so foreign keys never point at a missing invoice; positions are
+            # rebuilt from transactions, so they are dropped rather than archived
+            cursor.execute("""
+                DELETE FROM main.positions
+                WHERE invoice_id IN (SELECT invoice_id FROM archive_batch)
+            """)
+            for table in reversed(ARCHIVED_TABLES):
+                cursor.execute(f"""
+                    DELETE FROM main.{table}
+                    WHERE invoice_id IN (SELECT invoice_id FROM archive_batch)
+                """)
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.execute("DROP TABLE IF EXISTS temp.archive_batch")
+
+    return archived_count
+
+if __name__ == "__main__":
+    import argparse
+    import sqlite3
+    from config import DB_PATH
+
+    parser = argparse.ArgumentParser(description="Archive settled invoices into the archive database")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS,
+                        help="Archive Paid invoices settled more than this many days ago")
+    parser.add_argument("--archive", default=ARCHIVE_DB_PATH, help="Path of the archive database")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(DB_PATH)
+    archived = archive_settled_invoices(conn, args.days, args.archive)
+    print(f"Archived {archived} settled invoices to {args.archive}")
+    conn.close()
@@ -0,0 +1,154 @@
+# utils/data_loader.py
+
+"""
+Per-rerun data loading for pages.
+
+main.py starts a DataLoader for every rerun, the header and the current page
+declare the datasets they will render (DataLoader.request), and load() fetches
+them all at once inside one read transaction, so the declared figures agree
+with each other. Only declared datasets are covered: datasets loaded on demand
+and the page's own queries run separately and may see later writes. Scalar
+datasets are folded into a single SELECT of subqueries; row datasets run one
+statement each. Identical requests from the
+header and the page (e.g. the active-deal count) are fetched once. Money
+datasets come back in satang, like the columns they sum (see utils/money.py).
+"""
+
+import streamlit as st
+
+from database.connection import transaction_lock
+from utils.money import CHUNK_PRICE
+
+# Single-value datasets: name -> (scalar subquery, parameter names)
+SCALAR_DATASETS = {
+    'invoice_count': ("SELECT COUNT(*) FROM invoices", ()),
+    'active_invoice_count': ("SELECT COUNT(*) FROM invoices WHERE status = 'Active'", ()),
+    'invoice_value_total': ("SELECT COALESCE(SUM(original_amount), 0) FROM invoices", ()),
+    'available_investment': (
+        "SELECT COALESCE(SUM((chunks_total - chunks_sold) * 10000), 0) FROM invoices WHERE status = 'Pending'", ()
+    ),
+    'unpaid_invoice_count': ("SELECT COUNT(*) FROM invoices WHERE status != 'Paid'", ()),
+    'funded_unpaid_invoice_count': (
+        "SELECT COUNT(*) FROM invoices WHERE status != 'Paid' AND chunks_sold >= chunks_total", ()
+    ),
+    'average_invoice_amount': ("SELECT COALESCE(AVG(original_amount), 0) FROM invoices", ()),
+    'average_sale_price': ("SELECT COALESCE(AVG(desired_sale_price), 0) FROM invoices", ()),
+    'transfer_total': ("SELECT COALESCE(SUM(amount), 0) FROM cash_transfers", ()),
+    'party_received_total': ("SELECT COALESCE(SUM(amount), 0) FROM cash_transfers WHERE to_party = ?", ('party',)),
+    'owned_invoice_count': ("SELECT COUNT(*) FROM invoices WHERE owner_user_id = ?", ('user_id',)),
+    'owned_invoice_value': (
+        "SELECT COALESCE(SUM(original_amount), 0) FROM invoices WHERE owner_user_id = ?", ('user_id',)
+    ),
+    # Held positions, Paid included; invoices that expired unfunded were refunded, so they don't count
+    'investment_count': ("""
+        SELECT COUNT(*) FROM positions p JOIN invoices i ON p.invoice_id = i.invoice_id
+        WHERE p.buyer_user_id = ? AND p.chunks > 0 AND i.status != 'Expired'
+    """, ('user_id',)),
+    'chunks_bought': ("""
+        SELECT COALESCE(SUM(p.chunks), 0) FROM positions p JOIN invoices i ON p.invoice_id = i.invoice_id
+        WHERE p.buyer_user_id = ? AND p.chunks > 0 AND i.status != 'Expired'
+    """, ('user_id',)),
+}
+
+# Multi-row datasets: name -> (query with :named parameters, parameter names)
+ROW_DATASETS = {
+    'invoice_status_counts': ("""
+        SELECT status, COUNT(*) AS count
+        FROM invoices
+        GROUP BY status
+    """, ()),
+}
+
+def _dataset_key(name, params):
+    dataset = SCALAR_DATASETS.get(name) or ROW_DATASETS.get(name)
+    if dataset is None:
+        raise ValueError(f"Unknown dataset: {name}")
+    if set(params) != set(dataset[1]):
+        raise ValueError(f"Dataset {name} takes parameters {', '.join(dataset[1]) or 'none'}")
+    return (name, tuple(sorted(params.items())))
+
+class DataLoader:
+    """Collects dataset requests for one rerun and fetches the declared ones in one read transaction"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._pending = set()
+        self._results = {}
+        self.statements = 0
+
+    def request(self, name, **params):
+        """Declare a dataset this rerun will read; duplicate requests are fetched once"""
+        key = _dataset_key(name, params)
+        if key not in self._results:
+            self._pending.add(key)
+
+    def load(self):
+        """Fetch every pending dataset inside one read transaction"""
+        if not self._pending:
+            return
+
+        pending, self._pending = sorted(self._pending, key=repr), set()
+        scalars = [key for key in pending if key[0] in SCALAR_DATASETS]
+        rows = [key for key in pending if key[0] in ROW_DATASETS]
+
+        cursor = self.conn.cursor()
+        with transaction_lock(self.conn):
+            # A connection already inside a write (this thread's own) is joined instead
+            own_transaction = not self.conn.in_transaction
+            if own_transaction:
+                cursor.execute("BEGIN")
+            try:
+                if scalars:
+                    subqueries, params = [], []
+                    for name, key_params in scalars:
+                        query, param_names = SCALAR_DATASETS[name]
+                        subqueries.append(f"({query})")
+                        values = dict(key_params)
+                        params.extend(values[param] for param in param_names)
+                    cursor.execute(f"SELECT {', '.join(subqueries)}", params)
+                    self.statements += 1
+                    self._results.update(zip(scalars, cursor.fetchone()))
+
+                for key in rows:
+                    query, _ = ROW_DATASETS[key[0]]
+                    cursor.execute(query, dict(key[1]))
+                    self.statements += 1
+                    self._results[key] = cursor.fetchall()
+            finally:
+                if own_transaction:
+                    self.conn.commit()
+
+    def get(self, name, **params):
+        """A dataset's value; anything not declared up front is loaded on demand"""
+        key = _dataset_key(name, params)
+        if key not in self._results:
+            self._pending.add(key)
+            self.load()
+        return self._results[key]
+
+    def request_user_summary(self, user_id):
+        for name in ('owned_invoice_count', 'owned_invoice_value', 'investment_count', 'chunks_bought'):
+            self.request(name, user_id=user_id)
+
+    def user_summary(self, user_id):
+        """Same shape as utils.helpers.get_user_summary, read from this rerun's declared datasets"""
+        chunks_bought = self.get('chunks_bought', user_id=user_id)
+        return {
+            'owned_invoices': self.get('owned_invoice_count', user_id=user_id),
+            'owned_value': self.get('owned_invoice_value', user_id=user_id),
+            'investments': self.get('investment_count', user_id=user_id),
+            'investment_value': CHUNK_PRICE * chunks_bought,
+            'chunks_bought': chunks_bought
+        }
+
+def begin_rerun(conn):
+    """Start this session's loader for the current rerun (called once at the top of main)"""
+    st.session_state.data_loader = DataLoader(conn)
+    return st.session_state.data_loader
+
+def get_loader(conn):
+    """This rerun's loader, or a standalone one when a page runs outside main.py"""
+    loader = st.session_state.get('data_loader')
+    if loader is None or loader.conn is not conn:
+        loader = DataLoader(conn)
+    return loader
@@ -0,0 +1,129 @@
+# utils/expire_invoices.py
+
+"""
+Funding deadline sweeper.
+
+Invoices are all-or-nothing: one that is still Pending when its funding_deadline
+passes is marked Expired, its 'Pending Activation' transactions are Voided and
+every buyer gets a refund transfer for the chunks they bought. Expired invoices
+are found with a range scan on idx_invoices_funding_deadline (a partial index
+over Pending invoices only), and each invoice is voided in its own write
+transaction, with all of its refunds written by one INSERT ... SELECT over the
+invoice's positions.
+
+    python -m utils.expire_invoices            # one sweep
+    python -m utils.expire_invoices --loop     # keep sweeping every EXPIRY_SWEEP_INTERVAL seconds
+"""
+
+import time
+
+from config import EXPIRY_SWEEP_BATCH, EXPIRY_SWEEP_INTERVAL
+from database.connection import write_transaction
+from utils.money import Money
+
+def find_expired_invoices(conn, now=None, limit=EXPIRY_SWEEP_BATCH):
+    """Ids of Pending invoices whose deadline is at or before `now` (default: current time), oldest deadline first"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT invoice_id FROM invoices
+        WHERE status = 'Pending' AND funding_deadline <= COALESCE(?, datetime('now'))
+        ORDER BY funding_deadline
+        LIMIT ?
+    """, (now, limit))
+    return [row[0] for row in cursor.fetchall()]
+
+def expire_invoice(conn, invoice_id):
+    """
+    Void one unfunded invoice and refund its buyers in a single transaction.
+    Returns (refund transfers written, satang refunded), or None if the invoice
+    was funded or changed status since it was found.
+    """
+    with write_transaction(conn) as cursor:
+        # Re-checked under the write lock; a fully sold invoice is left for activation
+        cursor.execute("""
+            UPDATE invoices SET status = 'Expired'
+            WHERE invoice_id = ? AND status = 'Pending' AND chunks_sold < chunks_total
+        """, (invoice_id,))
+        if cursor.rowcount == 0:
+            conn.rollback()
+            return None
+
+        # One refund per buyer for everything they bought into this invoice
+        cursor.execute("""
+            INSERT INTO cash_transfers (
+                invoice_id, event_description, amount, from_party, to_party,
+                event_type, event_chunks, event_rate
+            )
+            SELECT
+                invoice_id, '', chunks * 10000, 'Funding Escrow',
+                'Buyer (User ' || buyer_user_id || ')', 'refund', chunks, 10000
+            FROM positions
+            WHERE invoice_id = ? AND chunks > 0
+        """, (invoice_id,))
+        refunds = cursor.rowcount
+
+        cursor.execute("""
+            SELECT COALESCE(SUM(chunks), 0) * 10000 FROM positions
+            WHERE invoice_id = ? AND chunks > 0
+        """, (invoice_id,))
+        refunded = cursor.fetchone()[0]
+
+        cursor.execute("""
+            UPDATE transactions SET status = 'Voided'
+            WHERE invoice_id = ? AND status = 'Pending Activation'
+        """, (invoice_id,))
+
+    return refunds, refunded
+
+def expire_unfunded_invoices(conn, now=None, batch_size=EXPIRY_SWEEP_BATCH):
+    """
+    Expire every Pending invoice past its funding deadline.
+    Returns {'expired', 'refunds', 'refunded'} with `refunded` as Money.
+    """
+    expired = refunds = 0
+    refunded = Money(0)
+    skipped = set()
+    while True:
+        invoice_ids = [
+            invoice_id for invoice_id in find_expired_invoices(conn, now, batch_size + len(skipped))
+            if invoice_id not in skipped
+        ]
+        conn.commit()
+        if not invoice_ids:
+            break
+        for invoice_id in invoice_ids:
+            result = expire_invoice(conn, invoice_id)
+            if result is None:
+                skipped.add(invoice_id)
+                continue
+            expired += 1
+            refunds += result[0]
+            refunded += result[1]
+
+    return {'expired': expired, 'refunds': refunds, 'refunded': refunded}
+
+if __name__ == "__main__":
+    import argparse
+    import sqlite3
+    from config import DB_PATH
+
+    parser = argparse.ArgumentParser(description="Expire unfunded invoices past their funding deadline and refund buyers")
+    parser.add_argument("--loop", action="store_true", help="Keep sweeping instead of exiting after one pass")
+    parser.add_argument("--interval", type=int, default=EXPIRY_SWEEP_INTERVAL, help="Seconds between sweeps with --loop")
+    parser.add_argument("--batch", type=int, default=EXPIRY_SWEEP_BATCH, help="Expired invoices fetched per query")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    try:
+        while True:
+            result = expire_unfunded_invoices(conn, batch_size=args.batch)
+            if result['expired'] or not args.loop:
+                print(f"Expired {result['expired']} invoices, "
+                      f"{result['refunds']} refunds totalling {result['refunded']}")
+            if not args.loop:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        conn.close()
@@ -1,63 +1,56 @@
 # utils/fix_existing_data.py
 
-def fix_all_pending_invoices(conn):
+def fix_all_pending_invoices(conn, batch_table=None):
     """
     Check all pending invoices and activate those that should be active.
     This fixes invoices created before the activation logic was implemented.
+    Runs as three set-based statements in the caller's transaction; `batch_table`
+    optionally restricts the fix to the invoice_ids listed in that (temporary) table.
     """
     cursor = conn.cursor()
-    
-    # Get all pending invoices that are actually fully funded
-    cursor.execute("""
-        SELECT invoice_id, chunks_sold, chunks_total, desired_sale_price, owner_user_id
-        FROM invoices 
-        WHERE status = 'Pending' AND chunks_sold >= chunks_total
+
+    # Pending invoices that are actually fully funded
+    stuck_filter = "status = 'Pending' AND chunks_sold >= chunks_total"
+    if batch_table:
+        stuck_filter += f" AND invoice_id IN (SELECT invoice_id FROM {batch_table})"
+
+    # Create cash transfer records for the funding events
+    cursor.execute(f"""
+        INSERT INTO cash_transfers (
+            invoice_id, event_description, amount, from_party, to_party, event_type
+        )
+        SELECT
+            invoice_id,
+            'Invoice Fully Funded - Cash Released to Owner (Auto-Fixed)',
+            chunks_total * 10000,
+            'Collective Buyers',
+            'Invoice Owner (User ' || owner_user_id || ')',
+            'funding'
+        FROM invoices
+        WHERE {stuck_filter}
+    """)
+
+    # Update all related transactions to Active status
+    cursor.execute(f"""
+        UPDATE transactions
+        SET status = 'Active'
+        WHERE status = 'Pending Activation'
+          AND invoice_id IN (SELECT invoice_id FROM invoices WHERE {stuck_filter})
+    """)
+
+    # Update invoice status to Active
+    cursor.execute(f"""
+        UPDATE invoices
+        SET status = 'Active'
+        WHERE {stuck_filter}
     """)
-    
-    invoices_to_fix = cursor.fetchall()
-    fixed_count = 0
-    
-    for invoice_data in invoices_to_fix:
-        invoice_id, chunks_sold, chunks_total, sale_price, owner_id = invoice_data
-        
-        print(f"Fixing Invoice #{invoice_id}: {chunks_sold}/{chunks_total} chunks")
-        
-        # Update invoice status to Active
-        cursor.execute("""
-            UPDATE invoices 
-            SET status = 'Active' 
-            WHERE invoice_id = ?
-        """, (invoice_id,))
-        
-        # Update all related transactions to Active status
-        cursor.execute("""
-            UPDATE transactions 
-            SET status = 'Active'
-            WHERE invoice_id = ? AND status = 'Pending Activation'
-        """, (invoice_id,))
-        
-        # Create cash transfer record for the funding event
-        funding_amount = chunks_total * 100
-        cursor.execute("""
-            INSERT INTO cash_transfers (
-                invoice_id, event_description, amount, from_party, to_party
-            ) VALUES (?, ?, ?, ?, ?)
-        """, (
-            invoice_id, 
-            "Invoice Fully Funded - Cash Released to Owner (Auto-Fixed)", 
-            funding_amount, 
-            "Collective Buyers", 
-            f"Invoice Owner (User {owner_id})"
-        ))
-        
-        fixed_count += 1
-    
-    conn.commit()
-    return fixed_count
+    return cursor.rowcount
 
 if __name__ == "__main__":
     import sqlite3
+    from database.connection import write_transaction
     conn = sqlite3.connect("invoice.db")
-    fixed = fix_all_pending_invoices(conn)
+    with write_transaction(conn):
+        fixed = fix_all_pending_invoices(conn)
     print(f"Fixed {fixed} invoices that should have been active")
-    conn.close()
\ No newline at end of file
+    conn.close()
@@ -0,0 +1,161 @@
+# utils/money.py
+
+"""
+Exact money in integer satang (฿1 = 100 satang).
+
+Every money column in schema.sql stores integer satang, so ledger sums, debtor
+aggregates and reconciliations are exact integer arithmetic. Money is an int
+subclass holding satang: it binds to sqlite3 as a plain INTEGER, adds and
+subtracts exactly, and only rounds where an amount is scaled by a ratio
+(Money.scale) or split between holders (Money.allocate, largest remainder, so
+the parts always add back up to the whole). Pages keep doing display maths in
+baht floats; convert at the edge with Money.from_baht / Money.baht.
+Databases older than SATANG_SCHEMA_VERSION are converted table by table with
+convert_table_to_satang (migrate_db, and the archive when it is attached).
+"""
+
+import re
+from decimal import Decimal, ROUND_HALF_UP
+
+from config import CHUNK_SIZE
+
+SATANG_PER_BAHT = 100
+
+class Money(int):
+    __slots__ = ()
+
+    @classmethod
+    def from_baht(cls, baht):
+        """Exact conversion of a baht amount (int, float, str or Decimal), rounded half up to the satang"""
+        satang = (Decimal(str(baht)) * SATANG_PER_BAHT).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+        return cls(int(satang))
+
+    @property
+    def baht(self):
+        return int(self) / SATANG_PER_BAHT
+
+    def __add__(self, other):
+        if not isinstance(other, int):
+            return NotImplemented
+        return Money(int(self) + int(other))
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if not isinstance(other, int):
+            return NotImplemented
+        return Money(int(self) - int(other))
+
+    def __rsub__(self, other):
+        if not isinstance(other, int):
+            return NotImplemented
+        return Money(int(other) - int(self))
+
+    def __neg__(self):
+        return Money(-int(self))
+
+    def __mul__(self, other):
+        """Whole multiples only (e.g. chunks * price); use scale() for ratios"""
+        if not isinstance(other, int):
+            return NotImplemented
+        return Money(int(self) * int(other))
+
+    __rmul__ = __mul__
+
+    def scale(self, numerator, denominator=1):
+        """self * numerator / denominator, rounded half up to the satang"""
+        ratio = Decimal(int(self)) * Decimal(str(numerator)) / Decimal(str(denominator))
+        return Money(int(ratio.quantize(Decimal(1), rounding=ROUND_HALF_UP)))
+
+    def allocate(self, weights):
+        """
+        Split into parts proportional to `weights` (non-negative ints) that sum
+        exactly to self: each part is rounded down, and the satang left over go
+        one each to the largest remainders (ties to the earlier weight).
+        """
+        total_weight = sum(weights)
+        if total_weight <= 0:
+            raise ValueError("Cannot allocate over zero total weight")
+        amount = int(self)
+        parts = [amount * weight // total_weight for weight in weights]
+        remainders = [amount * weight % total_weight for weight in weights]
+        leftover = amount - sum(parts)
+        for index in sorted(range(len(weights)), key=lambda i: -remainders[i])[:leftover]:
+            parts[index] += 1
+        return [Money(part) for part in parts]
+
+    def __repr__(self):
+        return f"Money({int(self)})"
+
+    def __str__(self):
+        whole, satang = divmod(abs(int(self)), SATANG_PER_BAHT)
+        sign = "-" if self < 0 else ""
+        return f"{sign}฿{whole:,}.{satang:02d}"
+
+# Price of one chunk
+CHUNK_PRICE = Money(CHUNK_SIZE * SATANG_PER_BAHT)
+
+def as_money(amount):
+    """Money from integer satang; floats are refused so a baht amount can't be stored 100x too small"""
+    if not isinstance(amount, int) or isinstance(amount, bool):
+        raise ValueError(f"Money amounts are integer satang (got {amount!r}); convert baht with Money.from_baht")
+    return Money(amount)
+
+def to_baht(satang):
+    """Baht float for display and ratio maths; None stays None"""
+    return None if satang is None else satang / SATANG_PER_BAHT
+
+# Money columns that held REAL baht before SATANG_SCHEMA_VERSION: table -> columns
+SATANG_COLUMNS = {
+    'debtors': ('open_amount', 'funded_amount', 'paid_amount'),
+    'invoices': ('original_amount', 'desired_sale_price'),
+    'cash_transfers': ('amount', 'event_rate', 'event_profit'),
+    'market_orders': ('price_per_chunk',),
+    'ledger_rollups': ('total_amount',),
+}
+SATANG_SCHEMA_VERSION = 12
+
+def convert_table_to_satang(cursor, table, schema="main"):
+    """
+    Rebuild a table whose money columns hold REAL baht with those columns
+    retyped INTEGER and scaled to satang. SQLite can't change a column's type in
+    place, so rows are copied into a new table created from the table's own
+    definition, which then replaces it. Indexes go with the old table; callers
+    recreate them (migrate_db from schema.sql, the archive on attach).
+    """
+    cursor.execute(f"SELECT sql FROM {schema}.sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    definition = cursor.fetchone()[0]
+    cursor.execute(f"PRAGMA {schema}.table_info({table})")
+    names = [row[1] for row in cursor.fetchall()]
+    money = [name for name in SATANG_COLUMNS[table] if name in names]
+
+    for column in money:
+        definition = re.sub(rf'(\b{column}"?\s+)REAL\b', r"\1INTEGER", definition, flags=re.IGNORECASE)
+    definition = re.sub(
+        rf'^CREATE TABLE\s+(?:IF NOT EXISTS\s+)?"?{table}"?', f"CREATE TABLE {schema}.{table}_satang",
+        definition, flags=re.IGNORECASE
+    )
+    columns = ", ".join(names)
+    values = ", ".join(
+        f"CAST(ROUND({name} * {SATANG_PER_BAHT}) AS INTEGER)" if name in money else name for name in names
+    )
+
+    # AUTOINCREMENT counters must not restart below ids already handed out (and since archived)
+    cursor.execute(f"SELECT COUNT(*) FROM {schema}.sqlite_master WHERE name = 'sqlite_sequence'")
+    has_sequence = cursor.fetchone()[0] > 0
+    sequence = None
+    if has_sequence:
+        cursor.execute(f"SELECT seq FROM {schema}.sqlite_sequence WHERE name = ?", (table,))
+        row = cursor.fetchone()
+        sequence = row[0] if row else None
+
+    cursor.execute(f"DROP TABLE IF EXISTS {schema}.{table}_satang")
+    cursor.execute(definition)
+    cursor.execute(f"INSERT INTO {schema}.{table}_satang ({columns}) SELECT {values} FROM {schema}.{table}")
+    cursor.execute(f"DROP TABLE {schema}.{table}")
+    cursor.execute(f"ALTER TABLE {schema}.{table}_satang RENAME TO {table}")
+
+    if sequence is not None:
+        cursor.execute(f"UPDATE {schema}.sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (sequence, table))
+        if cursor.rowcount == 0:
+            cursor.execute(f"INSERT INTO {schema}.sqlite_sequence (name, seq) VALUES (?, ?)", (table, sequence))
@@ -0,0 +1,114 @@
+# utils/payment_terms.py
+
+"""
+Due dates from free-text payment terms.
+
+Invoices store payment_terms as the owner typed them ("Net 30", "Due March 15th",
+"30 days EOM", "2026-03-15"). parse_payment_terms turns the common forms into a
+due date once, when the invoice is created, so filters and sorts can work on the
+stored invoices.due_date / days_to_due columns instead of re-reading the text.
+Terms it can't read return None, and the invoice simply has no due date.
+
+Numeric dates other than ISO are only read when the order is unambiguous:
+"15/04/2027" can only be day first and "04/15/2027" month first, but
+"04/05/2027" could be either, so it gives no due date rather than a guess.
+"""
+
+import calendar
+import re
+from datetime import date, datetime, timedelta
+
+MONTHS = {}
+for _number, _name in enumerate(calendar.month_name[1:], 1):
+    MONTHS[_name.lower()] = _number
+    MONTHS[_name.lower()[:3]] = _number
+MONTHS['sept'] = 9
+
+_MONTH = r"(?P<month>" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")\.?"
+_DAY = r"(?P<day>\d{1,2})(?:st|nd|rd|th)?"
+_YEAR = r"(?:,?\s*(?P<year>\d{4}))?"
+
+_ISO_DATE = re.compile(r"\b(?P<year>\d{4})-(?P<month>\d{1,2})-(?P<day>\d{1,2})\b")
+_NUMERIC_DATE = re.compile(r"\b(?P<first>\d{1,2})[/.](?P<second>\d{1,2})[/.](?P<year>\d{2}|\d{4})\b")
+_MONTH_DAY = re.compile(rf"\b{_MONTH}\s+{_DAY}\b{_YEAR}")
+_DAY_MONTH = re.compile(rf"\b{_DAY}\s+(?:of\s+)?{_MONTH}\b{_YEAR}")
+_NET_DAYS = re.compile(r"\b(?:net|n)\s*-?\s*(?P<days>\d{1,3})\b|\b(?P<plain>\d{1,3})\s*(?:days?|d)\b")
+_END_OF_MONTH = re.compile(r"\beom\b|\bend of (?:the )?month\b")
+_ON_RECEIPT = re.compile(r"\b(?:on|upon) receipt\b|\bimmediate(?:ly)?\b|\bcod\b|\bdue now\b")
+
+def _end_of_month(day):
+    return day.replace(day=calendar.monthrange(day.year, day.month)[1])
+
+def _calendar_date(match, issued, month=None):
+    """A date from day/month(/year) groups; without a year, the next such date on or after `issued`"""
+    month = month or int(match.group('month'))
+    day = int(match.group('day'))
+    year = match.group('year')
+    try:
+        if year:
+            year = int(year)
+            return date(year + 2000 if year < 100 else year, month, day)
+        due = date(issued.year, month, day)
+        return due if due >= issued else date(issued.year + 1, month, day)
+    except ValueError:
+        return None
+
+def _numeric_date(match):
+    """A d/m/y or m/d/y date when only one order is a valid date (or both read the same), else None"""
+    first, second = int(match.group('first')), int(match.group('second'))
+    if first <= 12 and second <= 12 and first != second:
+        return None
+    day, month = (second, first) if second > 12 else (first, second)
+    try:
+        year = int(match.group('year'))
+        return date(year + 2000 if year < 100 else year, month, day)
+    except ValueError:
+        return None
+
+def parse_payment_terms(terms, issued=None):
+    """Due date for free-text payment terms, counted from `issued` (default today), or None"""
+    if not terms:
+        return None
+    if isinstance(issued, datetime):
+        issued = issued.date()
+    issued = issued or date.today()
+    text = " ".join(terms.lower().split())
+
+    # Explicit dates win over relative terms
+    match = _ISO_DATE.search(text)
+    if match:
+        return _calendar_date(match, issued)
+    match = _NUMERIC_DATE.search(text)
+    if match:
+        return _numeric_date(match)
+    for pattern in (_MONTH_DAY, _DAY_MONTH):
+        match = pattern.search(text)
+        if match:
+            return _calendar_date(match, issued, MONTHS[match.group('month')])
+
+    # "Net 30", "30 days", optionally counted from the end of the month ("Net 30 EOM")
+    match = _NET_DAYS.search(text)
+    if match:
+        days = int(match.group('days') or match.group('plain'))
+        start = _end_of_month(issued) if _END_OF_MONTH.search(text) else issued
+        return start + timedelta(days=days)
+
+    if _END_OF_MONTH.search(text):
+        return _end_of_month(issued)
+    if _ON_RECEIPT.search(text):
+        return issued
+    return None
+
+def days_until(due, issued=None):
+    """Whole days from `issued` (default today) to `due`, or None without a due date"""
+    if due is None:
+        return None
+    if isinstance(issued, datetime):
+        issued = issued.date()
+    return (due - (issued or date.today())).days
+
+if __name__ == "__main__":
+    import sys
+
+    for terms in sys.argv[1:] or ["Net 30", "Due March 15th", "30 days EOM", "15/04/2027", "04/05/2027", "on receipt", "soon"]:
+        print(f"{terms!r:>24} -> {parse_payment_terms(terms)}")
@@ -0,0 +1,208 @@
+# utils/profiler.py
+
+"""
+Sampling profiler for page renders.
+
+A SamplingProfiler runs a daemon thread that wakes every PROFILER_INTERVAL
+seconds, reads the profiled thread's current frame from sys._current_frames()
+and counts the stack from the page's app(conn) call down. The page thread is
+never traced or instrumented, so a profiled rerun costs about what it costs
+unprofiled, plus the samples the sampler takes while holding the GIL. Stacks
+are written as a speedscope file (open at https://www.speedscope.app) or as
+collapsed stacks, one "frame;frame;frame count" line each, for flamegraph.pl
+and similar tools.
+
+main.py wraps the current page in a PageProfile. Profiling is on for every
+session when the PROFILER_ENV_VAR environment variable is set, or for one
+browser session when the URL carries ?profile=1 (or ?profile=collapsed), so a
+running server can be profiled without a restart. Each profiled rerun writes
+PROFILER_DIR/<page>/<time>-<action>.<format>, where the action names the
+widgets that changed since the page's last rerun ("view" when the page is
+first opened, "rerun" when nothing changed).
+"""
+
+import datetime
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+import streamlit as st
+
+from config import PROFILER_DIR, PROFILER_ENV_VAR, PROFILER_FORMAT, PROFILER_INTERVAL, PROFILER_QUERY_PARAM
+
+PROFILER_FORMATS = {'speedscope': ".speedscope.json", 'collapsed': ".collapsed"}
+
+# Values compared between reruns to name the action; widget values are all of these types
+ACTION_VALUE_TYPES = (bool, int, float, str, type(None))
+
+class SamplingProfiler:
+    """
+    Samples the stack of the thread that enters it, from the frame executing the
+    `with` statement down, until it exits. Samples are counted per distinct stack
+    in `samples`: (function, file, first line) tuples, outermost call first.
+    """
+
+    def __init__(self, interval=PROFILER_INTERVAL):
+        self.interval = interval
+        self.samples = Counter()
+        self.seconds = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._thread_id = None
+        self._root = None
+        self._started = None
+
+    def start(self, root=None):
+        """Start sampling the calling thread; stacks stop short of the `root` frame"""
+        self._thread_id = threading.get_ident()
+        self._root = root
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="page-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.seconds = time.perf_counter() - self._started
+        self._root = None
+
+    def __enter__(self):
+        self.start(sys._getframe(1))
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.stop()
+        return False
+
+    def _run(self):
+        current_frames = sys._current_frames
+        while not self._stop.wait(self.interval):
+            frame = current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None and frame is not self._root:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            # A sample taken while stop() is running would only show the profiler itself
+            if stack and not self._stop.is_set():
+                self.samples[tuple(reversed(stack))] += 1
+
+    @property
+    def sample_count(self):
+        return sum(self.samples.values())
+
+def _short_path(filename):
+    """Paths inside the app directory relative to it, library paths as they are"""
+    return os.path.relpath(filename) if filename.startswith(os.getcwd()) else filename
+
+def _frame_label(name, filename, line):
+    return f"{name} ({_short_path(filename)}:{line})"
+
+def to_collapsed(profiler):
+    """Collapsed stacks, hottest first: 'outer;inner;leaf count' per line"""
+    return "".join(
+        ";".join(_frame_label(*frame).replace(";", ":") for frame in stack) + f" {count}\n"
+        for stack, count in profiler.samples.most_common()
+    )
+
+def to_speedscope(profiler, name):
+    """A speedscope 'sampled' profile; identical stacks are one sample weighted by their count"""
+    frames = {}
+    samples = []
+    weights = []
+    for stack, count in profiler.samples.most_common():
+        indexes = []
+        for frame in stack:
+            if frame not in frames:
+                frames[frame] = len(frames)
+            indexes.append(frames[frame])
+        samples.append(indexes)
+        weights.append(count * profiler.interval)
+    return {
+        '$schema': "https://www.speedscope.app/file-format-schema.json",
+        'name': name,
+        'exporter': "poorman_refactory utils/profiler.py",
+        'shared': {'frames': [
+            {'name': frame_name, 'file': _short_path(filename), 'line': line}
+            for frame_name, filename, line in frames
+        ]},
+        'profiles': [{
+            'type': "sampled",
+            'name': name,
+            'unit': "seconds",
+            'startValue': 0,
+            'endValue': sum(weights),
+            'samples': samples,
+            'weights': weights
+        }]
+    }
+
+def write_profile(profiler, page, action, output_format=PROFILER_FORMAT, directory=PROFILER_DIR):
+    """Write one profiled rerun to directory/<page>/<time>-<action><extension>; returns the path"""
+    page_dir = os.path.join(directory, _slug(page))
+    os.makedirs(page_dir, exist_ok=True)
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    path = os.path.join(page_dir, f"{stamp}-{_slug(action)}{PROFILER_FORMATS[output_format]}")
+    with open(path, "w") as f:
+        if output_format == 'speedscope':
+            json.dump(to_speedscope(profiler, f"{page}: {action}"), f)
+        else:
+            f.write(to_collapsed(profiler))
+    return path
+
+def _slug(text):
+    return re.sub(r"[^A-Za-z0-9]+", "_", text).strip("_").lower()[:80] or "page"
+
+def requested_format():
+    """Output format if profiling is on for this rerun (environment or ?profile=), else None"""
+    for value in (st.query_params.get(PROFILER_QUERY_PARAM), os.environ.get(PROFILER_ENV_VAR)):
+        if not value or value.lower() in ('0', 'false', 'off'):
+            continue
+        return value.lower() if value.lower() in PROFILER_FORMATS else PROFILER_FORMAT
+    return None
+
+def _action_values():
+    return {
+        key: value for key, value in st.session_state.items()
+        if isinstance(value, ACTION_VALUE_TYPES) and not key.startswith('_profiler')
+    }
+
+def rerun_action(page):
+    """The widgets whose values changed since this page's last profiled rerun, as a name"""
+    previous = st.session_state.get('_profiler_state')
+    if not previous or previous[0] != page:
+        return "view"
+    values = _action_values()
+    changed = sorted(key for key in values.keys() | previous[1].keys() if values.get(key) != previous[1].get(key))
+    return "+".join(changed) if changed else "rerun"
+
+class PageProfile:
+    """
+    Profiles the body of its `with` block as a render of `page` when profiling is
+    requested for this rerun, writing the stacks on exit (st.rerun included) and
+    setting `path`; otherwise does nothing.
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.output_format = requested_format()
+        self.profiler = None
+        self.path = None
+
+    def __enter__(self):
+        if self.output_format:
+            self.action = rerun_action(self.page)
+            self.profiler = SamplingProfiler()
+            self.profiler.start(root=sys._getframe(1))
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if self.profiler:
+            self.profiler.stop()
+            st.session_state._profiler_state = (self.page, _action_values())
+            self.path = write_profile(self.profiler, self.page, self.action, self.output_format)
+        return False
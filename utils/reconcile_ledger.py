@@ -0,0 +1,235 @@
+# utils/reconcile_ledger.py
+
+from utils.fix_invoices import fix_all_pending_invoices
+
+# Allowed drift between ledger sums and invoice amounts, in satang. Amounts are
+# exact integers, so settlements balance to the satang; the satang of rounding
+# left by settlements converted from the old REAL columns is booked as a
+# 'rounding_adjustment' entry when the database is upgraded (see init_db).
+LEDGER_TOLERANCE = 0
+
+# Each check selects (invoice_id, detail) for invoices in the current batch that violate it
+CHECKS = {
+    'chunks_mismatch': """
+        SELECT i.invoice_id,
+               'chunks_sold=' || i.chunks_sold || ' transactions=' || COALESCE(t.total_chunks, 0)
+        FROM invoices i
+        JOIN reconcile_batch b ON b.invoice_id = i.invoice_id
+        LEFT JOIN (
+            SELECT invoice_id, SUM(chunks_purchased) AS total_chunks
+            FROM transactions
+            WHERE invoice_id IN (SELECT invoice_id FROM reconcile_batch)
+            GROUP BY invoice_id
+        ) t ON t.invoice_id = i.invoice_id
+        WHERE i.chunks_sold != COALESCE(t.total_chunks, 0)
+    """,
+    'stuck_pending': """
+        SELECT i.invoice_id, i.chunks_sold || '/' || i.chunks_total || ' chunks sold'
+        FROM invoices i
+        JOIN reconcile_batch b ON b.invoice_id = i.invoice_id
+        WHERE i.status = 'Pending' AND i.chunks_sold >= i.chunks_total
+    """,
+    'stale_transactions': """
+        SELECT i.invoice_id, COUNT(*) || ' transactions behind invoice status ' || i.status
+        FROM invoices i
+        JOIN reconcile_batch b ON b.invoice_id = i.invoice_id
+        JOIN transactions t ON t.invoice_id = i.invoice_id
+        WHERE (i.status = 'Active' AND t.status = 'Pending Activation')
+           OR (i.status = 'Paid' AND t.status IN ('Pending Activation', 'Active'))
+        GROUP BY i.invoice_id
+    """,
+    'funding_mismatch': """
+        SELECT i.invoice_id,
+               'funded=' || printf('%.2f', COALESCE(f.funded, 0) / 100.0)
+               || ' expected=' || printf('%.2f', i.chunks_total * 100)
+        FROM invoices i
+        JOIN reconcile_batch b ON b.invoice_id = i.invoice_id
+        LEFT JOIN (
+            SELECT c.invoice_id, SUM(c.amount) AS funded
+            FROM cash_transfer_classes c
+            WHERE c.event_type = 'funding'
+              AND c.invoice_id IN (SELECT invoice_id FROM reconcile_batch)
+            GROUP BY c.invoice_id
+        ) f ON f.invoice_id = i.invoice_id
+        WHERE i.status IN ('Active', 'Paid')
+          AND ABS(COALESCE(f.funded, 0) - i.chunks_total * 10000) > :tolerance
+    """,
+    'unbalanced_settlement': """
+        SELECT i.invoice_id,
+               'debtor_paid=' || printf('%.2f', COALESCE(s.debtor_paid, 0) / 100.0)
+               || ' fee+payouts+remainder+adjustments=' || printf('%.2f', COALESCE(s.distributed, 0) / 100.0)
+               || ' original=' || printf('%.2f', i.original_amount / 100.0)
+        FROM invoices i
+        JOIN reconcile_batch b ON b.invoice_id = i.invoice_id
+        LEFT JOIN (
+            SELECT
+                c.invoice_id,
+                SUM(CASE WHEN c.event_type = 'debtor_payment' THEN c.amount ELSE 0 END) AS debtor_paid,
+                SUM(CASE WHEN c.event_type IN ('platform_fee', 'buyer_payout', 'owner_remainder', 'rounding_adjustment')
+                         THEN c.amount ELSE 0 END) AS distributed
+            FROM cash_transfer_classes c
+            WHERE c.invoice_id IN (SELECT invoice_id FROM reconcile_batch)
+            GROUP BY c.invoice_id
+        ) s ON s.invoice_id = i.invoice_id
+        WHERE i.status = 'Paid'
+          AND (ABS(COALESCE(s.debtor_paid, 0) - i.original_amount) > :tolerance
+               OR ABS(COALESCE(s.distributed, 0) - i.original_amount) > :tolerance)
+    """,
+}
+
+def _repair_batch(conn):
+    """Repair drift for the invoices in reconcile_batch with set-based statements"""
+    cursor = conn.cursor()
+
+    # Transactions are the audit trail, so chunks_sold follows them
+    cursor.execute("""
+        UPDATE invoices
+        SET chunks_sold = (
+            SELECT COALESCE(SUM(t.chunks_purchased), 0)
+            FROM transactions t
+            WHERE t.invoice_id = invoices.invoice_id
+        )
+        WHERE invoice_id IN (SELECT invoice_id FROM reconcile_batch)
+          AND chunks_sold != (
+            SELECT COALESCE(SUM(t.chunks_purchased), 0)
+            FROM transactions t
+            WHERE t.invoice_id = invoices.invoice_id
+        )
+    """)
+
+    # Transactions follow their invoice's status
+    cursor.execute("""
+        UPDATE transactions
+        SET status = CASE
+            WHEN (SELECT status FROM invoices i WHERE i.invoice_id = transactions.invoice_id) = 'Paid'
+                THEN 'Paid Out'
+            ELSE 'Active'
+        END
+        WHERE invoice_id IN (
+            SELECT invoice_id FROM invoices
+            WHERE status IN ('Active', 'Paid')
+              AND invoice_id IN (SELECT invoice_id FROM reconcile_batch)
+        )
+          AND (status = 'Pending Activation'
+               OR (status = 'Active'
+                   AND (SELECT status FROM invoices i WHERE i.invoice_id = transactions.invoice_id) = 'Paid'))
+    """)
+
+    # Active invoices that never got their funding entry
+    cursor.execute("""
+        INSERT INTO cash_transfers (
+            invoice_id, event_description, amount, from_party, to_party, event_type
+        )
+        SELECT
+            i.invoice_id,
+            'Invoice Fully Funded - Cash Released to Owner (Reconciled)',
+            i.chunks_total * 10000,
+            'Collective Buyers',
+            'Invoice Owner (User ' || i.owner_user_id || ')',
+            'funding'
+        FROM invoices i
+        WHERE i.status IN ('Active', 'Paid')
+          AND i.invoice_id IN (SELECT invoice_id FROM reconcile_batch)
+          AND NOT EXISTS (
+            SELECT 1 FROM cash_transfer_classes c
+            WHERE c.invoice_id = i.invoice_id AND c.event_type = 'funding'
+        )
+    """)
+
+    # Fully funded invoices still marked Pending
+    fix_all_pending_invoices(conn, batch_table="reconcile_batch")
+
+def reconcile_ledger(conn, batch_size=1000, repair=False, max_examples=20, on_discrepancy=None):
+    """
+    Verify chunk totals, status transitions and ledger invariants for every invoice.
+    Invoices are streamed in batches of `batch_size` ids, so memory stays bounded.
+    Settlement imbalances are only reported; everything else is repaired when `repair` is set.
+    `on_discrepancy(check, invoice_id, detail)` is called for every discrepancy found.
+    Returns a report dict with per-check counts and up to `max_examples` examples per check.
+    """
+    cursor = conn.cursor()
+    report = {
+        'invoices_checked': 0,
+        'batches': 0,
+        'discrepancies': {check: 0 for check in CHECKS},
+        'examples': {check: [] for check in CHECKS},
+        'repaired': repair
+    }
+
+    cursor.execute("DROP TABLE IF EXISTS temp.reconcile_batch")
+    cursor.execute("CREATE TEMP TABLE reconcile_batch (invoice_id INTEGER PRIMARY KEY)")
+
+    last_invoice_id = 0
+    try:
+        while True:
+            cursor.execute("DELETE FROM reconcile_batch")
+            cursor.execute("""
+                INSERT INTO reconcile_batch (invoice_id)
+                SELECT invoice_id FROM invoices
+                WHERE invoice_id > ?
+                ORDER BY invoice_id
+                LIMIT ?
+            """, (last_invoice_id, batch_size))
+
+            if cursor.rowcount <= 0:
+                break
+
+            cursor.execute("SELECT MAX(invoice_id), COUNT(*) FROM reconcile_batch")
+            last_invoice_id, batch_count = cursor.fetchone()
+            report['invoices_checked'] += batch_count
+            report['batches'] += 1
+
+            for check, query in CHECKS.items():
+                cursor.execute(query, {'tolerance': LEDGER_TOLERANCE})
+                for invoice_id, detail in cursor.fetchall():
+                    report['discrepancies'][check] += 1
+                    if len(report['examples'][check]) < max_examples:
+                        report['examples'][check].append((invoice_id, detail))
+                    if on_discrepancy:
+                        on_discrepancy(check, invoice_id, detail)
+
+            if repair:
+                _repair_batch(conn)
+            conn.commit()
+        # The DELETE that found no more invoices opened a transaction of its own
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.execute("DROP TABLE IF EXISTS temp.reconcile_batch")
+
+    return report
+
+if __name__ == "__main__":
+    # Exits non-zero when discrepancies are found, so it can be scheduled from cron:
+    #   python -m utils.reconcile_ledger --repair
+    import argparse
+    import sqlite3
+    import sys
+    from config import DB_PATH
+
+    parser = argparse.ArgumentParser(description="Reconcile invoices, transactions and the cash transfer ledger")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Invoices checked per batch")
+    parser.add_argument("--repair", action="store_true", help="Repair drift with set-based SQL")
+    parser.add_argument("--quiet", action="store_true", help="Only print the summary")
+    args = parser.parse_args()
+
+    def print_discrepancy(check, invoice_id, detail):
+        print(f"[{check}] Invoice #{invoice_id}: {detail}")
+
+    conn = sqlite3.connect(DB_PATH)
+    report = reconcile_ledger(
+        conn, args.batch_size, args.repair,
+        on_discrepancy=None if args.quiet else print_discrepancy
+    )
+    conn.close()
+
+    total = sum(report['discrepancies'].values())
+    print(f"Checked {report['invoices_checked']} invoices in {report['batches']} batches: {total} discrepancies")
+    for check, count in report['discrepancies'].items():
+        print(f"  {check}: {count}")
+    if args.repair:
+        print("Repairs applied (settlement imbalances are reported only)")
+
+    sys.exit(1 if total else 0)
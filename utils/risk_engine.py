@@ -0,0 +1,267 @@
+# utils/risk_engine.py
+
+"""
+Monte Carlo risk simulation for open investor positions.
+
+Each scenario draws a default per debtor (all invoices on a defaulted debtor
+pay only the recovery rate) and, for invoices that do pay, a late-payment
+delay that costs the investor their cost of capital. Scenarios are drawn
+RISK_SCENARIO_BATCH at a time, and each batch's per-chunk P&L is reduced
+against the holdings straight away, so only each investor's P&L per scenario
+is kept: a loss distribution per investor and for the platform as a whole.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from config import (
+    CHUNK_SIZE, RISK_SCENARIOS, RISK_DEFAULT_PROBABILITY, RISK_RECOVERY_RATE,
+    RISK_LATE_PROBABILITY, RISK_LATE_MEAN_DAYS, RISK_COST_OF_CAPITAL,
+    RISK_POOL_MIN_POSITIONS, RISK_SCENARIO_BATCH
+)
+from utils.money import to_baht
+
+PLATFORM_FEE_RATE = 0.10
+
+# Investors whose holdings are reduced (and summarized) together, bounding the temporaries
+INVESTOR_BLOCK_SIZE = 256
+
+def get_open_positions(conn, user_id=None):
+    """
+    Open positions as (buyer_user_id, invoice_id, chunks, original_amount, chunks_total, debtor_name).
+    Only Pending and Active invoices carry risk; settled invoices are excluded.
+    """
+    query = """
+        SELECT p.buyer_user_id, p.invoice_id, p.chunks,
+               i.original_amount, i.chunks_total, i.debtor_name
+        FROM positions p
+        JOIN invoices i ON p.invoice_id = i.invoice_id
+        WHERE i.status IN ('Pending', 'Active') AND p.chunks > 0
+    """
+    params = []
+    if user_id is not None:
+        query += " AND p.buyer_user_id = ?"
+        params.append(user_id)
+    query += """
+        ORDER BY p.buyer_user_id, p.invoice_id
+    """
+
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    return cursor.fetchall()
+
+def positions_version(conn, user_id=None):
+    """
+    Cheap cache key for get_open_positions(conn, user_id). For one investor it is
+    their open (invoice_id, chunks) pairs, read off idx_positions_buyer, so other
+    investors' trades leave it alone; invoice terms never change once created.
+    For the whole platform it is two primary-key maximums: every purchase and
+    market fill adds a transaction, and every status change that opens or closes
+    positions (activation, settlement, expiry refunds) writes a cash transfer.
+    """
+    cursor = conn.cursor()
+    if user_id is not None:
+        cursor.execute("""
+            SELECT group_concat(invoice_id || ':' || chunks) FROM (
+                SELECT p.invoice_id, p.chunks
+                FROM positions p
+                JOIN invoices i ON p.invoice_id = i.invoice_id
+                WHERE p.buyer_user_id = ? AND i.status IN ('Pending', 'Active') AND p.chunks > 0
+                ORDER BY p.invoice_id
+            )
+        """, (user_id,))
+        return cursor.fetchone()[0]
+    cursor.execute("""
+        SELECT (SELECT COALESCE(MAX(transaction_id), 0) FROM transactions),
+               (SELECT COALESCE(MAX(transfer_id), 0) FROM cash_transfers)
+    """)
+    return cursor.fetchone()
+
+def _build_inputs(positions):
+    """Dense per-invoice arrays plus (investor, invoice, chunks) index triples"""
+    investor_ids = sorted({p[0] for p in positions})
+    invoice_ids = sorted({p[1] for p in positions})
+    investor_index = {user_id: n for n, user_id in enumerate(investor_ids)}
+    invoice_index = {invoice_id: n for n, invoice_id in enumerate(invoice_ids)}
+
+    original_amount = np.zeros(len(invoice_ids))
+    chunks_total = np.ones(len(invoice_ids))
+    debtor_keys = [None] * len(invoice_ids)
+    for _, invoice_id, _, amount, total, debtor in positions:
+        n = invoice_index[invoice_id]
+        original_amount[n] = to_baht(amount)  # the simulation runs in baht floats
+        chunks_total[n] = total
+        debtor_keys[n] = " ".join(debtor.lower().split())
+
+    debtors = {key: n for n, key in enumerate(sorted(set(debtor_keys)))}
+    debtor_of_invoice = np.array([debtors[key] for key in debtor_keys], dtype=np.int64)
+
+    holdings = np.array(
+        [(investor_index[p[0]], invoice_index[p[1]], p[2]) for p in positions],
+        dtype=np.int64
+    ).reshape(-1, 3)
+    # Grouped by investor, so each investor's holdings are one contiguous run starting at investor_starts
+    holdings = holdings[np.argsort(holdings[:, 0], kind='stable')]
+    investor_starts = np.searchsorted(holdings[:, 0], np.arange(len(investor_ids) + 1))
+    chunks_per_invoice = np.bincount(holdings[:, 1], weights=holdings[:, 2], minlength=len(invoice_ids))
+
+    # Net payout per chunk after the 10% platform fee on profit
+    gross_per_chunk = original_amount / chunks_total
+    fee_per_chunk = np.maximum(gross_per_chunk - CHUNK_SIZE, 0) * PLATFORM_FEE_RATE
+    net_per_chunk = gross_per_chunk - fee_per_chunk
+
+    return {
+        'investor_ids': investor_ids,
+        'net_per_chunk': net_per_chunk,
+        'fee_per_chunk': fee_per_chunk,
+        'debtor_of_invoice': debtor_of_invoice,
+        'debtor_count': len(debtors),
+        'holdings': holdings,
+        'investor_starts': investor_starts,
+        'chunks_per_invoice': chunks_per_invoice
+    }
+
+def _scenario_batch(seed, batch_number, batch_size, inputs, params):
+    """
+    Per-chunk investor P&L and per-chunk platform fee, shape (batch_size, invoices).
+    Seeded by (seed, batch_number), so a run is reproducible batch by batch.
+    """
+    rng = np.random.default_rng([seed, batch_number])
+    invoice_count = len(inputs['net_per_chunk'])
+
+    defaulted_debtors = rng.random((batch_size, inputs['debtor_count'])) < params['default_probability']
+    defaulted = defaulted_debtors[:, inputs['debtor_of_invoice']]
+
+    late = rng.random((batch_size, invoice_count)) < params['late_probability']
+    delay_days = np.where(late, rng.exponential(params['late_mean_days'], (batch_size, invoice_count)), 0.0)
+    late_cost = CHUNK_SIZE * params['cost_of_capital'] * delay_days / 365
+
+    payout = np.where(defaulted, inputs['net_per_chunk'] * params['recovery_rate'], inputs['net_per_chunk'])
+    pnl_per_chunk = payout - CHUNK_SIZE - np.where(defaulted, 0.0, late_cost)
+    fee_per_chunk = np.where(defaulted, 0.0, inputs['fee_per_chunk'])
+    return pnl_per_chunk, fee_per_chunk
+
+def _investor_pnl(pnl_per_chunk, inputs):
+    """
+    Each investor's P&L in every scenario of a batch, shape (batch, investors):
+    one block of investors at a time, the batch's columns for the invoices the
+    block holds times the block's (invoices, investors) holdings matrix.
+    """
+    holdings, starts = inputs['holdings'], inputs['investor_starts']
+    investor_count = len(inputs['investor_ids'])
+    pnl = np.empty((pnl_per_chunk.shape[0], investor_count))
+    for first in range(0, investor_count, INVESTOR_BLOCK_SIZE):
+        last = min(first + INVESTOR_BLOCK_SIZE, investor_count)
+        block = holdings[starts[first]:starts[last]]
+        invoices, rows = np.unique(block[:, 1], return_inverse=True)
+        matrix = np.zeros((len(invoices), last - first))
+        np.add.at(matrix, (rows, block[:, 0] - first), block[:, 2])
+        pnl[:, first:last] = pnl_per_chunk[:, invoices] @ matrix
+    return pnl
+
+def _simulate_batch(inputs, seed, params, batch_number, batch_size):
+    """One batch of scenarios: investor P&L, shape (batch_size, investors), and the platform's fee per scenario"""
+    pnl_per_chunk, fee_per_chunk = _scenario_batch(seed, batch_number, batch_size, inputs, params)
+    return _investor_pnl(pnl_per_chunk, inputs), fee_per_chunk @ inputs['chunks_per_invoice']
+
+def _summarize(pnl, invested):
+    """
+    Distribution metrics for each column of a (scenarios, investors) P&L matrix.
+    VaR and expected shortfall are reported as positive losses.
+    """
+    expected_pnl = pnl.mean(axis=0)
+    q01, q05 = np.quantile(pnl, [0.01, 0.05], axis=0)
+    in_tail = pnl <= q05
+    shortfall = -(pnl * in_tail).sum(axis=0) / np.maximum(in_tail.sum(axis=0), 1)
+    probability_of_loss = (pnl < 0).mean(axis=0)
+    worst_case = -pnl.min(axis=0)
+
+    return [
+        {
+            'invested': float(invested[n]),
+            'expected_pnl': float(expected_pnl[n]),
+            'expected_return': float(expected_pnl[n] / invested[n]) if invested[n] else 0.0,
+            'var_95': float(-q05[n]),
+            'var_99': float(-q01[n]),
+            'expected_shortfall_95': float(shortfall[n]),
+            'probability_of_loss': float(probability_of_loss[n]),
+            'worst_case': float(worst_case[n])
+        }
+        for n in range(pnl.shape[1])
+    ]
+
+# Inputs and parameters of a pool worker, sent once per worker by _init_worker
+_worker_state = None
+
+def _init_worker(inputs, seed, params):
+    global _worker_state
+    _worker_state = (inputs, seed, params)
+
+def _simulate_worker_batch(batch):
+    return _simulate_batch(*_worker_state, *batch)
+
+def simulate_portfolio_risk(positions, scenarios=RISK_SCENARIOS, seed=0, workers=None,
+                            default_probability=RISK_DEFAULT_PROBABILITY,
+                            recovery_rate=RISK_RECOVERY_RATE,
+                            late_probability=RISK_LATE_PROBABILITY,
+                            late_mean_days=RISK_LATE_MEAN_DAYS,
+                            cost_of_capital=RISK_COST_OF_CAPITAL):
+    """
+    Simulate default and late payment across `scenarios` scenarios.
+    Returns {'investors': {user_id: metrics}, 'platform': metrics, 'platform_fees': {...},
+    'histogram': (counts, edges) of the total P&L of all positions}.
+    Scenarios are drawn once, in batches; portfolios with at least
+    RISK_POOL_MIN_POSITIONS positions draw and reduce the batches across a
+    process pool.
+    """
+    if not positions:
+        return None
+
+    params = {
+        'default_probability': default_probability,
+        'recovery_rate': recovery_rate,
+        'late_probability': late_probability,
+        'late_mean_days': late_mean_days,
+        'cost_of_capital': cost_of_capital
+    }
+    inputs = _build_inputs(positions)
+    batches = [
+        (batch_number, min(RISK_SCENARIO_BATCH, scenarios - start))
+        for batch_number, start in enumerate(range(0, scenarios, RISK_SCENARIO_BATCH))
+    ]
+
+    if len(positions) >= RISK_POOL_MIN_POSITIONS and len(batches) > 1:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker,
+                                 initargs=(inputs, seed, params)) as executor:
+            results = list(executor.map(_simulate_worker_batch, batches))
+    else:
+        results = [_simulate_batch(inputs, seed, params, *batch) for batch in batches]
+
+    investor_pnl = np.vstack([pnl for pnl, _ in results])
+    platform_fees = np.concatenate([fees for _, fees in results])
+    platform_pnl = investor_pnl.sum(axis=1)
+
+    holdings = inputs['holdings']
+    invested = np.bincount(holdings[:, 0], weights=holdings[:, 2], minlength=investor_pnl.shape[1]) * CHUNK_SIZE
+    investors = {}
+    for first in range(0, investor_pnl.shape[1], INVESTOR_BLOCK_SIZE):
+        last = first + INVESTOR_BLOCK_SIZE
+        investors.update(zip(
+            inputs['investor_ids'][first:last], _summarize(investor_pnl[:, first:last], invested[first:last])
+        ))
+
+    total_invested = sum(metrics['invested'] for metrics in investors.values())
+    counts, edges = np.histogram(platform_pnl, bins=30)
+
+    return {
+        'scenarios': scenarios,
+        'investors': investors,
+        'platform': _summarize(platform_pnl[:, None], [total_invested])[0],
+        'platform_fees': {
+            'expected': float(platform_fees.mean()),
+            'p05': float(np.quantile(platform_fees, 0.05))
+        },
+        'histogram': (counts.tolist(), edges.tolist())
+    }
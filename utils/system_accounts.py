@@ -0,0 +1,58 @@
+# utils/system_accounts.py
+
+"""
+Registry of reserved system accounts (users.is_system = 1).
+Each account is looked up once per database file and then served from memory,
+so settlement, fee and stats code can call these on every rerun for free.
+"""
+
+PLATFORM_OWNER_USERNAME = "PLATFORM OWNER"
+
+# database file -> {username: user_id}; keyed by file rather than connection so
+# short-lived connections (CLIs, worker processes) are neither pinned nor confused
+_resolved_accounts = {}
+
+def _database_file(conn):
+    """Path of the connection's main database, or None for in-memory and temporary ones"""
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA database_list")
+    return next((path for _, name, path in cursor.fetchall() if name == "main"), None) or None
+
+def _select_system_account(cursor, username):
+    cursor.execute("SELECT user_id FROM users WHERE is_system = 1 AND username = ?", (username,))
+    result = cursor.fetchone()
+    return result[0] if result else None
+
+def get_system_account_id(conn, username):
+    """
+    Get (or create) the user ID of a reserved system account. A created account
+    is written in the caller's transaction and never committed here; INSERT OR
+    IGNORE lets two sessions creating it at once both end up with the same row.
+    """
+    database_file = _database_file(conn)
+    account_ids = _resolved_accounts.setdefault(database_file, {}) if database_file else {}
+    if username in account_ids:
+        return account_ids[username]
+
+    cursor = conn.cursor()
+    user_id = _select_system_account(cursor, username)
+    if user_id is None:
+        cursor.execute("INSERT OR IGNORE INTO users (username, is_system) VALUES (?, 1)", (username,))
+        user_id = _select_system_account(cursor, username)
+        if user_id is None:
+            raise ValueError(f"Username '{username}' is reserved but taken by a regular user")
+
+    account_ids[username] = user_id
+    return user_id
+
+def get_platform_owner_id(conn):
+    """Get the platform owner's user ID, creating the account on first use"""
+    return get_system_account_id(conn, PLATFORM_OWNER_USERNAME)
+
+def platform_owner_party(conn):
+    """Party label used for the platform owner in cash_transfers"""
+    return f"{PLATFORM_OWNER_USERNAME} (User {get_platform_owner_id(conn)})"
+
+def clear_system_accounts():
+    """Forget all resolved accounts (e.g. after recreating a database)"""
+    _resolved_accounts.clear()